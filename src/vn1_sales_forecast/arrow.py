@@ -0,0 +1,105 @@
+"""Adapters between polars and the model libraries that avoid duplicate copies.
+
+The fold frames are collected once and handed to the model libraries as Arrow-backed polars
+frames, which StatsForecast, MLForecast and NeuralForecast consume natively. Libraries that
+only accept pandas or numpy get views on the polars buffers wherever the memory layout
+allows it. Every copy made by the adapters is recorded under the stage of the running node,
+see `track_copies`.
+"""
+
+import functools
+import logging
+from collections import Counter
+from collections.abc import Callable, Generator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, ParamSpec, TypeVar
+
+import numpy as np
+import polars as pl
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+_STAGE: ContextVar[str] = ContextVar("stage", default="default")
+_COPIED: Counter[str] = Counter()
+
+
+def record_copy(nbytes: int) -> None:
+    _COPIED[_STAGE.get()] += nbytes
+
+
+def copy_report() -> pl.DataFrame:
+    """Bytes copied by the adapters per stage since the start of the process."""
+    return pl.DataFrame(
+        list(_COPIED.items()),
+        schema={"stage": pl.String, "bytes_copied": pl.Int64},
+        orient="row",
+    )
+
+
+@contextmanager
+def copy_stage(name: str) -> Generator[None, None, None]:
+    token = _STAGE.set(name)
+    start = _COPIED[name]
+    try:
+        yield
+    finally:
+        _STAGE.reset(token)
+        logger.info("%s copied %.1f MiB", name, (_COPIED[name] - start) / 1024**2)
+
+
+def track_copies(func: Callable[P, R]) -> Callable[P, R]:
+    """Record the copies made while a node runs under `<module>.<function>`."""
+    stage = f"{func.__module__.removeprefix('vn1_sales_forecast.pipelines.')}.{func.__name__}"
+
+    @functools.wraps(func)
+    def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+        with copy_stage(stage):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+def collect(df: pl.LazyFrame | pl.DataFrame, *columns: str) -> pl.DataFrame:
+    """Materialize `df` once. Selecting columns of a collected frame does not copy."""
+    if isinstance(df, pl.DataFrame):
+        return df.select(columns) if columns else df
+
+    data = (df.select(columns) if columns else df).collect()
+    record_copy(int(data.estimated_size()))
+    return data
+
+
+def to_numpy(s: pl.Series) -> np.ndarray:
+    try:
+        return s.to_numpy(allow_copy=False)
+    except RuntimeError:
+        arr = s.to_numpy()
+        record_copy(arr.nbytes)
+        return arr
+
+
+def split_lists(s: pl.Series) -> list[np.ndarray]:
+    """Split a list column into numpy views on its flat values buffer."""
+    lengths = s.list.len().to_numpy()
+    values = to_numpy(s.explode())
+    return np.split(values, np.cumsum(lengths)[:-1])
+
+
+def to_pandas(df: pl.DataFrame) -> "pd.DataFrame":
+    """Convert `df` to pandas, sharing the buffers of numeric columns without nulls."""
+    import pandas as pd
+
+    return pd.DataFrame({c: to_numpy(s) for c, s in zip(df.columns, df)}, copy=False)
+
+
+def from_pandas(df: "pd.DataFrame") -> pl.DataFrame:
+    data = pl.from_pandas(df)
+    record_copy(int(data.estimated_size()))
+    return data
@@ -0,0 +1,562 @@
+"""Benchmarks of the forecasting hot paths on synthetic VN1-shaped panels.
+
+Every case times a single node function on a panel of `n_series` series and records its
+wall time, CPU time and peak RSS (including child processes) to a JSON history. Each run is
+compared against the previous run of the same case and size to catch regressions, on the
+wall time and the RSS the case adds to the process.
+
+    python -m vn1_sales_forecast.benchmark --sizes 1000 10000 --cases "model_*"
+
+The inputs of a case are produced by the cases before it. If those are not selected, they
+are still computed, but not recorded.
+"""
+
+import argparse
+import datetime as dt
+import fnmatch
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+from collections.abc import Callable, Iterator
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import polars as pl
+from kedro.config import OmegaConfigLoader
+
+from vn1_sales_forecast.hooks import PeakRss
+from vn1_sales_forecast.settings import CONFIG_LOADER_ARGS, PRED_PREFIX
+
+logger = logging.getLogger(__name__)
+
+Measure = Callable[..., Any]
+
+PROJECT_PATH = Path(__file__).parents[2]
+HISTORY_PATH = PROJECT_PATH / "data" / "08_reporting" / "benchmark_history.json"
+
+# NOTE: Phase 0 of the competition data covers 170 weeks, phase 1 another 13 weeks
+FIRST_DATE = dt.date(2020, 7, 6)
+N_WEEKS = 183
+N_WEEKS_PHASE_1 = 13
+
+# Candidate models of the model pipelines, the ensembles refer to some of them by name
+MODEL_NAMES = [
+    "ZeroModel",
+    "WindowAverage",
+    "SeasonalNaive",
+    "CrostonOptimized",
+    "IMAPA",
+    "AutoETS",
+    "SESOpt",
+    "OptimizedTheta",
+    "DynamicOptimizedTheta",
+    "AutoMFLES",
+    "LGBMRegressorRecursive",
+    "LGBMRegressorMedianRecursive",
+    "LGBMRegressorTweedieRecursive",
+    "LGBMRegressorDirect",
+    "LGBMRegressorRecursivePartitioned",
+    "KAN",
+    "NHITS",
+    "NHITSCustom",
+    "TimesFM",
+]
+
+
+def make_panel(
+    n_series: int, n_weeks: int = N_WEEKS, seed: int = 0
+) -> tuple[pl.DataFrame, pl.DataFrame]:
+    """Synthetic raw sales and price in the long format of `join_sales_dfs`.
+
+    Like the competition data, the series start at different weeks with leading zeros, are
+    intermittent to a varying degree, partly seasonal, and some end with trailing zeros or
+    have no sales at all. Prices are missing in weeks without sales.
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(n_weeks)
+
+    level = rng.lognormal(0.5, 1.2, n_series)[:, None]
+    season = (rng.random(n_series) < 0.3) * rng.uniform(0.2, 0.8, n_series)
+    shift = rng.uniform(0, 2 * np.pi, n_series)
+    mu = level * (1 + season[:, None] * np.sin(2 * np.pi * t / 52 + shift[:, None]))
+
+    p_zero = rng.beta(0.7, 1.5, n_series)[:, None]
+    sales = rng.poisson(mu) * (rng.random((n_series, n_weeks)) >= p_zero)
+
+    start = (rng.beta(0.5, 2, n_series) * n_weeks).astype(np.int64)
+    end = np.where(rng.random(n_series) < 0.05, rng.integers(1, 52, n_series), 0)
+    sales[(t < start[:, None]) | (t >= n_weeks - end[:, None])] = 0
+    sales[rng.random(n_series) < 0.03] = 0
+
+    price = rng.lognormal(2.5, 0.8, n_series)[:, None] * rng.normal(1, 0.05, sales.shape)
+    price[sales == 0] = np.nan
+
+    dates = pl.date_range(
+        FIRST_DATE, FIRST_DATE + dt.timedelta(weeks=n_weeks - 1), "1w", eager=True
+    ).dt.strftime(r"%Y-%m-%d")
+    keys = pl.DataFrame(
+        {
+            "Client": rng.integers(0, 46, n_series),
+            "Warehouse": rng.integers(0, 350, n_series),
+            "Product": np.arange(n_series),
+        }
+    ).select(pl.all().repeat_by(n_weeks).explode())
+    index = keys.with_columns(
+        date=pl.Series(np.tile(dates.to_numpy(), n_series)),
+        phase=pl.Series(np.tile((t >= n_weeks - N_WEEKS_PHASE_1).astype(np.int32), n_series)),
+    )
+
+    return (
+        index.with_columns(sales=pl.Series(sales.ravel(), dtype=pl.Float32)),
+        index.with_columns(price=pl.Series(price.ravel(), dtype=pl.Float32).fill_nan(None)),
+    )
+
+
+def _materialize(out: Any) -> Any:
+    if isinstance(out, pl.LazyFrame):
+        return out.collect()
+    if isinstance(out, tuple):
+        return tuple(_materialize(x) for x in out)
+    if isinstance(out, Iterator):
+        return [_materialize(x) for x in out]
+    return out
+
+
+def _measure(result: dict[str, Any]) -> Measure:
+    def measure(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        rss = PeakRss()
+        rss.start()
+        start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            out = _materialize(func(*args, **kwargs))
+        finally:
+            rss.stop()
+        result["wall_time_s"] = time.perf_counter() - start
+        result["cpu_time_s"] = time.process_time() - cpu_start
+        # NOTE: The process keeps the inputs of all cases so far, so its peak RSS grows from case
+        # to case. The memory of a case is what it adds on top, the delta to its start.
+        result["peak_rss_mib"] = rss.peak / 1024**2
+        result["rss_delta_mib"] = (rss.peak - rss.start_rss) / 1024**2
+        return out
+
+    return measure
+
+
+def _run_unmeasured(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    return _materialize(func(*args, **kwargs))
+
+
+# Cases
+# -----
+
+Case = Callable[["_Context", Measure], Any]
+Input = Callable[["_Context"], Any]
+
+CASES: dict[str, tuple[Case, str | None]] = {}
+INPUTS: dict[str, Input] = {}
+
+
+def _case(name: str, provides: str | None = None) -> Callable[[Case], Case]:
+    """Register a timed case. Its return value is the input `provides` of later cases."""
+
+    def register(func: Case) -> Case:
+        CASES[name] = (func, provides)
+        if provides is not None:
+            INPUTS[provides] = lambda ctx: func(ctx, _run_unmeasured)
+        return func
+
+    return register
+
+
+def _input(key: str) -> Callable[[Input], Input]:
+    """Register an input of the cases which is not timed itself."""
+
+    def register(func: Input) -> Input:
+        INPUTS[key] = func
+        return func
+
+    return register
+
+
+class _Context(dict):
+    """Inputs of the cases, computed on first access by the case which provides them."""
+
+    def __init__(self, params: dict[str, Any], n_series: int, seed: int) -> None:
+        super().__init__(params=params)
+        self["raw_sales"], self["raw_price"] = make_panel(n_series, seed=seed)
+
+    def __missing__(self, key: str) -> Any:
+        try:
+            self[key] = INPUTS[key](self)
+        except Exception as e:
+            # NOTE: Failures are kept, so that every dependent case fails fast
+            self[key] = e
+        return self[key]
+
+    def __getitem__(self, key: str) -> Any:
+        value = super().__getitem__(key)
+        if isinstance(value, Exception):
+            raise RuntimeError(f"Input {key!r} is not available: {value!r}") from value
+        return value
+
+    def last_train(self) -> pl.LazyFrame:
+        return self["cv_folds"][-1][0]
+
+
+@_case("data_wrangling.join_into_cube", provides="primary_sales")
+def _join_into_cube(ctx: _Context, measure: Measure) -> pl.LazyFrame:
+    from vn1_sales_forecast.pipelines.data_wrangling.nodes import (
+        join_into_cube,
+        remove_leading_zeros,
+    )
+
+    cube = measure(join_into_cube, ctx["raw_sales"].lazy(), ctx["raw_price"].lazy())
+    return remove_leading_zeros(cube.lazy()).collect().lazy()
+
+
+@_case("cv.split_cv", provides="cv_folds")
+def _split_cv(ctx: _Context, measure: Measure) -> list[tuple[pl.LazyFrame, pl.LazyFrame]]:
+    from vn1_sales_forecast.cv import split_cv
+
+    folds = measure(split_cv, ctx["primary_sales"], **ctx["params"]["cv"])
+    return [(train.lazy(), test.lazy()) for train, test in folds]
+
+
+@_case("tsfeatures.calculate_cv_tsfeatures", provides="cv_tsfeatures")
+def _calculate_cv_tsfeatures(ctx: _Context, measure: Measure) -> pl.LazyFrame:
+    from vn1_sales_forecast.pipelines.tsfeatures.nodes import calculate_cv_tsfeatures
+
+    return measure(calculate_cv_tsfeatures, ctx["cv_folds"]).lazy()
+
+
+@_case("classification._classify_sales", provides="cv_classification")
+def _classify_sales(ctx: _Context, measure: Measure) -> pl.LazyFrame:
+    from vn1_sales_forecast.pipelines.classification.nodes import (
+        _classify_sales,
+        calculate_cv_classification,
+    )
+
+    # NOTE: Timed on the most recent fold, the classification of all folds is not timed
+    cutoff = ctx.last_train().select(pl.col("date").max().dt.offset_by("1w")).collect().item()
+    tsfeatures = ctx["cv_tsfeatures"].filter(pl.col("cutoff_date") == cutoff)
+    measure(_classify_sales, ctx.last_train(), tsfeatures.drop("cutoff_date"))
+    return calculate_cv_classification(ctx["cv_folds"], ctx["cv_tsfeatures"]).collect().lazy()
+
+
+@_case("partition._partition_sales", provides="partitions")
+def _partition_sales(ctx: _Context, measure: Measure) -> pl.LazyFrame:
+    from vn1_sales_forecast.pipelines.partition.nodes import _partition_sales
+
+    return measure(_partition_sales, ctx.last_train()).lazy()
+
+
+@_case("model_stat._fit_predict")
+def _model_stat(ctx: _Context, measure: Measure) -> None:
+    from vn1_sales_forecast.pipelines.model_stat.nodes import _fit_predict, create_model
+
+    measure(_fit_predict, create_model(), ctx.last_train())
+
+
+@_case("model_ml_recursive._fit_predict")
+def _model_ml_recursive(ctx: _Context, measure: Measure) -> None:
+    from vn1_sales_forecast.pipelines.model_ml_recursive.nodes import (
+        _fit_predict,
+        _make_data,
+        create_model,
+    )
+
+    measure(_fit_predict, create_model(), *_make_data(ctx.last_train()))
+
+
+@_case("model_ml_direct._fit_predict")
+def _model_ml_direct(ctx: _Context, measure: Measure) -> None:
+    from vn1_sales_forecast.pipelines.model_ml_direct.nodes import (
+        _fit_predict,
+        _make_data,
+        create_model,
+    )
+
+    measure(_fit_predict, create_model(), *_make_data(ctx.last_train()), direct=True)
+
+
+@_case("model_ml_recursive_partitioned._fit_predict")
+def _model_ml_recursive_partitioned(ctx: _Context, measure: Measure) -> None:
+    from vn1_sales_forecast.pipelines.model_ml_recursive_partitioned.nodes import (
+        _fit_predict,
+        _make_data,
+        create_model,
+    )
+
+    train = (
+        ctx.last_train()
+        .join(ctx["partitions"], on=["id", "date"])
+        .filter(pl.col("partition") == pl.col("partition").max().over("id"))
+        .drop("partition")
+    )
+    measure(_fit_predict, create_model(), *_make_data(train))
+
+
+@_case("model_nn._fit_predict")
+def _model_nn(ctx: _Context, measure: Measure) -> None:
+    from vn1_sales_forecast.pipelines.model_nn.nodes import _fit_predict, create_model
+
+    measure(_fit_predict, create_model(), ctx.last_train())
+
+
+@_case("model_timesfm.TimesFM.forecast")
+def _model_timesfm(ctx: _Context, measure: Measure) -> None:
+    from vn1_sales_forecast.pipelines.model_timesfm.nodes import create_model
+
+    model = create_model(**ctx["params"]["model_timesfm"])
+    measure(model.forecast, ctx.last_train())
+
+
+@_input("model_cv_forecast")
+def _make_model_cv_forecast(ctx: _Context) -> pl.LazyFrame:
+    """Noisy copies of the test sales in place of the cv forecasts of the candidate models."""
+    rng = np.random.default_rng(0)
+    test = pl.concat(
+        test.select(
+            "id", "date", "sales", pl.col("date").min().over("id").alias("cutoff_date")
+        ).collect()
+        for _, test in ctx["cv_folds"]
+    )
+    noise = rng.lognormal(0, 0.5, (len(test), len(MODEL_NAMES))).astype(np.float32)
+    preds = test["sales"].fill_null(0).to_numpy()[:, None] * noise
+    preds[:, MODEL_NAMES.index("ZeroModel")] = 0
+    return (
+        test.drop("sales")
+        .hstack([pl.Series(PRED_PREFIX + m, preds[:, i]) for i, m in enumerate(MODEL_NAMES)])
+        .lazy()
+    )
+
+
+@_input("model_total_scores")
+def _make_model_total_scores(ctx: _Context) -> pl.LazyFrame:
+    from vn1_sales_forecast.pipelines.evaluation.nodes import calc_cv_scores
+
+    _, _, total_scores = calc_cv_scores(ctx["model_cv_forecast"], ctx["primary_sales"])
+    return total_scores.collect().lazy()
+
+
+@_case("ensemble_stacking.cross_validate")
+def _ensemble_stacking(ctx: _Context, measure: Measure) -> None:
+    from vn1_sales_forecast.pipelines.ensemble_stacking.nodes import create_models, cross_validate
+
+    measure(
+        cross_validate,
+        create_models(),
+        ctx["model_cv_forecast"],
+        ctx["primary_sales"],
+        ctx["model_total_scores"],
+    )
+
+
+@_case("ensemble_optimal_weights.cross_validate", provides="ensemble_cv_forecast")
+def _ensemble_optimal_weights(ctx: _Context, measure: Measure) -> pl.LazyFrame:
+    from vn1_sales_forecast.pipelines.ensemble_optimal_weights.nodes import cross_validate
+
+    p = measure(
+        cross_validate,
+        ctx["model_cv_forecast"],
+        ctx["primary_sales"],
+        ctx["model_total_scores"],
+    )
+    return p.lazy()
+
+
+@_case("ensemble_fforma.cross_validate")
+def _ensemble_fforma(ctx: _Context, measure: Measure) -> None:
+    from vn1_sales_forecast.pipelines.ensemble_fforma.nodes import (
+        calculate_cv_scores,
+        cross_validate,
+    )
+
+    cv_scores = calculate_cv_scores(ctx["model_cv_forecast"], ctx["primary_sales"])
+    measure(
+        cross_validate,
+        ctx["model_cv_forecast"],
+        ctx["cv_tsfeatures"],
+        cv_scores.collect().lazy(),
+        ctx["model_total_scores"],
+    )
+
+
+@_case("ensemble_classification.cross_validation")
+def _ensemble_classification(ctx: _Context, measure: Measure) -> None:
+    from vn1_sales_forecast.pipelines.ensemble_classification.nodes import cross_validation
+
+    measure(cross_validation, ctx["model_cv_forecast"], ctx["cv_classification"])
+
+
+@_case("ensemble_mixer.cross_validation")
+def _ensemble_mixer(ctx: _Context, measure: Measure) -> None:
+    from vn1_sales_forecast.pipelines.ensemble_mixer.nodes import cross_validation
+
+    measure(cross_validation, ctx["model_cv_forecast"])
+
+
+@_case("divine_model.cross_validate")
+def _divine_model(ctx: _Context, measure: Measure) -> None:
+    from vn1_sales_forecast.pipelines.divine_model.nodes import cross_validate
+
+    measure(
+        cross_validate,
+        ctx["model_cv_forecast"],
+        ctx["ensemble_cv_forecast"],
+        ctx["cv_classification"],
+    )
+
+
+@_case("evaluation.calc_errors_reports")
+def _calc_errors_reports(ctx: _Context, measure: Measure) -> None:
+    from vn1_sales_forecast.pipelines.evaluation.nodes import calc_errors_reports
+
+    measure(calc_errors_reports, ctx["model_cv_forecast"], ctx["primary_sales"])
+
+
+# Runner
+# ------
+
+
+def run_benchmarks(
+    sizes: list[int], patterns: list[str], params: dict[str, Any], seed: int = 0
+) -> list[dict[str, Any]]:
+    results: list[dict[str, Any]] = []
+    for n_series in sizes:
+        ctx = _Context(params, n_series, seed)
+        for name, (func, provides) in CASES.items():
+            if not any(fnmatch.fnmatch(name, p) for p in patterns):
+                continue
+            logger.info("Running %s on %d series", name, n_series)
+            result: dict[str, Any] = {"case": name, "n_series": n_series, "error": None}
+            try:
+                out = func(ctx, _measure(result))
+                if provides is not None:
+                    ctx[provides] = out
+            except Exception as e:
+                logger.exception("%s failed", name)
+                result["error"] = repr(e)
+                if provides is not None:
+                    ctx[provides] = e
+            results.append(result)
+    return results
+
+
+def _git_commit() -> str | None:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=PROJECT_PATH,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip()
+
+
+def load_history(path: Path) -> list[dict[str, Any]]:
+    if not path.exists():
+        return []
+    return json.loads(path.read_text())
+
+
+def _ratio(value: float | None, previous: float | None) -> float | None:
+    if value is None or not previous or previous <= 0:
+        return None
+    return value / previous
+
+
+def compare(
+    results: list[dict[str, Any]], history: list[dict[str, Any]], threshold: float
+) -> pl.DataFrame:
+    """Wall time and RSS delta of `results` relative to the last recorded run of each case."""
+    previous: dict[tuple[str, int], dict[str, Any]] = {}
+    for run in history:
+        for r in run["results"]:
+            if r["error"] is None:
+                previous[(r["case"], r["n_series"])] = r
+
+    rows = []
+    for r in results:
+        prev = previous.get((r["case"], r["n_series"]), {})
+        rows.append(
+            {
+                "case": r["case"],
+                "n_series": r["n_series"],
+                "wall_time_s": r.get("wall_time_s"),
+                "rss_delta_mib": r.get("rss_delta_mib"),
+                "wall_time_ratio": _ratio(r.get("wall_time_s"), prev.get("wall_time_s")),
+                "rss_delta_ratio": _ratio(r.get("rss_delta_mib"), prev.get("rss_delta_mib")),
+                "error": r["error"],
+            }
+        )
+    schema = {
+        "case": pl.String,
+        "n_series": pl.Int64,
+        "wall_time_s": pl.Float64,
+        "rss_delta_mib": pl.Float64,
+        "wall_time_ratio": pl.Float64,
+        "rss_delta_ratio": pl.Float64,
+        "error": pl.String,
+    }
+    return pl.DataFrame(rows, schema=schema, orient="row").with_columns(
+        (pl.col("wall_time_ratio") > threshold).alias("regression")
+    )
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--cases", nargs="+", default=["*"], help="Glob patterns of the cases")
+    parser.add_argument("--history", type=Path, default=HISTORY_PATH)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.25,
+        help="Wall time ratio to the previous run above which a case is a regression",
+    )
+    parser.add_argument("--list", action="store_true", help="List the cases and exit")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        print("\n".join(CASES))
+        return 0
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    # NOTE: Like a Kedro run, so that the globals shared with the catalog are resolved
+    config = OmegaConfigLoader(str(PROJECT_PATH / "conf"), **CONFIG_LOADER_ARGS)
+    params = config["parameters"]
+    results = run_benchmarks(args.sizes, args.cases, params, seed=args.seed)
+
+    history = load_history(args.history)
+    report = compare(results, history, args.threshold)
+
+    history.append(
+        {
+            "timestamp": dt.datetime.now(dt.timezone.utc).isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "results": results,
+        }
+    )
+    args.history.parent.mkdir(parents=True, exist_ok=True)
+    args.history.write_text(json.dumps(history, indent=2))
+
+    with pl.Config(tbl_rows=-1, tbl_width_chars=200, fmt_str_lengths=60):
+        print(report)
+    return int(report["regression"].any() or report["error"].is_not_null().any())
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,6 +2,78 @@ from collections.abc import Generator
 
 import polars as pl
 
+CVFolds = list[tuple[pl.LazyFrame, pl.LazyFrame]]
+
+
+def cv_fold_index(
+    df: pl.LazyFrame | pl.DataFrame,
+    h: int = 13,
+    freq: str = "w",
+    n_windows: int = 3,
+    step: int | None = None,
+    min_train_size: int | None = None,
+    id_col: str = "id",
+    time_col: str = "date",
+) -> pl.DataFrame:
+    """Compute the row ranges of all cv folds in a single pass.
+
+    `df` must be sorted by `id_col` and `time_col`. For every series and window the train
+    rows are `[start_row, end_row)` and the test rows are `[end_row, test_end_row)`.
+    Windows are numbered from the oldest (0) to the most recent cutoff.
+    """
+    step = step or h
+
+    # NOTE: The rows up to each cutoff are counted per series in one pass, so the rows are
+    # not repeated for every window
+    max_date = pl.col(time_col).max()
+    offsets = [i * step for i in reversed(range(n_windows))]
+
+    def n_rows(offset: int) -> pl.Expr:
+        return (pl.col(time_col) <= max_date.dt.offset_by(f"-{offset}{freq}")).sum()
+
+    series = (
+        df.lazy()
+        .select(id_col, time_col)
+        .with_row_index("row")
+        .group_by(id_col)
+        .agg(
+            pl.col("row").min().alias("start_row"),
+            *(n_rows(offset + h).alias(f"n_train_{w}") for w, offset in enumerate(offsets)),
+            *(n_rows(offset).alias(f"n_train_test_{w}") for w, offset in enumerate(offsets)),
+        )
+        .collect()
+    )
+    index = pl.concat(
+        series.filter(pl.col(f"n_train_{w}") >= (min_train_size or 1)).select(
+            id_col,
+            pl.lit(w, dtype=pl.UInt32).alias("window"),
+            "start_row",
+            (pl.col("start_row") + pl.col(f"n_train_{w}")).alias("end_row"),
+            (pl.col("start_row") + pl.col(f"n_train_test_{w}")).alias("test_end_row"),
+        )
+        for w in range(n_windows)
+    )
+    return index.sort("window", "start_row")
+
+
+def split_cv_indexed(
+    df: pl.DataFrame, index: pl.DataFrame, n_windows: int
+) -> Generator[tuple[pl.LazyFrame, pl.LazyFrame], None, None]:
+    """Serve the folds of a `cv_fold_index` from the collected `df` it was built on.
+
+    Windows in which no series has enough train rows are served as empty folds, like by the
+    lazy `split_cv`, so that the folds keep their positions.
+    """
+    folds = index.partition_by("window", as_dict=True)
+    for window in range(n_windows):
+        fold = folds.get((window,), index.clear())
+        train_rows = pl.int_ranges("start_row", "end_row", dtype=pl.UInt32)
+        test_rows = pl.int_ranges("end_row", "test_end_row", dtype=pl.UInt32)
+
+        train_idx = fold.select(train_rows.explode().drop_nulls()).to_series()
+        test_idx = fold.select(test_rows.explode().drop_nulls()).to_series()
+        yield df[train_idx].lazy(), df[test_idx].lazy()
+
 
 def split_cv(
     df: pl.LazyFrame,
@@ -12,9 +84,25 @@ def split_cv(
     min_train_size: int | None = None,
     id_col: str = "id",
     time_col: str = "date",
+    materialize: bool = False,
 ) -> Generator[tuple[pl.LazyFrame, pl.LazyFrame], None, None]:
     step = step or h
 
+    if materialize:
+        data = df.lazy().sort(id_col, time_col).collect()
+        index = cv_fold_index(
+            data,
+            h=h,
+            freq=freq,
+            n_windows=n_windows,
+            step=step,
+            min_train_size=min_train_size,
+            id_col=id_col,
+            time_col=time_col,
+        )
+        yield from split_cv_indexed(data, index, n_windows)
+        return
+
     for i in reversed(range(n_windows)):
         offset = i * step
         max_date = pl.col(time_col).max().over(id_col)
@@ -21,3 +21,36 @@ def bias(expr: pl.Expr, target: pl.Expr) -> pl.Expr:
 
 def competition_score(expr: pl.Expr, target: pl.Expr) -> pl.Expr:
     return bias(expr, target) + mae(expr, target)
+
+
+# Series ids pack the (Client, Warehouse, Product) keys into a single integer. The packing
+# preserves the lexicographic order of the keys.
+SERIES_ID_BITS = 20
+
+
+def series_id(keys: list[str] | None = None) -> pl.Expr:
+    client, warehouse, product = keys or ["Client", "Warehouse", "Product"]
+    return (
+        pl.col(client).cast(pl.Int64) * 2 ** (2 * SERIES_ID_BITS)
+        + pl.col(warehouse).cast(pl.Int64) * 2**SERIES_ID_BITS
+        + pl.col(product).cast(pl.Int64)
+    )
+
+
+def split_series_id(expr: IntoExpr = "id", keys: list[str] | None = None) -> list[pl.Expr]:
+    client, warehouse, product = keys or ["Client", "Warehouse", "Product"]
+    e = parse_into_expr(expr)
+    return [
+        (e // 2 ** (2 * SERIES_ID_BITS)).alias(client),
+        ((e // 2**SERIES_ID_BITS) % 2**SERIES_ID_BITS).alias(warehouse),
+        (e % 2**SERIES_ID_BITS).alias(product),
+    ]
+
+
+def series_id_from_label(label: str, separator: str = "-") -> int:
+    client, warehouse, product = map(int, label.split(separator))
+    return (client << 2 * SERIES_ID_BITS) + (warehouse << SERIES_ID_BITS) + product
+
+
+def series_label(expr: IntoExpr = "id", separator: str = "-") -> pl.Expr:
+    return pl.concat_str(split_series_id(expr), separator=separator)
@@ -0,0 +1,308 @@
+"""Profiling of the node runs and the dataset I/O of a Kedro run.
+
+Every dataset load, node run and dataset save is an event of the run log. The events of a
+node are written to small Parquet parts under `<run_log_path>/<session_id>/parts` as soon
+as they happen, so that runs in worker processes are recorded as well. After the run, the
+parts are combined into
+
+- `events.parquet`: one row per load, run and save,
+- `nodes.parquet`: one row per node with its load, run and save times and I/O sizes,
+- `profile.folded`: the times in the collapsed stack format of flamegraph.pl and
+  speedscope, nested by namespace, node and event.
+
+Lazy frames are not executed by the hooks, so their rows and bytes are read from the file
+metadata, and the load time of a lazy dataset only covers building the scan. Its collect
+counts to the run of the node.
+"""
+
+import logging
+import shutil
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+import polars as pl
+import psutil
+from kedro.framework.hooks import hook_impl
+from kedro.io import DataCatalog
+from kedro.pipeline.node import Node
+
+from vn1_sales_forecast.arrow import copy_report
+
+logger = logging.getLogger(__name__)
+
+_MIB = 1024**2
+
+EVENT_SCHEMA = {
+    "node": pl.String,
+    "namespace": pl.String,
+    "event": pl.String,
+    "dataset": pl.String,
+    "dataset_type": pl.String,
+    "start": pl.Datetime("us", "UTC"),
+    "duration_s": pl.Float64,
+    "cpu_time_s": pl.Float64,
+    "peak_rss_delta_mib": pl.Float64,
+    "bytes_copied": pl.Int64,
+    "rows": pl.Int64,
+    "bytes": pl.Int64,
+    "error": pl.String,
+}
+
+
+class PeakRss(threading.Thread):
+    """Samples the RSS of the process and its children until it is stopped."""
+
+    def __init__(self, interval: float = 0.01) -> None:
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.process = psutil.Process()
+        self.start_rss = self.peak = self._rss()
+        self._stop_event = threading.Event()
+
+    def _rss(self) -> int:
+        rss = self.process.memory_info().rss
+        for child in self.process.children(recursive=True):
+            try:
+                rss += child.memory_info().rss
+            except psutil.NoSuchProcess:
+                pass
+        return rss
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            self.peak = max(self.peak, self._rss())
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+        self.peak = max(self.peak, self._rss())
+
+
+def _data_size(data: Any) -> tuple[int | None, int | None]:
+    """Rows and in-memory bytes of materialized frames. Lazy frames are not executed."""
+    if isinstance(data, pl.DataFrame):
+        return data.height, int(data.estimated_size())
+    if isinstance(data, pd.DataFrame):
+        return len(data), int(data.memory_usage(index=True).sum())
+    return None, None
+
+
+def _file_size(dataset: Any) -> tuple[int | None, int | None]:
+    """Rows and bytes on disk of datasets backed by a Parquet or IPC file or directory of parts."""
+    filepath = dataset._describe().get("filepath") if dataset is not None else None
+    path = Path(str(filepath)) if filepath else None
+    if path is None or not path.exists():
+        return None, None
+
+    scan = {".parquet": pl.scan_parquet, ".arrow": pl.scan_ipc, ".ipc": pl.scan_ipc}
+    files = sorted(p for p in path.iterdir() if p.suffix in scan) if path.is_dir() else [path]
+    if not files:
+        return None, None
+
+    rows = None
+    if len({f.suffix for f in files}) == 1 and files[0].suffix in scan:
+        # NOTE: Only reads the row counts from the file metadata
+        rows = scan[files[0].suffix](files).select(pl.len()).collect().item()
+    return rows, sum(f.stat().st_size for f in files)
+
+
+def _bytes_copied() -> int:
+    return int(copy_report()["bytes_copied"].sum())
+
+
+class ProjectHooks:
+    def __init__(self, run_log_path: str = "data/08_reporting/run_log") -> None:
+        self.run_log_path = Path(run_log_path)
+        self._catalog: DataCatalog | None = None
+        self._session_id = "default"
+        self._lock = threading.Lock()
+        self._starts: dict[tuple[str, str, str], tuple[datetime, float]] = {}
+        self._events: dict[str, list[dict[str, Any]]] = {}
+        self._runs: dict[str, tuple[datetime, float, float, int, PeakRss]] = {}
+
+    def _parts_path(self, session_id: str) -> Path:
+        return self.run_log_path / session_id / "parts"
+
+    def _dataset(self, name: str) -> Any:
+        if self._catalog is None:
+            return None
+        try:
+            return self._catalog._get_dataset(name)  # type: ignore
+        except Exception:
+            return None
+
+    def _add_event(self, node: Node, **event: Any) -> None:
+        row = {k: None for k in EVENT_SCHEMA} | {"node": node.name, "namespace": node.namespace}
+        with self._lock:
+            self._events.setdefault(node.name, []).append(row | event)
+
+    def _flush(self, node: Node, suffix: str) -> None:
+        with self._lock:
+            events = self._events.pop(node.name, [])
+        if not events:
+            return
+
+        path = self._parts_path(self._session_id) / f"{node.name}.{suffix}.parquet"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        pl.DataFrame(events, schema=EVENT_SCHEMA, orient="row").write_parquet(path)
+
+    def _dataset_event(self, event: str, dataset_name: str, data: Any, node: Node) -> None:
+        key = (event, dataset_name, node.name)
+        start, t0 = self._starts.pop(key, (None, time.perf_counter()))
+        duration = time.perf_counter() - t0
+
+        dataset = self._dataset(dataset_name)
+        rows, nbytes = _data_size(data)
+        if rows is None:
+            rows, nbytes = _file_size(dataset)
+        self._add_event(
+            node,
+            event=event,
+            dataset=dataset_name,
+            dataset_type=type(dataset).__name__ if dataset is not None else None,
+            start=start,
+            duration_s=duration,
+            rows=rows,
+            bytes=nbytes,
+        )
+
+    @hook_impl
+    def after_catalog_created(self, catalog: DataCatalog) -> None:
+        self._catalog = catalog
+
+    @hook_impl
+    def before_pipeline_run(self, run_params: dict[str, Any]) -> None:
+        self._session_id = run_params["session_id"]
+        shutil.rmtree(self._parts_path(self._session_id), ignore_errors=True)
+
+    @hook_impl
+    def before_dataset_loaded(self, dataset_name: str, node: Node) -> None:
+        self._starts["load", dataset_name, node.name] = (
+            datetime.now(timezone.utc),
+            time.perf_counter(),
+        )
+
+    @hook_impl
+    def after_dataset_loaded(self, dataset_name: str, data: Any, node: Node) -> None:
+        self._dataset_event("load", dataset_name, data, node)
+
+    @hook_impl
+    def before_node_run(self, node: Node, session_id: str) -> None:
+        self._session_id = session_id
+        rss = PeakRss(interval=0.05)
+        rss.start()
+        self._runs[node.name] = (
+            datetime.now(timezone.utc),
+            time.perf_counter(),
+            time.process_time(),
+            _bytes_copied(),
+            rss,
+        )
+
+    def _after_run(self, node: Node, error: Exception | None) -> None:
+        start, t0, cpu0, copied0, rss = self._runs.pop(node.name)
+        duration, cpu_time = time.perf_counter() - t0, time.process_time() - cpu0
+        rss.stop()
+
+        self._add_event(
+            node,
+            event="run",
+            start=start,
+            duration_s=duration,
+            cpu_time_s=cpu_time,
+            peak_rss_delta_mib=(rss.peak - rss.start_rss) / _MIB,
+            bytes_copied=_bytes_copied() - copied0,
+            error=repr(error) if error is not None else None,
+        )
+        self._flush(node, "run")
+
+    @hook_impl
+    def after_node_run(self, node: Node) -> None:
+        self._after_run(node, None)
+
+    @hook_impl
+    def on_node_error(self, error: Exception, node: Node) -> None:
+        self._after_run(node, error)
+
+    @hook_impl
+    def before_dataset_saved(self, dataset_name: str, node: Node) -> None:
+        self._starts["save", dataset_name, node.name] = (
+            datetime.now(timezone.utc),
+            time.perf_counter(),
+        )
+
+    @hook_impl
+    def after_dataset_saved(self, dataset_name: str, data: Any, node: Node) -> None:
+        self._dataset_event("save", dataset_name, data, node)
+        self._flush(node, f"save.{dataset_name}.{time.time_ns()}")
+
+    @hook_impl
+    def after_pipeline_run(self, run_params: dict[str, Any]) -> None:
+        self._write_run_log(run_params["session_id"])
+
+    @hook_impl
+    def on_pipeline_error(self, run_params: dict[str, Any]) -> None:
+        self._write_run_log(run_params["session_id"])
+
+    def _write_run_log(self, session_id: str) -> None:
+        parts = self._parts_path(session_id)
+        if not parts.exists():
+            return
+
+        run_dir = parts.parent
+        events = pl.read_parquet(parts / "*.parquet").sort("start")
+        events.write_parquet(run_dir / "events.parquet")
+        nodes = summarize(events)
+        nodes.write_parquet(run_dir / "nodes.parquet")
+        (run_dir / "profile.folded").write_text(folded_stacks(events))
+        shutil.rmtree(parts)
+
+        with pl.Config(tbl_rows=10, tbl_width_chars=160, fmt_str_lengths=60):
+            logger.info("Slowest nodes, run log in '%s':\n%s", run_dir, nodes.head(10))
+
+
+def summarize(events: pl.DataFrame) -> pl.DataFrame:
+    """Aggregate the events of a run log per node, slowest nodes first."""
+
+    def _sum(event: str, col: str) -> pl.Expr:
+        return pl.col(col).filter(pl.col("event") == event).sum()
+
+    return (
+        events.group_by("node", "namespace")
+        .agg(
+            _sum("load", "duration_s").alias("load_time_s"),
+            _sum("run", "duration_s").alias("run_time_s"),
+            _sum("save", "duration_s").alias("save_time_s"),
+            _sum("run", "cpu_time_s").alias("cpu_time_s"),
+            _sum("run", "peak_rss_delta_mib").alias("peak_rss_delta_mib"),
+            _sum("run", "bytes_copied").alias("bytes_copied"),
+            _sum("load", "rows").alias("input_rows"),
+            _sum("load", "bytes").alias("input_bytes"),
+            _sum("save", "rows").alias("output_rows"),
+            _sum("save", "bytes").alias("output_bytes"),
+            pl.col("error").drop_nulls().first(),
+        )
+        .with_columns(
+            pl.sum_horizontal("load_time_s", "run_time_s", "save_time_s").alias("total_time_s")
+        )
+        .sort("total_time_s", descending=True)
+    )
+
+
+def folded_stacks(events: pl.DataFrame) -> str:
+    """Event durations in microseconds as `namespace;node;event[;dataset] value` lines."""
+    frames = pl.concat_list(
+        pl.col("namespace").fill_null("").str.split("."),
+        pl.col("node").str.split(".").list.last(),
+        pl.col("event"),
+        pl.col("dataset").fill_null(""),
+    ).list.eval(pl.element().filter(pl.element() != ""))
+
+    folded = events.group_by(frames.list.join(";").alias("stack")).agg(
+        (pl.col("duration_s").sum() * 1e6).round().cast(pl.Int64).alias("us")
+    )
+    return "".join(f"{stack} {us}\n" for stack, us in folded.sort("stack").iter_rows())
@@ -1,3 +1,15 @@
+from .cv_folds import CVFoldsDataset
+from .handoff import HandoffDataset
+from .ipc import LazyIpcDataset
+from .parts import ParquetPartsDataset
 from .polars import LazyPolarsDataset
+from .wide_csv import WideToLongCsvDataset
 
-__all__ = ["LazyPolarsDataset"]
+__all__ = [
+    "CVFoldsDataset",
+    "HandoffDataset",
+    "LazyIpcDataset",
+    "LazyPolarsDataset",
+    "ParquetPartsDataset",
+    "WideToLongCsvDataset",
+]
@@ -0,0 +1,159 @@
+import hashlib
+import json
+import os
+import shutil
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Any
+
+import polars as pl
+from kedro.io import AbstractDataset, DatasetError
+
+from vn1_sales_forecast.cv import CVFolds
+
+_LATEST_FILE = "LATEST"
+_SUCCESS_FILE = "_SUCCESS"
+_SOURCE_FILE = "_source.json"
+
+
+def _files(path: Path) -> list[Path]:
+    return sorted(p for p in path.rglob("*") if p.is_file()) if path.is_dir() else [path]
+
+
+def _stat_path(path: Path) -> list[list[Any]]:
+    """Names, sizes and modification times of a file or of all files of a directory."""
+    stats = [(file, file.stat()) for file in _files(path)]
+    return [[str(f.relative_to(path)), st.st_size, st.st_mtime_ns] for f, st in stats]
+
+
+def _hash_path(path: Path, chunk_size: int = 1 << 20) -> str:
+    """Content hash of a file, or of the names and contents of all files of a directory."""
+    h = hashlib.sha256()
+    for file in _files(path):
+        h.update(str(file.relative_to(path)).encode())
+        with file.open("rb") as f:
+            while chunk := f.read(chunk_size):
+                h.update(chunk)
+    return h.hexdigest()
+
+
+class CVFoldsDataset(AbstractDataset[tuple[dict[str, Any], Iterable], CVFolds]):
+    """Caches the cv folds of a source dataset as memory-mapped Arrow IPC files.
+
+    The folds are stored under a key derived from the content hash of `source_filepath`, a
+    file or a directory of parts, and the cv parameters, so they are written once per data
+    version and reused by every consumer. The dataset is saved with a `(cv, folds)` tuple
+    where `folds` is a lazy iterable of `(train, test)` frames, which is only consumed if
+    the key is not cached yet.
+
+    Loading checks that the latest folds were split from the current source data with the
+    `cv` parameters and raises otherwise, so that stale folds are never backtested on. The
+    content hash of the source is stored with the folds, along with the sizes and
+    modification times of its files, and only recomputed on load if those changed.
+    """
+
+    def __init__(
+        self,
+        *,
+        filepath: str,
+        source_filepath: str,
+        cv: dict[str, Any] | None = None,
+        keep_versions: int = 3,
+        metadata: dict[str, Any] | None = None,
+    ) -> None:
+        self._filepath = Path(filepath)
+        self._source_filepath = Path(source_filepath)
+        self._cv = cv
+        self._keep_versions = keep_versions
+        self.metadata = metadata
+
+    def _describe(self) -> dict[str, Any]:
+        return {
+            "filepath": str(self._filepath),
+            "source_filepath": str(self._source_filepath),
+            "cv": self._cv,
+            "keep_versions": self._keep_versions,
+        }
+
+    def _key(self, cv: dict[str, Any], source_hash: str) -> str:
+        h = hashlib.sha256()
+        h.update(source_hash.encode())
+        h.update(json.dumps(cv, sort_keys=True, default=str).encode())
+        return h.hexdigest()[:16]
+
+    def _write_source(self, fold_dir: Path, source_hash: str) -> None:
+        source = {"hash": source_hash, "files": _stat_path(self._source_filepath)}
+        tmp = fold_dir / f"{_SOURCE_FILE}.tmp"
+        tmp.write_text(json.dumps(source))
+        tmp.replace(fold_dir / _SOURCE_FILE)
+
+    def _source_hash(self, fold_dir: Path) -> str:
+        """Content hash of the source, read from `fold_dir` if its files did not change."""
+        source_file = fold_dir / _SOURCE_FILE
+        saved = json.loads(source_file.read_text()) if source_file.exists() else None
+        if saved is not None and saved["files"] == _stat_path(self._source_filepath):
+            return saved["hash"]
+
+        source_hash = _hash_path(self._source_filepath)
+        if saved is not None and saved["hash"] == source_hash:
+            # NOTE: Only the modification times changed, e.g. by a rebuild with the same data
+            self._write_source(fold_dir, source_hash)
+        return source_hash
+
+    def _latest_key(self) -> str | None:
+        latest = self._filepath / _LATEST_FILE
+        return latest.read_text().strip() if latest.exists() else None
+
+    def _load(self) -> CVFolds:
+        key = self._latest_key()
+        if key is None or not (self._filepath / key / _SUCCESS_FILE).exists():
+            raise DatasetError(f"No cached cv folds found in '{self._filepath}'.")
+        fold_dir = self._filepath / key
+        if self._cv is not None and key != self._key(self._cv, self._source_hash(fold_dir)):
+            raise DatasetError(
+                f"The cached cv folds in '{self._filepath}' were not split from the current "
+                f"'{self._source_filepath}' with the cv parameters {self._cv}. Run the "
+                "'make_cv_folds' node to split them again."
+            )
+
+        folds: CVFolds = []
+        for train_path in sorted(fold_dir.glob("*_train.arrow")):
+            test_path = train_path.with_name(train_path.name.replace("_train", "_test"))
+            train = pl.scan_ipc(train_path, memory_map=True)
+            test = pl.scan_ipc(test_path, memory_map=True)
+            folds.append((train, test))
+        return folds
+
+    def _save(self, data: tuple[dict[str, Any], Iterable]) -> None:
+        cv, folds = data
+        source_hash = _hash_path(self._source_filepath)
+        key = self._key(cv, source_hash)
+        fold_dir = self._filepath / key
+
+        if not (fold_dir / _SUCCESS_FILE).exists():
+            shutil.rmtree(fold_dir, ignore_errors=True)
+            fold_dir.mkdir(parents=True)
+
+            for i, (train, test) in enumerate(folds):
+                # NOTE: IPC files are written uncompressed so that they can be memory-mapped
+                for name, df in [("train", train), ("test", test)]:
+                    path = fold_dir / f"{i:03d}_{name}.arrow"
+                    df.lazy().collect().write_ipc(path, compression="uncompressed")
+
+            (fold_dir / _SUCCESS_FILE).touch()
+        else:
+            os.utime(fold_dir)
+        self._write_source(fold_dir, source_hash)
+
+        (self._filepath / _LATEST_FILE).write_text(key)
+        self._evict(keep=key)
+
+    def _evict(self, keep: str) -> None:
+        fold_dirs = [d for d in self._filepath.iterdir() if d.is_dir() and d.name != keep]
+        fold_dirs = sorted(fold_dirs, key=lambda d: d.stat().st_mtime, reverse=True)
+        for d in fold_dirs[max(self._keep_versions - 1, 0) :]:
+            shutil.rmtree(d, ignore_errors=True)
+
+    def _exists(self) -> bool:
+        key = self._latest_key()
+        return key is not None and (self._filepath / key / _SUCCESS_FILE).exists()
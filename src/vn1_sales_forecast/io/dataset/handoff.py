@@ -0,0 +1,69 @@
+import pickle
+from pathlib import Path
+from typing import Any
+
+import polars as pl
+from kedro.io import AbstractDataset, DatasetError
+
+_SUFFIXES = {"LazyFrame": ".lazy.arrow", "DataFrame": ".arrow", "pickle": ".pkl"}
+
+
+class HandoffDataset(AbstractDataset[Any, Any]):
+    """Passes the intermediate data of a parallel run between processes through files.
+
+    Polars frames are written as uncompressed Arrow IPC files and loaded memory-mapped, so
+    all processes which load a frame share the pages of one file instead of unpickling their
+    own copies. Lazy frames are loaded as lazy scans of the file. All other objects are
+    pickled. The files are removed when the dataset is released.
+    """
+
+    def __init__(self, *, filepath: str, metadata: dict[str, Any] | None = None) -> None:
+        self._filepath = Path(filepath)
+        self.metadata = metadata
+
+    def _describe(self) -> dict[str, Any]:
+        return {"filepath": str(self._filepath)}
+
+    def _path(self, kind: str) -> Path:
+        return self._filepath.with_name(self._filepath.name + _SUFFIXES[kind])
+
+    def _saved(self) -> tuple[str, Path] | None:
+        for kind in _SUFFIXES:
+            if (path := self._path(kind)).exists():
+                return kind, path
+        return None
+
+    def _load(self) -> Any:
+        saved = self._saved()
+        if saved is None:
+            raise DatasetError(f"No data has been handed off at '{self._filepath}'.")
+
+        kind, path = saved
+        if kind == "LazyFrame":
+            return pl.scan_ipc(path, memory_map=True)
+        if kind == "DataFrame":
+            return pl.read_ipc(path, memory_map=True)
+        return pickle.loads(path.read_bytes())
+
+    def _save(self, data: Any) -> None:
+        self._release()
+        self._filepath.parent.mkdir(parents=True, exist_ok=True)
+
+        if isinstance(data, pl.LazyFrame | pl.DataFrame):
+            path = self._path(type(data).__name__)
+            tmp = path.with_name(f"{path.name}.tmp")
+            # NOTE: IPC files are written uncompressed so that they can be memory-mapped
+            data.lazy().collect().write_ipc(tmp, compression="uncompressed")
+        else:
+            path = self._path("pickle")
+            tmp = path.with_name(f"{path.name}.tmp")
+            tmp.write_bytes(pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL))
+        # NOTE: Consumers only ever see complete files
+        tmp.replace(path)
+
+    def _exists(self) -> bool:
+        return self._saved() is not None
+
+    def _release(self) -> None:
+        for kind in _SUFFIXES:
+            self._path(kind).unlink(missing_ok=True)
@@ -0,0 +1,59 @@
+from pathlib import Path
+from typing import Any, Literal
+
+import polars as pl
+from kedro.io import AbstractDataset, DatasetError
+from kedro_datasets._typing import TablePreview
+
+PolarsFrame = pl.DataFrame | pl.LazyFrame
+
+
+class LazyIpcDataset(AbstractDataset[PolarsFrame, pl.LazyFrame]):
+    """Drop-in for `LazyPolarsDataset` which stores the frame as an Arrow IPC file.
+
+    Uncompressed files are scanned memory-mapped, so loads neither decode nor copy the data
+    and the pages are shared by all processes which load the dataset. `compression="lz4"`
+    trades this for smaller files, which are decompressed on every load.
+    """
+
+    def __init__(
+        self,
+        *,
+        filepath: str,
+        compression: Literal["uncompressed", "lz4", "zstd"] = "uncompressed",
+        load_args: dict[str, Any] | None = None,
+        save_args: dict[str, Any] | None = None,
+        metadata: dict[str, Any] | None = None,
+    ) -> None:
+        self._filepath = Path(filepath)
+        self._compression = compression
+        self._load_args = {"memory_map": True} | (load_args or {})
+        self._save_args = save_args or {}
+        self.metadata = metadata
+
+    def _describe(self) -> dict[str, Any]:
+        return {
+            "filepath": str(self._filepath),
+            "compression": self._compression,
+            "load_args": self._load_args,
+            "save_args": self._save_args,
+        }
+
+    def _load(self) -> pl.LazyFrame:
+        if not self._filepath.exists():
+            raise DatasetError(f"No Arrow IPC file found at '{self._filepath}'.")
+        return pl.scan_ipc(self._filepath, **self._load_args)
+
+    def _save(self, data: PolarsFrame) -> None:
+        self._filepath.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self._filepath.with_name(f"{self._filepath.name}.tmp")
+        data.lazy().collect().write_ipc(tmp, compression=self._compression, **self._save_args)
+        # NOTE: Replacing the file keeps the old pages valid for processes which still map it
+        tmp.replace(self._filepath)
+
+    def _exists(self) -> bool:
+        return self._filepath.exists()
+
+    def preview(self) -> TablePreview:
+        d = self._load().head(10).collect().to_pandas().to_dict(orient="split")
+        return TablePreview(d)
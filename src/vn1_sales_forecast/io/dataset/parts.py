@@ -0,0 +1,81 @@
+from pathlib import Path
+from typing import Any
+
+import polars as pl
+from kedro.io import AbstractDataset, DatasetError
+from kedro_datasets._typing import TablePreview
+
+PolarsFrame = pl.DataFrame | pl.LazyFrame
+
+
+class ParquetPartsDataset(AbstractDataset[PolarsFrame, pl.LazyFrame]):
+    """Stores a frame as a directory of Parquet parts, which are scanned as one frame.
+
+    Saving replaces all parts, unless `append=True`, where the data is added as one more part.
+    An append therefore only writes the new rows instead of rewriting the whole history. With
+    `sort_by`, every part is saved sorted and several parts are merged in that order on load,
+    so that an appended dataset loads like a full rebuild. Otherwise the parts are loaded in
+    the order they were written.
+    """
+
+    def __init__(
+        self,
+        *,
+        filepath: str,
+        append: bool = False,
+        sort_by: list[str] | None = None,
+        load_args: dict[str, Any] | None = None,
+        save_args: dict[str, Any] | None = None,
+        metadata: dict[str, Any] | None = None,
+    ) -> None:
+        self._filepath = Path(filepath)
+        self._append = append
+        self._sort_by = sort_by or []
+        self._load_args = load_args or {}
+        self._save_args = save_args or {}
+        self.metadata = metadata
+
+    def _describe(self) -> dict[str, Any]:
+        return {
+            "filepath": str(self._filepath),
+            "append": self._append,
+            "sort_by": self._sort_by,
+            "load_args": self._load_args,
+            "save_args": self._save_args,
+        }
+
+    def _parts(self) -> list[Path]:
+        return sorted(self._filepath.glob("part-*.parquet"))
+
+    def _load(self) -> pl.LazyFrame:
+        parts = self._parts()
+        if not parts:
+            raise DatasetError(f"No Parquet parts found in '{self._filepath}'.")
+        lf = pl.scan_parquet(parts, **self._load_args)
+        if self._sort_by and len(parts) > 1:
+            lf = lf.sort(self._sort_by)
+        return lf
+
+    def _save(self, data: PolarsFrame) -> None:
+        lf = data.lazy()
+        df = (lf.sort(self._sort_by) if self._sort_by else lf).collect()
+        parts = self._parts()
+        if self._append and df.is_empty():
+            return
+
+        self._filepath.mkdir(parents=True, exist_ok=True)
+        n = int(parts[-1].stem.removeprefix("part-")) + 1 if self._append and parts else 0
+        path = self._filepath / f"part-{n:06d}.parquet"
+        tmp = path.with_suffix(".tmp")
+        df.write_parquet(tmp, **self._save_args)
+        if not self._append:
+            for part in parts:
+                part.unlink()
+        tmp.replace(path)
+
+    def _exists(self) -> bool:
+        return bool(self._parts())
+
+    def preview(self) -> TablePreview:
+        d = self._load().head(10).collect().to_pandas().to_dict(orient="split")
+        return TablePreview(d)
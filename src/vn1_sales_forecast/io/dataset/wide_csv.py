@@ -0,0 +1,119 @@
+import os
+import re
+import shutil
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+import polars as pl
+from kedro.io import AbstractDataset, DatasetError
+
+# Parts of a version of the CSV file, and of a conversion in progress by a process
+_KEY_PATTERN = re.compile(r"\d+-\d+")
+_TMP_PATTERN = re.compile(r"\d+-\d+\.tmp-\d+")
+
+
+class WideToLongCsvDataset(AbstractDataset[None, pl.LazyFrame]):
+    """Reads a wide CSV file with one column per date into a long frame.
+
+    The file is streamed in row batches and every batch is unpivoted on its own and written
+    to an Arrow IPC part under `parts_path`, so neither the wide nor the long frame is ever
+    materialized as a whole. The parts are kept per version of the CSV file and loaded as a
+    memory-mapped lazy scan. The output has the columns `*id_cols`, `date` and `value`.
+
+    The parts of older versions are removed on conversion. Conversions of other processes
+    are left alone unless they did not write for `tmp_max_age` seconds.
+    """
+
+    def __init__(
+        self,
+        *,
+        filepath: str,
+        id_cols: list[str] | None = None,
+        date_format: str = r"%Y-%m-%d",
+        batch_size: int = 10_000,
+        parts_path: str | None = None,
+        tmp_max_age: float = 3600.0,
+        metadata: dict[str, Any] | None = None,
+    ) -> None:
+        self._filepath = Path(filepath)
+        self._id_cols = id_cols or ["Client", "Warehouse", "Product"]
+        self._date_format = date_format
+        self._batch_size = batch_size
+        self._parts_path = Path(parts_path or f"{filepath}.parts")
+        self._tmp_max_age = tmp_max_age
+        self.metadata = metadata
+
+    def _describe(self) -> dict[str, Any]:
+        return {
+            "filepath": str(self._filepath),
+            "id_cols": self._id_cols,
+            "date_format": self._date_format,
+            "batch_size": self._batch_size,
+            "parts_path": str(self._parts_path),
+            "tmp_max_age": self._tmp_max_age,
+        }
+
+    def _evict(self, keep: Path) -> None:
+        for old in self._parts_path.glob("*"):
+            if old == keep or not old.is_dir():
+                continue
+            is_stale_tmp = (
+                _TMP_PATTERN.fullmatch(old.name) is not None
+                and time.time() - old.stat().st_mtime > self._tmp_max_age
+            )
+            if _KEY_PATTERN.fullmatch(old.name) or is_stale_tmp:
+                shutil.rmtree(old, ignore_errors=True)
+
+    def _load(self) -> pl.LazyFrame:
+        if not self._filepath.exists():
+            raise DatasetError(f"No CSV file found at '{self._filepath}'.")
+        stat = self._filepath.stat()
+        parts_dir = self._parts_path / f"{stat.st_size}-{stat.st_mtime_ns}"
+
+        if not parts_dir.exists():
+            self._evict(keep=parts_dir)
+            tmp = parts_dir.with_name(f"{parts_dir.name}.tmp-{os.getpid()}")
+            tmp.mkdir(parents=True)
+            self._write_parts(tmp)
+            # NOTE: Loads of other processes only ever see complete parts
+            try:
+                tmp.rename(parts_dir)
+            except OSError:
+                shutil.rmtree(tmp, ignore_errors=True)
+
+        parts = sorted(parts_dir.glob("*.arrow"))
+        if not parts:
+            raise DatasetError(f"No rows found in '{self._filepath}'.")
+        return pl.scan_ipc(parts, memory_map=True)
+
+    def _write_parts(self, parts_dir: Path) -> None:
+        schema = pl.scan_csv(self._filepath).collect_schema()
+        date_cols = [c for c in schema.names() if c not in self._id_cols]
+
+        # Parse the dates once from the header instead of once per row
+        dates = {c: datetime.strptime(c, self._date_format).date() for c in date_cols}
+        date_expr = pl.col("date").replace_strict(dates, return_dtype=pl.Date)
+
+        reader = pl.read_csv_batched(
+            self._filepath,
+            schema_overrides={c: schema[c] if c in self._id_cols else pl.Float32 for c in schema},
+            batch_size=self._batch_size,
+        )
+
+        i = 0
+        while batches := reader.next_batches(1):
+            for batch in batches:
+                df = batch.unpivot(index=self._id_cols, variable_name="date", value_name="value")
+                # NOTE: IPC parts are written uncompressed so that they can be memory-mapped
+                df.with_columns(date_expr).write_ipc(
+                    parts_dir / f"{i:06d}.arrow", compression="uncompressed"
+                )
+                i += 1
+
+    def _save(self, data: None) -> None:
+        raise DatasetError(f"{self.__class__.__name__} is read-only.")
+
+    def _exists(self) -> bool:
+        return self._filepath.exists()
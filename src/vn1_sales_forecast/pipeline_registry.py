@@ -3,6 +3,7 @@ from kedro.pipeline import Pipeline
 from vn1_sales_forecast.pipelines import (
     analytics,
     classification,
+    cv_folds,
     data_wrangling,
     divine_model,
     ensemble_classification,
@@ -56,6 +57,7 @@ def register_pipelines() -> dict[str, Pipeline]:
 
     pipelines = (
         {
+            "cv_folds": cv_folds.create_pipeline(),
             "tsfeatures": tsfeatures.create_pipeline(),
             "classification": classification.create_pipeline(),
             "analytics": analytics.create_pipeline(),
@@ -75,6 +77,10 @@ def register_pipelines() -> dict[str, Pipeline]:
 
     pipelines["__default__"] = sum(pipelines.values(), Pipeline([]))
 
+    # NOTE: The append mode writes `primary_sales` as well and is therefore not part of the
+    # default pipeline
+    pipelines["data_wrangling_append"] = data_wrangling.create_append_pipeline()
+
     pipelines["full_eval"] = (
         pipelines["model_post_processing"]
         + pipelines["model_evaluation"]
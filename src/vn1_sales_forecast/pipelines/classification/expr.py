@@ -1,14 +1,25 @@
-import numpy as np
 import polars as pl
 
 
-def _longest_streak_of_ones(e: pl.Expr) -> pl.Expr:
-    def _inner(arr: np.ndarray) -> int:
-        arr = 1 - arr
-        r = np.max(np.bincount(np.cumsum(arr))) - 1
-        return int(r)
+def new_group(keys: list[str]) -> pl.Expr:
+    """Whether a row starts a new group of a frame sorted by `keys` and date."""
+    return pl.any_horizontal(pl.col(k) != pl.col(k).shift() for k in keys).fill_null(True)
 
-    return e.cast(pl.Int32).map_batches(_inner, returns_scalar=True, return_dtype=pl.Int64)  # type: ignore
+
+def _streak_length(e: pl.Expr, keys: list[str]) -> pl.Expr:
+    """Length of the streak of true `e` up to every row of a frame sorted by `keys` and date."""
+    row = pl.int_range(pl.len())
+    # NOTE: The first streak of a group is counted one shorter, which the class thresholds
+    # are tuned on
+    return row - pl.when(e.not_() | new_group(keys)).then(row).forward_fill()
+
+
+def streaks(keys: list[str]) -> list[pl.Expr]:
+    """Streak lengths of the rows which the `cls_*` expressions aggregate per group."""
+    return [
+        _streak_length(pl.col("sales") != 0, keys).alias("nonzero_streak"),
+        _streak_length(pl.col("sales") == 0, keys).alias("zero_streak"),
+    ]
 
 
 def cls_all_zero() -> pl.Expr:
@@ -20,7 +31,7 @@ def cls_trailing_zero() -> pl.Expr:
 
 
 def cls_sparse() -> pl.Expr:
-    non_continuous_expr = (pl.col("sales") != 0).pipe(_longest_streak_of_ones) <= 4
+    non_continuous_expr = pl.col("nonzero_streak").max() <= 4
     sparse_expr = (pl.col("sales") == 0).mean() > 0.4
     return non_continuous_expr & sparse_expr
 
@@ -30,9 +41,10 @@ def cls_small_sales() -> pl.Expr:
 
 
 def cls_gaps() -> pl.Expr:
-    nonzero_streak_expr = (pl.col("sales") == 0).pipe(_longest_streak_of_ones) >= 13
-    return nonzero_streak_expr & cls_trailing_zero.not_() & cls_sparse.not_()  # type: ignore
+    nonzero_streak_expr = pl.col("zero_streak").max() >= 13
+    return nonzero_streak_expr & cls_trailing_zero().not_() & cls_sparse().not_()
 
 
 def cls_seasonal() -> pl.Expr:
-    return (pl.col("tsfeatures_seas_acf1") > 0.55).all() & (pl.len() > 52)
+    """Evaluated per group on the aggregated `n_obs` and the joined tsfeatures."""
+    return (pl.col("tsfeatures_seas_acf1") > 0.55) & (pl.col("n_obs") > 52)
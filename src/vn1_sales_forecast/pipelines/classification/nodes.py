@@ -1,26 +1,46 @@
-from typing import Any
-
 import polars as pl
 import polars.selectors as cs
 
-from vn1_sales_forecast.cv import split_cv
+from vn1_sales_forecast.cv import CVFolds
 from vn1_sales_forecast.settings import CLASS_PREFIX
 
-from .expr import cls_all_zero, cls_seasonal, cls_small_sales, cls_sparse, cls_trailing_zero
+from .expr import (
+    cls_all_zero,
+    cls_seasonal,
+    cls_small_sales,
+    cls_sparse,
+    cls_trailing_zero,
+    new_group,
+    streaks,
+)
+
+
+def _classify_sales(
+    sales: pl.LazyFrame, tsfeatures: pl.LazyFrame, keys: list[str] | None = None
+) -> pl.LazyFrame:
+    keys = keys or ["id"]
 
+    # NOTE: The groups and streaks are computed on rows sorted by `keys` and date, so the
+    # groups are numbered by a sorted column
+    group = new_group(keys).cum_sum().set_sorted().alias("group")
+    seas_acf1 = tsfeatures.select(*keys, "tsfeatures_seas_acf1")
 
-def _classify_sales(sales: pl.LazyFrame, tsfeatures: pl.LazyFrame) -> pl.LazyFrame:
     # Classify sales
     class_splits = (
-        sales.join(tsfeatures, on="id")
-        .group_by("id")
+        sales.sort(*keys, "date")
+        .with_columns(group, *streaks(keys))
+        .group_by("group")
         .agg(
+            *(pl.col(k).first() for k in keys),
             cls_all_zero().alias(f"{CLASS_PREFIX}all_zero"),
             cls_trailing_zero().alias(f"{CLASS_PREFIX}trailing_zero"),
             cls_sparse().alias(f"{CLASS_PREFIX}sparse"),
             cls_small_sales().alias(f"{CLASS_PREFIX}small_sales"),
-            cls_seasonal().alias(f"{CLASS_PREFIX}seasonal"),
+            pl.len().alias("n_obs"),
         )
+        .join(seas_acf1, on=keys)
+        .with_columns(cls_seasonal().alias(f"{CLASS_PREFIX}seasonal"))
+        .drop("group", "n_obs", "tsfeatures_seas_acf1")
     )
 
     # Add class column
@@ -32,21 +52,12 @@ def _classify_sales(sales: pl.LazyFrame, tsfeatures: pl.LazyFrame) -> pl.LazyFra
     return class_splits
 
 
-def calculate_cv_classification(
-    sales: pl.LazyFrame, cv_tsfeatures: pl.LazyFrame, cv: dict[str, Any]
-) -> pl.LazyFrame:
-    class_dfs: list[pl.LazyFrame] = []
-    for cv_train, _ in list(split_cv(sales, **cv)):
-        cutoff_expr = pl.col("date").max().dt.offset_by("1w").alias("cutoff_date")
-        cutoffs = cv_train.group_by("id").agg(cutoff_expr)
-
-        tsfeatures = cv_tsfeatures.join(cutoffs, on=["id", "cutoff_date"]).drop("cutoff_date")
-
-        c = _classify_sales(cv_train, tsfeatures)
-        c = c.join(cutoffs, on="id")
-        class_dfs.append(c)
+def calculate_cv_classification(cv_folds: CVFolds, cv_tsfeatures: pl.LazyFrame) -> pl.LazyFrame:
+    # NOTE: All windows are classified in a single aggregation by series and cutoff
+    cutoff_expr = pl.col("date").max().over("id").dt.offset_by("1w").alias("cutoff_date")
+    sales = pl.concat([cv_train.with_columns(cutoff_expr) for cv_train, _ in cv_folds])
 
-    return pl.concat(class_dfs)
+    return _classify_sales(sales, cv_tsfeatures, ["id", "cutoff_date"])
 
 
 def calculate_live_classification(
@@ -10,9 +10,8 @@ def create_pipeline() -> Pipeline:
             node(
                 calculate_cv_classification,
                 inputs=[
-                    "primary_sales",
+                    "cv_folds",
                     "cv_tsfeatures",
-                    "params:cv",
                 ],
                 outputs="cv_classification",
             ),
@@ -28,9 +27,9 @@ def create_pipeline() -> Pipeline:
         namespace="classification",
         inputs={
             "primary_sales",
+            "cv_folds",
             "cv_tsfeatures",
             "live_tsfeatures",
         },
         outputs={"cv_classification", "live_classification"},
-        parameters={"cv"},
     )
@@ -0,0 +1,14 @@
+from collections.abc import Iterator
+from typing import Any
+
+import polars as pl
+
+from vn1_sales_forecast.cv import split_cv
+
+
+def make_cv_folds(
+    sales: pl.LazyFrame, cv: dict[str, Any]
+) -> tuple[dict[str, Any], Iterator[tuple[pl.LazyFrame, pl.LazyFrame]]]:
+    # NOTE: The folds are generated lazily and only materialized by `CVFoldsDataset` if they
+    # are not already cached for the current version of the sales data.
+    return cv, split_cv(sales, **cv)
@@ -0,0 +1,21 @@
+from kedro.pipeline import Pipeline, node
+from kedro.pipeline.modular_pipeline import pipeline
+
+from .nodes import make_cv_folds
+
+
+def create_pipeline() -> Pipeline:
+    return pipeline(
+        [
+            node(
+                make_cv_folds,
+                inputs=["primary_sales", "params:cv"],
+                outputs="cv_folds",
+                name="make_cv_folds",
+            ),
+        ],
+        namespace="cv_folds",
+        inputs={"primary_sales"},
+        outputs={"cv_folds"},
+        parameters={"cv"},
+    )
@@ -1,15 +1,37 @@
 import polars as pl
 
+from vn1_sales_forecast.expr import SERIES_ID_BITS, series_id, series_label
 
-def join_dfs(*dfs: pl.LazyFrame, name: str) -> pl.LazyFrame:
-    def to_long(df: pl.LazyFrame) -> pl.LazyFrame:
-        idx_cols = ["Client", "Warehouse", "Product"]
-        df = df.melt(id_vars=idx_cols, variable_name="date", value_name=name)
-        df = df.with_columns(pl.col(name).cast(pl.Float32))
-        return df
 
+def _to_long(df: pl.LazyFrame, name: str) -> pl.LazyFrame:
+    idx_cols = ["Client", "Warehouse", "Product"]
+
+    # Already in long format, e.g. loaded with `WideToLongCsvDataset`
+    if "value" in df.collect_schema().names():
+        return df.rename({"value": name}).with_columns(pl.col(name).cast(pl.Float32))
+
+    df = df.melt(id_vars=idx_cols, variable_name="date", value_name=name)
+    df = df.with_columns(pl.col(name).cast(pl.Float32))
+    return df
+
+
+def _check_series_keys(df: pl.LazyFrame, idx_cols: list[str]) -> None:
+    # Keys which do not fit into their bits would produce colliding ids
+    keys = pl.col(idx_cols).cast(pl.Int64)
+    bounds = [
+        pl.min_horizontal(keys.min()).alias("low"),
+        pl.max_horizontal(keys.max()).alias("high"),
+    ]
+    low, high = df.select(bounds).collect().row(0)
+    if low is not None and (low < 0 or high >= 2**SERIES_ID_BITS):
+        raise ValueError(
+            f"Series keys must be in [0, {2**SERIES_ID_BITS}), found keys in [{low}, {high}]."
+        )
+
+
+def join_dfs(*dfs: pl.LazyFrame, name: str) -> pl.LazyFrame:
     # Convert all dataframes to long format
-    dfs_long = [to_long(df) for df in dfs]
+    dfs_long = [_to_long(df, name) for df in dfs]
 
     # Add phase number to the date column
     dfs_long = [df.with_columns(pl.lit(i).alias("phase")) for i, df in enumerate(dfs_long)]
@@ -26,22 +48,77 @@ def join_price_dfs(*dfs: pl.LazyFrame) -> pl.LazyFrame:
     return join_dfs(*dfs, name="price")
 
 
+def join_new_dfs(primary: pl.LazyFrame, *dfs: pl.LazyFrame, name: str) -> pl.LazyFrame:
+    idx_cols = ["Client", "Warehouse", "Product"]
+    known_dates = set(
+        primary.select(pl.col("date").unique().dt.strftime(r"%Y-%m-%d")).collect().to_series()
+    )
+
+    # Melt only the date columns which are not yet part of the primary data
+    dfs_long: list[pl.LazyFrame] = []
+    for i, df in enumerate(dfs):
+        cols = df.collect_schema().names()
+        new_date_cols = [c for c in cols if c not in idx_cols and c not in known_dates]
+        if not new_date_cols:
+            continue
+
+        _check_series_keys(df, idx_cols)
+        df_long = _to_long(df.select(*idx_cols, *new_date_cols), name)
+        dfs_long.append(df_long.with_columns(pl.lit(i).alias("phase")))
+
+    if not dfs_long:
+        return _to_long(dfs[-1], name).with_columns(pl.lit(0).alias("phase")).clear()
+    return pl.concat(dfs_long)
+
+
+def join_new_sales_dfs(primary: pl.LazyFrame, *dfs: pl.LazyFrame) -> pl.LazyFrame:
+    return join_new_dfs(primary, *dfs, name="sales")
+
+
+def join_new_price_dfs(primary: pl.LazyFrame, *dfs: pl.LazyFrame) -> pl.LazyFrame:
+    return join_new_dfs(primary, *dfs, name="price")
+
+
 def join_into_cube(sales: pl.LazyFrame, price: pl.LazyFrame) -> pl.LazyFrame:
     idx_cols = ["Client", "Warehouse", "Product"]
 
+    _check_series_keys(sales, idx_cols)
+
+    date_expr = pl.col("date")
+    if sales.collect_schema()["date"] == pl.String:
+        date_expr = date_expr.str.to_date(r"%Y-%m-%d")
+
     return (
         sales.join(price, on=[*idx_cols, "date", "phase"], how="left")
         .with_columns(
             pl.col(["sales", "price"]).cast(pl.Float32),
-            pl.col("date").str.to_date(r"%Y-%m-%d"),
-            pl.concat_str(idx_cols, separator="-").alias("id"),
+            date_expr,
+            series_id(idx_cols).alias("id"),
         )
-        .sort([*idx_cols, "date"])
+        .sort("id", "date")
     )
 
 
 def remove_leading_zeros(cube: pl.LazyFrame) -> pl.LazyFrame:
-    idx_cols = ["Client", "Warehouse", "Product"]
     non_zero_sales = pl.col("sales").is_not_null() & (pl.col("sales") > 0)
-    leading_zero_mask = (non_zero_sales.cum_sum() >= 1).over(idx_cols)
-    return cube.sort([*idx_cols, "date"]).filter(leading_zero_mask)
+    leading_zero_mask = (non_zero_sales.cum_sum() >= 1).over("id")
+    return cube.sort("id", "date").filter(leading_zero_mask)
+
+
+def make_series_labels(sales: pl.LazyFrame) -> pl.DataFrame:
+    idx_cols = ["Client", "Warehouse", "Product"]
+    labels = sales.select("id", *idx_cols).unique().sort("id").collect()
+    return labels.with_columns(series_label("id").alias("label"))
+
+
+def append_to_primary(primary: pl.LazyFrame, cube_delta: pl.LazyFrame) -> pl.LazyFrame:
+    known_ids = primary.select("id").unique()
+
+    # Leading zeros of known series were already removed, so new weeks are kept as they are.
+    # Series which had no sales so far still need their leading zeros removed.
+    known_delta = cube_delta.join(known_ids, on="id", how="semi")
+    new_delta = remove_leading_zeros(cube_delta.join(known_ids, on="id", how="anti"))
+
+    # Only the new rows are returned, which are saved as one more part of the primary data
+    cols = primary.collect_schema().names()
+    return pl.concat([known_delta, new_delta]).select(cols).sort("id", "date")
@@ -1,7 +1,16 @@
 from kedro.pipeline import Pipeline, node
 from kedro.pipeline.modular_pipeline import pipeline
 
-from .nodes import join_into_cube, join_price_dfs, join_sales_dfs, remove_leading_zeros
+from .nodes import (
+    append_to_primary,
+    join_into_cube,
+    join_new_price_dfs,
+    join_new_sales_dfs,
+    join_price_dfs,
+    join_sales_dfs,
+    make_series_labels,
+    remove_leading_zeros,
+)
 
 
 def create_pipeline() -> Pipeline:
@@ -9,13 +18,13 @@ def create_pipeline() -> Pipeline:
         [
             node(
                 join_sales_dfs,
-                inputs=["raw_Sales_phase_0", "raw_Sales_phase_1"],
+                inputs=["raw_long_Sales_phase_0", "raw_long_Sales_phase_1"],
                 outputs="raw_sales_data",
                 name="join_sales_dfs",
             ),
             node(
                 join_price_dfs,
-                inputs=["raw_Price_phase_0", "raw_Price_phase_1"],
+                inputs=["raw_long_Price_phase_0", "raw_long_Price_phase_1"],
                 outputs="raw_price_data",
                 name="join_price_dfs",
             ),
@@ -31,8 +40,65 @@ def create_pipeline() -> Pipeline:
                 outputs="primary_sales",
                 name="remove_leading_zeros",
             ),
+            node(
+                make_series_labels,
+                inputs="primary_sales",
+                outputs="primary_series_labels",
+                name="make_series_labels",
+            ),
+        ],
+        namespace="data_wrangling",
+        inputs={
+            "raw_long_Sales_phase_0",
+            "raw_long_Sales_phase_1",
+            "raw_long_Price_phase_0",
+            "raw_long_Price_phase_1",
+        },
+        outputs={"primary_sales", "primary_series_labels"},
+    )
+
+
+def create_append_pipeline() -> Pipeline:
+    return pipeline(
+        [
+            node(
+                join_new_sales_dfs,
+                inputs=["previous_primary_sales", "raw_Sales_phase_0", "raw_Sales_phase_1"],
+                outputs="raw_sales_delta_data",
+                name="join_new_sales_dfs",
+            ),
+            node(
+                join_new_price_dfs,
+                inputs=["previous_primary_sales", "raw_Price_phase_0", "raw_Price_phase_1"],
+                outputs="raw_price_delta_data",
+                name="join_new_price_dfs",
+            ),
+            node(
+                join_into_cube,
+                inputs=["raw_sales_delta_data", "raw_price_delta_data"],
+                outputs="cube_delta_data",
+                name="join_into_cube_delta",
+            ),
+            node(
+                append_to_primary,
+                inputs=["previous_primary_sales", "cube_delta_data"],
+                outputs="appended_primary_sales",
+                name="append_to_primary",
+            ),
+            node(
+                make_series_labels,
+                inputs="appended_primary_sales",
+                outputs="primary_series_labels",
+                name="make_series_labels",
+            ),
         ],
         namespace="data_wrangling",
-        inputs={"raw_Sales_phase_0", "raw_Sales_phase_1", "raw_Price_phase_0", "raw_Price_phase_1"},
-        outputs={"primary_sales"},
+        inputs={
+            "previous_primary_sales",
+            "raw_Sales_phase_0",
+            "raw_Sales_phase_1",
+            "raw_Price_phase_0",
+            "raw_Price_phase_1",
+        },
+        outputs={"appended_primary_sales", "primary_series_labels"},
     )
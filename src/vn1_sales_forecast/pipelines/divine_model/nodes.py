@@ -1,6 +1,7 @@
 import polars as pl
 
 from vn1_sales_forecast.cv import split_cv_loo
+from vn1_sales_forecast.expr import series_id_from_label
 from vn1_sales_forecast.settings import PRED_PREFIX
 from vn1_sales_forecast.utils import multi_join
 
@@ -49,7 +50,8 @@ def _calc_ensemble(classification: pl.LazyFrame, *forecast: pl.LazyFrame) -> pl.
             e = pl.when(pl.col("class") == cls).then(pl.col(PRED_PREFIX + model)).otherwise(e)
 
         # id model map
-        for id, model in ID_MODEL_MAP.items():
+        for label, model in ID_MODEL_MAP.items():
+            id = series_id_from_label(label)
             e = pl.when(pl.col("id") == id).then(PRED_PREFIX + model).otherwise(e)
 
         return e
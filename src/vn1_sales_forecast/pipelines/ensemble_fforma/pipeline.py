@@ -1,6 +1,8 @@
 from kedro.pipeline import Pipeline, node
 from kedro.pipeline.modular_pipeline import pipeline
 
+from vn1_sales_forecast.runner import resources
+
 from .nodes import calculate_cv_scores, cross_validate, live_forecast
 
 
@@ -22,6 +24,7 @@ def create_pipeline() -> Pipeline:
                 ],
                 outputs="cv_forecast",
                 name="cross_validate",
+                tags=resources(cpus=0.5),
             ),
             node(
                 live_forecast,
@@ -34,6 +37,7 @@ def create_pipeline() -> Pipeline:
                 ],
                 outputs="live_forecast",
                 name="live_forecast",
+                tags=resources(cpus=0.5),
             ),
         ],
         namespace="ensemble_fforma",
@@ -1,6 +1,8 @@
 from kedro.pipeline import Pipeline, node
 from kedro.pipeline.modular_pipeline import pipeline
 
+from vn1_sales_forecast.runner import resources
+
 from .nodes import cross_validate, live_forecast
 
 
@@ -12,6 +14,7 @@ def create_pipeline() -> Pipeline:
                 inputs=["model_cv_forecast", "primary_sales", "model_total_scores"],
                 outputs="cv_forecast",
                 name="cross_validate",
+                tags=resources(cpus=0.5),
             ),
             node(
                 live_forecast,
@@ -23,6 +26,7 @@ def create_pipeline() -> Pipeline:
                 ],
                 outputs="live_forecast",
                 name="live_forecast",
+                tags=resources(cpus=0.5),
             ),
         ],
         namespace="ensemble_optimal_weights",
@@ -5,10 +5,10 @@ import lightgbm as lgb
 import polars as pl
 from mlforecast import MLForecast
 from mlforecast.lag_transforms import ExponentiallyWeightedMean, RollingMean
-from tqdm import tqdm
 
-from vn1_sales_forecast.cv import split_cv
-from vn1_sales_forecast.pipelines.model_ml_recursive.nodes import _fit_predict
+from vn1_sales_forecast.arrow import track_copies
+from vn1_sales_forecast.cv import CVFolds
+from vn1_sales_forecast.pipelines.model_ml_recursive.nodes import _cross_validate, _fit_predict
 
 if typing.TYPE_CHECKING:
     from mlforecast import MLForecast
@@ -48,20 +48,15 @@ def create_model() -> "MLForecast":
     )
 
 
+@track_copies
 def cross_validate(
-    models: "MLForecast",
-    sales: pl.LazyFrame,
-    cv: dict[str, Any],
-) -> pl.DataFrame:
-    preds: list[pl.DataFrame] = []
-    for train, _ in tqdm(list(split_cv(sales, **cv))):
-        df, df_future = _make_data(train)
-        p = _fit_predict(models, df, df_future, direct=True)
-        p = p.with_columns(pl.col("date").min().over("id").alias("cutoff_date"))
-        preds.append(p)
-    return pl.concat(preds)
+    models: "MLForecast", cv_folds: CVFolds, warm_start: dict[str, Any]
+) -> tuple[pl.DataFrame, pl.DataFrame]:
+    windows = ((*_make_data(train), test) for train, test in cv_folds)
+    return _cross_validate(models, windows, warm_start, direct=True)
 
 
+@track_copies
 def live_forecast(models: "MLForecast", sales: pl.LazyFrame) -> pl.DataFrame:
     df, df_future = _make_data(sales)
     p = _fit_predict(models, df, df_future, direct=True)
@@ -1,6 +1,8 @@
 from kedro.pipeline import Pipeline, node
 from kedro.pipeline.modular_pipeline import pipeline
 
+from vn1_sales_forecast.runner import resources
+
 from .nodes import create_model, cross_validate, live_forecast
 
 
@@ -15,18 +17,20 @@ def create_pipeline() -> Pipeline:
             ),
             node(
                 cross_validate,
-                inputs=["model", "primary_sales", "params:cv"],
-                outputs="cv_forecast",
+                inputs=["model", "cv_folds", "params:warm_start"],
+                outputs=["cv_forecast", "cv_warm_start_scores"],
                 name="cross_validate",
+                tags=resources(cpus=0.5),
             ),
             node(
                 live_forecast,
                 inputs=["model", "primary_sales"],
                 outputs="live_forecast",
                 name="live_forecast",
+                tags=resources(cpus=0.5),
             ),
         ],
         namespace="model_ml_direct",
-        inputs={"primary_sales"},
-        parameters={"cv"},
+        inputs={"primary_sales", "cv_folds"},
+        parameters={"warm_start"},
     )
@@ -1,41 +1,104 @@
+from collections.abc import Callable
 from datetime import date, timedelta
+from functools import lru_cache
 
 import numpy as np
 import polars as pl
 from holidays import country_holidays
 
 
-def number_of_holidays(dates: pl.Expr) -> pl.Expr:
-    def _get_nb_hollidays(d: date) -> int:
-        countries = country_holidays("US", years=list(range(2020, 2024)))
-        ds = [d + timedelta(o) for o in range(7)]
-        hs = {h for d in ds if (h := countries.get(d)) is not None}
-        return len(hs)
+def _thanksgiving(year: int) -> date:
+    # Fourth Thursday of November
+    first = date(year, 11, 1)
+    return first + timedelta((3 - first.weekday()) % 7 + 21)
 
-    return dates.map_elements(_get_nb_hollidays, return_dtype=pl.Int64)
 
+@lru_cache
+def holiday_calendar(years: tuple[int, ...], countries: tuple[str, ...] = ("US",)) -> pl.DataFrame:
+    """Weekly holiday calendar keyed by the first day of the week.
+
+    Every day of the given years is a possible week start, so the calendar can be joined to
+    dates with any weekday. Looking up a date outside of the years raises, instead of
+    silently returning no holidays.
+    """
+    # NOTE: The weeks at the end of the last year reach into the following year
+    holiday_years = [*years, max(years) + 1]
+    holidays = pl.DataFrame(
+        [(d, c, n) for c in countries for d, n in country_holidays(c, years=holiday_years).items()],
+        schema={"date": pl.Date, "country": pl.String, "holiday": pl.String},
+        orient="row",
+    )
+    black_fridays = pl.DataFrame(
+        {"date": [_thanksgiving(y) + timedelta(1) for y in years]}, schema={"date": pl.Date}
+    )
+
+    # All week starts whose week contains the given date
+    week_starts = pl.date_ranges(pl.col("date").dt.offset_by("-6d"), "date").alias("week_start")
+    n_holidays = (
+        holidays.select(week_starts, pl.struct("country", "holiday").alias("h"))
+        .explode("week_start")
+        .group_by("week_start")
+        .agg(pl.col("h").n_unique().alias("n_holidays"))
+    )
+    # NOTE: Thanksgiving falls in [d + 1, d + 7], i.e. Black Friday in [d + 2, d + 8]
+    black_friday = (
+        black_fridays.select(week_starts.alias("bf_week"))
+        .explode("bf_week")
+        .select(pl.col("bf_week").dt.offset_by("-2d").alias("week_start"))
+        .with_columns(pl.lit(1).alias("is_black_friday"))
+    )
+
+    calendar = pl.date_range(date(min(years), 1, 1), date(max(years), 12, 31), eager=True)
+    return (
+        calendar.alias("week_start")
+        .to_frame()
+        .join(n_holidays, on="week_start", how="left")
+        .join(black_friday, on="week_start", how="left")
+        .fill_null(0)
+    )
 
-def is_chrismas(dates: pl.Expr) -> pl.Expr:
-    def _get_nb_hollidays(d: date) -> int:
-        ds = [d + timedelta(o) for o in range(7)]
-        hs = {d for d in ds if (d.day == 24 and d.month == 12)}
-        return len(hs)
 
-    return dates.map_elements(_get_nb_hollidays, return_dtype=pl.Int64)
+def _lookup(calendar: pl.DataFrame, column: str, dates: pl.Expr) -> pl.Expr:
+    first, last = calendar["week_start"].min(), calendar["week_start"].max()
+    # NOTE: MLForecast passes the dates as a series, expressions raise on unknown dates as well
+    if isinstance(dates, pl.Series) and not dates.drop_nulls().is_between(first, last).all():
+        raise ValueError(
+            f"Dates from {dates.min()} to {dates.max()} are outside of the holiday calendar "
+            f"from {first} to {last}, pass their `years`"
+        )
+    return dates.replace_strict(calendar["week_start"], calendar[column], return_dtype=pl.Int64)
 
 
-def is_back_friday(dates: pl.Expr) -> pl.Expr:
-    countries = country_holidays("US", years=list(range(2020, 2024)))
+def number_of_holidays(
+    years: tuple[int, ...] = tuple(range(2020, 2026)), countries: tuple[str, ...] = ("US",)
+) -> Callable[[pl.Expr], pl.Expr]:
+    calendar = holiday_calendar(years, countries)
+
+    def _inner(dates: pl.Expr) -> pl.Expr:
+        return _lookup(calendar, "n_holidays", dates)
+
+    _inner.__name__ = "number_of_holidays"
+    return _inner
 
-    def _get_nb_hollidays(d: date) -> int:
-        ds = [d + timedelta(o + 1) for o in range(7)]
-        hs = {countries.get(d) == "Thanksgiving" for d in ds}
-        return len(hs)
 
-    return dates.map_elements(_get_nb_hollidays, return_dtype=pl.Int64)
+def is_chrismas(dates: pl.Expr) -> pl.Expr:
+    # The week [d, d + 6] contains the 24th of December
+    return ((dates.dt.month() == 12) & dates.dt.day().is_between(18, 24)).cast(pl.Int64)
+
+
+def is_back_friday(
+    years: tuple[int, ...] = tuple(range(2020, 2026)),
+) -> Callable[[pl.Expr], pl.Expr]:
+    calendar = holiday_calendar(years)
+
+    def _inner(dates: pl.Expr) -> pl.Expr:
+        return _lookup(calendar, "is_black_friday", dates)
+
+    _inner.__name__ = "is_back_friday"
+    return _inner
 
 
-def fourier_term(sin: bool = True, K: int = 1):
+def fourier_term(sin: bool = True, K: int = 1) -> Callable[[pl.Expr], pl.Expr]:
     def _inner(date: pl.Expr) -> pl.Expr:
         t = date.dt.week() / 52
         v = 2 * np.pi * K * t
@@ -1,29 +1,35 @@
+import logging
 import typing
 import warnings
+from collections.abc import Iterable
+from time import perf_counter
 from typing import Any
 
 import lightgbm as lgb
 import polars as pl
 import polars.selectors as cs
 from mlforecast import MLForecast
-from mlforecast.lag_transforms import (
-    RollingMax,
-    RollingMean,
-    RollingMin,
-    RollingQuantile,
-    RollingStd,
-)
+from mlforecast.lag_transforms import RollingMax, RollingMin
 from mlforecast.target_transforms import LocalMinMaxScaler
 from tqdm import tqdm
 
-from vn1_sales_forecast.cv import split_cv
+from vn1_sales_forecast.arrow import collect, track_copies
+from vn1_sales_forecast.cv import CVFolds
+from vn1_sales_forecast.expr import competition_score
 from vn1_sales_forecast.settings import PRED_PREFIX
 
 from .date_features import fourier_term
+from .recursive import shared_features
+from .warm_start import FittedModels, fit_warm_start
+from .window_ops import RunningMean, RunningQuantile, RunningStd
 
 if typing.TYPE_CHECKING:
     from mlforecast import MLForecast
 
+logger = logging.getLogger(__name__)
+
+Window = tuple[pl.LazyFrame, pl.LazyFrame | None, pl.LazyFrame]
+
 
 def _make_data(sales: pl.LazyFrame) -> tuple[pl.LazyFrame, pl.LazyFrame | None]:
     df = sales.sort("id", "date").select(
@@ -81,13 +87,13 @@ def create_model() -> "MLForecast":
         target_transforms=[LocalMinMaxScaler()],
         lag_transforms={
             1: [
-                *[RollingMean(w, w // 4) for w in [13, 52]],
+                *[RunningMean(w, w // 4) for w in [13, 52]],
                 *[RollingMin(w, w // 4) for w in [52]],
                 *[RollingMax(w, w // 4) for w in [52]],
-                *[RollingStd(w, w // 4) for w in [52]],
-                *[RollingQuantile(q, w, w // 4) for w in [52] for q in [0.25, 0.5, 0.75]],
+                *[RunningStd(w, w // 4) for w in [52]],
+                *[RunningQuantile(q, w, w // 4) for w in [52] for q in [0.25, 0.5, 0.75]],
             ],
-            52: [RollingMean(min_samples=1, window_size=52)],
+            52: [RunningMean(min_samples=1, window_size=52)],
         },  # type: ignore
     )
 
@@ -97,13 +103,18 @@ def _fit_predict(
     df: pl.LazyFrame,
     df_future: pl.LazyFrame | None,
     direct: bool = False,
+    init_models: FittedModels | None = None,
+    warm_estimators: int = 0,
 ) -> pl.DataFrame:
+    # NOTE: The fold is collected once
+    data = collect(df)
+
     # 1. Fit
     with warnings.catch_warnings():
         warnings.filterwarnings("ignore")
 
         fit_kwargs = {
-            "df": df.collect(),  # type: ignore
+            "df": data,
             "id_col": "id",
             "time_col": "date",
             "target_col": "sales",
@@ -113,14 +124,20 @@ def _fit_predict(
         if direct:
             fit_kwargs["max_horizon"] = 13
 
-        model.fit(**fit_kwargs)
+        if init_models is None:
+            model.fit(**fit_kwargs)
+        else:
+            fit_warm_start(
+                model, init_models=init_models, n_estimators=warm_estimators, **fit_kwargs
+            )
 
     # 2. Predict
-    p: pl.DataFrame = model.predict(
-        h=13,
-        new_df=df.collect(),  # type: ignore
-        X_df=None if df_future is None else df_future.collect(),  # type: ignore
-    )
+    # NOTE: The fitted series are forecasted, so they are not passed again as `new_df`
+    with shared_features(model):
+        p: pl.DataFrame = model.predict(
+            h=13,
+            X_df=None if df_future is None else collect(df_future),  # type: ignore
+        )
 
     # 3. Add id and date columns
     p = p.select(
@@ -130,20 +147,94 @@ def _fit_predict(
     return p
 
 
-def cross_validate(
+def _warm_start_scores(warm: pl.DataFrame, full: pl.DataFrame, test: pl.LazyFrame) -> pl.DataFrame:
+    sales = collect(test, "id", "date", "sales")
+
+    def _score(p: pl.DataFrame, name: str) -> pl.DataFrame:
+        return (
+            p.join(sales, on=["id", "date"])
+            .unpivot(index=["id", "date", "sales"], variable_name="model", value_name="pred")
+            .with_columns(pl.col("model").str.strip_prefix(PRED_PREFIX))
+            .group_by("model")
+            .agg(competition_score(pl.col("pred"), pl.col("sales")).cast(pl.Float64).alias(name))
+        )
+
+    return _score(warm, "score_warm").join(_score(full, "score_full"), on="model")
+
+
+def _cross_validate(
     models: "MLForecast",
-    sales: pl.LazyFrame,
-    cv: dict[str, Any],
-) -> pl.DataFrame:
+    windows: Iterable[Window],
+    warm_start: dict[str, Any],
+    direct: bool = False,
+) -> tuple[pl.DataFrame, pl.DataFrame]:
+    """Fit and predict the cv windows from the oldest to the most recent cutoff.
+
+    With `warm_start.enabled`, every window continues boosting from the models of the
+    previous window and the models are retrained from scratch every
+    `warm_start.full_retrain_every` windows. With `warm_start.compare`, the warm-started
+    windows are also retrained from scratch to report the score and time differences.
+    """
     preds: list[pl.DataFrame] = []
-    for train, _ in tqdm(list(split_cv(sales, **cv))):
-        df, df_future = _make_data(train)
-        p = _fit_predict(models, df, df_future)
-        p = p.with_columns(pl.col("date").min().over("id").alias("cutoff_date"))
-        preds.append(p)
-    return pl.concat(preds)
+    scores: list[pl.DataFrame] = []
+    init_models: FittedModels | None = None
+    for i, (df, df_future, test) in enumerate(tqdm(windows)):
+        warm = warm_start["enabled"] and i % warm_start["full_retrain_every"] != 0
+
+        start = perf_counter()
+        p = _fit_predict(
+            models,
+            df,
+            df_future,
+            direct=direct,
+            init_models=init_models if warm else None,
+            warm_estimators=warm_start["n_estimators"],
+        )
+        fit_time = perf_counter() - start
+        init_models = models.models_
+
+        if warm and warm_start["compare"]:
+            start = perf_counter()
+            p_full = _fit_predict(models, df, df_future, direct=direct)
+            s = _warm_start_scores(p, p_full, test).with_columns(
+                pl.lit(fit_time).alias("fit_time_warm"),
+                pl.lit(perf_counter() - start).alias("fit_time_full"),
+                pl.lit(p["date"].min(), dtype=pl.Date).alias("cutoff_date"),
+            )
+            scores.append(s)
+            logger.info(
+                "Warm start window %d: score %+.4f, fit time %.1fs vs %.1fs",
+                i,
+                (s["score_warm"] - s["score_full"]).mean(),
+                fit_time,
+                s["fit_time_full"][0],
+            )
+
+        preds.append(p.with_columns(pl.col("date").min().over("id").alias("cutoff_date")))
+
+    schema = {
+        "model": pl.String,
+        "score_warm": pl.Float64,
+        "score_full": pl.Float64,
+        "fit_time_warm": pl.Float64,
+        "fit_time_full": pl.Float64,
+        "cutoff_date": pl.Date,
+    }
+    warm_start_scores = pl.concat(scores) if scores else pl.DataFrame(schema=schema)
+    return pl.concat(preds), warm_start_scores.with_columns(
+        (pl.col("score_warm") - pl.col("score_full")).alias("score_diff")
+    )
+
+
+@track_copies
+def cross_validate(
+    models: "MLForecast", cv_folds: CVFolds, warm_start: dict[str, Any]
+) -> tuple[pl.DataFrame, pl.DataFrame]:
+    windows = ((*_make_data(train), test) for train, test in cv_folds)
+    return _cross_validate(models, windows, warm_start)
 
 
+@track_copies
 def live_forecast(models: "MLForecast", sales: pl.LazyFrame, direct: bool = False) -> pl.DataFrame:
     df, df_future = _make_data(sales)
     p = _fit_predict(models, df, df_future)
@@ -0,0 +1,164 @@
+import types
+import typing
+from collections.abc import Callable, Generator
+from contextlib import contextmanager
+from typing import Any
+
+import numpy as np
+import utilsforecast.processing as ufp
+from coreforecast.lag_transforms import RollingQuantile
+from mlforecast.grouped_array import GroupedArray
+from mlforecast.lag_transforms import _BaseLagTransform
+
+if typing.TYPE_CHECKING:
+    from mlforecast import MLForecast
+    from mlforecast.core import TimeSeries
+    from sklearn.base import BaseEstimator
+
+
+def _tile(ga: GroupedArray, k: int) -> GroupedArray:
+    n_obs = ga.data.size
+    indptr = np.append((ga.indptr[:-1] + n_obs * np.arange(k)[:, None]).ravel(), k * n_obs)
+    return GroupedArray(np.tile(ga.data, k), indptr)
+
+
+class _RollingWindow:
+    """The last `window_size` values of every series, updated in place at every step.
+
+    The values are stored in a ring buffer, which is enough for order-independent
+    statistics. Series shorter than the window are padded with NaN in the oldest slots.
+    """
+
+    def __init__(self, ga: GroupedArray, window_size: int) -> None:
+        idx = ga.indptr[1:, None] - window_size + np.arange(window_size)
+        self.values = np.where(idx >= ga.indptr[:-1, None], ga.data[np.maximum(idx, 0)], np.nan)
+        self.values = self.values.astype(ga.data.dtype)
+        self.count = np.minimum(np.diff(ga.indptr), window_size)
+        self.window_size = window_size
+        self._pos = 0
+
+    def append(self, y: np.ndarray) -> None:
+        self.values[:, self._pos] = y
+        self.count = np.minimum(self.count + 1, self.window_size)
+        self._pos = (self._pos + 1) % self.window_size
+
+    def quantiles(self, ps: list[float]) -> list[np.ndarray]:
+        # NOTE: Linear interpolation between the closest ranks, like coreforecast
+        values = np.sort(self.values, axis=1)
+        rows = np.arange(values.shape[0])
+        out = []
+        for p in ps:
+            pos = p * (self.count - 1)
+            lo = np.floor(pos).astype(np.int64)
+            hi = np.minimum(lo + 1, self.count - 1)
+            frac = (pos - lo).astype(values.dtype)
+            out.append(values[rows, lo] + (values[rows, hi] - values[rows, lo]) * frac)
+        return out
+
+
+def _split_quantiles(
+    transforms: dict[str, Any], ga: GroupedArray
+) -> tuple[dict[str, Any], dict[str, RollingQuantile]]:
+    # NOTE: The ring buffer does not propagate NaN like `skipna=False` does
+    if np.isnan(ga.data).any():
+        return transforms, {}
+
+    rest, quantiles = {}, {}
+    for name, tfm in transforms.items():
+        core = getattr(tfm, "_core_tfm", None)
+        if isinstance(core, RollingQuantile) and core.lag == 1 and not core.skipna:
+            quantiles[name] = core
+        else:
+            rest[name] = tfm
+    return rest, quantiles
+
+
+def _predict_recursive_shared(
+    self: "TimeSeries",
+    models: dict[str, "BaseEstimator"],
+    horizon: int,
+    before_predict_callback: Callable | None = None,
+    after_predict_callback: Callable | None = None,
+    X_df: Any = None,
+) -> Any:
+    """Replacement of `TimeSeries._predict_recursive` that shares the feature computation.
+
+    The series are stacked once per model, so that every step computes the lag transforms
+    of all model trajectories in a single pass and the date and static features only once.
+    Each booster is then evaluated on its block of the shared feature matrix. Rolling
+    quantiles are updated from a ring buffer of the last window instead of coreforecast's
+    per-series update.
+    """
+    n, k = len(self.uids), len(models)
+    rows = np.tile(np.arange(n), k)
+
+    with self._backup():
+        self.ga = _tile(self.ga, k)
+        for name, tfm in self.transforms.items():
+            if isinstance(tfm, _BaseLagTransform):
+                self.transforms[name] = tfm.take(rows)
+        statics = ufp.take_rows(self.static_features_, rows)
+
+        transforms, quantiles = _split_quantiles(self.transforms, self.ga)
+        windows = {
+            w: _RollingWindow(self.ga, w) for w in {q.window_size for q in quantiles.values()}
+        }
+
+        self._predict_setup()
+        for h in range(horizon):
+            self.curr_dates = ufp.offset_times(self.curr_dates, self.freq, 1)
+            self.test_dates.append(self.curr_dates)
+
+            features = self._compute_transforms(transforms, updates_only=True) if transforms else {}
+            for w, window in windows.items():
+                names = [name for name, q in quantiles.items() if q.window_size == w]
+                values = window.quantiles([quantiles[name].p for name in names])
+                for name, v in zip(names, values):
+                    min_samples = quantiles[name].min_samples or w
+                    features[name] = np.where(window.count >= min_samples, v, np.nan)
+            for feature in self.date_features:
+                name, values = self._compute_date_feature(self.curr_dates, feature)
+                features[name] = np.tile(np.asarray(values), k)
+
+            x = ufp.horizontal_concat([statics, type(statics)(features)[self.features]])
+            if X_df is not None:
+                x_h = ufp.take_rows(X_df, np.arange(h, X_df.shape[0], horizon)[rows])
+                x = ufp.horizontal_concat([x, ufp.drop_index_if_pandas(x_h)])
+            x = x[self.features_order_]
+            if self.as_numpy:
+                x = ufp.to_numpy(x)
+            if before_predict_callback is not None:
+                x = before_predict_callback(x)
+
+            y = np.concatenate(
+                [model.predict(x[i * n : (i + 1) * n]) for i, model in enumerate(models.values())]
+            )
+            if after_predict_callback is not None:
+                y = after_predict_callback(y)
+            self._update_y(y)
+            for window in windows.values():
+                window.append(y)
+
+        y_pred = np.stack(self.y_pred)
+
+    self.y_pred = []
+    preds = type(statics)(
+        {
+            self.id_col: self._get_future_ids(horizon),
+            self.time_col: np.array(self.test_dates).ravel("F"),
+        }
+    )
+    for i, name in enumerate(models):
+        preds = ufp.assign_columns(preds, name, y_pred[:, i * n : (i + 1) * n].ravel("F"))
+    return preds
+
+
+@contextmanager
+def shared_features(model: "MLForecast") -> Generator["MLForecast", None, None]:
+    """Predict all models of a fitted `MLForecast` with `_predict_recursive_shared`."""
+    predict = types.MethodType(_predict_recursive_shared, model.ts)
+    model.ts._predict_recursive = predict  # type: ignore
+    try:
+        yield model
+    finally:
+        del model.ts._predict_recursive
@@ -0,0 +1,51 @@
+import typing
+from typing import Any
+
+import lightgbm as lgb
+import numpy as np
+from sklearn.base import BaseEstimator, clone
+from utilsforecast import processing as ufp
+
+if typing.TYPE_CHECKING:
+    import polars as pl
+    from mlforecast import MLForecast
+
+FittedModels = dict[str, BaseEstimator | list[BaseEstimator]]
+
+
+def _fit_estimator(
+    model: BaseEstimator, X: Any, y: np.ndarray, init: BaseEstimator | None, n_estimators: int
+) -> BaseEstimator:
+    if init is None or not isinstance(init, lgb.LGBMModel):
+        return clone(model).fit(X, y)
+    # NOTE: The booster of the previous window is kept and `n_estimators` trees are added
+    return clone(model).set_params(n_estimators=n_estimators).fit(X, y, init_model=init.booster_)
+
+
+def fit_warm_start(
+    model: "MLForecast",
+    df: "pl.DataFrame",
+    init_models: FittedModels,
+    n_estimators: int,
+    **fit_kwargs: Any,
+) -> "MLForecast":
+    """Like `MLForecast.fit`, but continues boosting from the models of a previous fit."""
+    X, y = model.preprocess(df, return_X_y=True, **fit_kwargs)
+
+    # NOTE: Mirrors `MLForecast.fit_models`, which has one model per horizon for direct fits
+    model.models_ = {}
+    for name, estimator in model.models.items():
+        init = init_models.get(name)
+        if y.ndim == 2 and y.shape[1] > 1:
+            inits = init if isinstance(init, list) else [None] * y.shape[1]
+            model.models_[name] = []
+            for col in range(y.shape[1]):
+                keep = ~np.isnan(y[:, col])
+                Xh = X[keep] if isinstance(X, np.ndarray) else ufp.filter_with_mask(X, keep)
+                model.models_[name].append(
+                    _fit_estimator(estimator, Xh, y[keep, col], inits[col], n_estimators)
+                )
+        else:
+            fitted = _fit_estimator(estimator, X, y, init, n_estimators)
+            model.models_[name] = fitted  # type: ignore
+    return model
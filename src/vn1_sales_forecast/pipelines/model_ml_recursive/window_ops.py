@@ -1,7 +1,9 @@
+import copy
 import operator as op
+from collections.abc import Sequence
 
 import numpy as np
-from mlforecast.lag_transforms import Combine, Offset, RollingMean
+from mlforecast.lag_transforms import Combine, Offset, RollingMean, _BaseLagTransform
 from numba import njit
 
 
@@ -13,36 +15,331 @@ def Momentum(w):
     return Combine(RollingMean(w), Offset(RollingMean(w), w), op.truediv)
 
 
+# Running window statistics. Every statistic is defined by three kernels on the state row of
+# a series: `push` adds a value to the window, `pop` removes the oldest value and `value`
+# reads the statistic. `count` is the number of values in the window before a push and
+# including the value of a pop. NaN values are skipped like coreforecast's `skipna=True`: the
+# series start at their first value and `min_samples` counts the rows of the window since,
+# except for the standard deviation, which needs `min_samples` values.
+
+
+# NOTE: Welford's update of the mean `state[0]` and the sum of squared deviations `state[1]`,
+# which unlike the sums of the values and their squares does not cancel catastrophically.
+@njit
+def _moments_push(state, count, x):
+    delta = x - state[0]
+    state[0] += delta / (count + 1)
+    state[1] += delta * (x - state[0])
+
+
 @njit
-def rolling_zero_shares(x, window_size: int = 7) -> np.ndarray:
-    n_samples = len(x)
-    result = np.full(n_samples, np.nan)
+def _moments_pop(state, count, x):
+    if count <= 1:
+        state[0] = 0.0
+        state[1] = 0.0
+        return
+    delta = x - state[0]
+    state[0] -= delta / (count - 1)
+    state[1] = max(state[1] - delta * (x - state[0]), 0.0)
 
-    if n_samples < window_size:
-        return result
 
-    for i in range(window_size, n_samples):
-        xs = x[i - window_size + 1 : i + 1]
-        result[i] = np.sum(xs == 0) / window_size
-    return result
+@njit
+def _mean_value(state, count, window_size, p):
+    return state[0]
+
+
+@njit
+def _std_value(state, count, window_size, p):
+    if count < 2:
+        return np.nan
+    return np.sqrt(state[1] / (count - 1))
+
+
+@njit
+def _zeros_push(state, count, x):
+    state[0] += x == 0
+
+
+@njit
+def _zeros_pop(state, count, x):
+    state[0] -= x == 0
+
+
+@njit
+def _zeros_value(state, count, window_size, p):
+    return state[0] / count
+
+
+# NOTE: `state[1]` holds the sum of the values weighted by their position in the window,
+# which shifts by the window sum whenever the oldest value leaves the window.
+@njit
+def _slope_push(state, count, x):
+    state[0] += x
+    state[1] += count * x
+
+
+@njit
+def _slope_pop(state, count, x):
+    state[0] -= x
+    state[1] -= state[0]
+
+
+@njit
+def _slope_value(state, count, window_size, p):
+    if count < 2:
+        return np.nan
+    sxx = count * (count * count - 1) / 12
+    return (state[1] - state[0] * (count - 1) / 2) / sxx
+
+
+# NOTE: The window is kept sorted, so the insert and the removal are an O(log w) binary search
+# but an O(w) shift of the values behind it. A balanced tree would make the update O(log w),
+# but for the short windows of the weekly features the shift of a contiguous buffer is cheaper.
+@njit
+def _sorted_push(state, count, x):
+    i = np.searchsorted(state[:count], x)
+    state[i + 1 : count + 1] = state[i:count].copy()
+    state[i] = x
+
+
+@njit
+def _sorted_pop(state, count, x):
+    i = np.searchsorted(state[:count], x)
+    state[i : count - 1] = state[i + 1 : count].copy()
+
+
+@njit
+def _quantile_value(state, count, window_size, p):
+    pos = p * (count - 1)
+    lo = int(np.floor(pos))
+    hi = min(lo + 1, count - 1)
+    return state[lo] + (state[hi] - state[lo]) * (pos - lo)
+
+
+@njit
+def _ready(count, first, end, window_size, min_samples, min_values):
+    return count >= min_values and first >= 0 and min(end - first + 1, window_size) >= min_samples
+
+
+@njit
+def _run(
+    data,
+    indptr,
+    lag,
+    window_size,
+    min_samples,
+    min_values,
+    p,
+    state,
+    counts,
+    firsts,
+    ends,
+    out,
+    updates_only,
+    push,
+    pop,
+    value,
+):
+    for i in range(len(indptr) - 1):
+        start, n = indptr[i], indptr[i + 1] - indptr[i]
+        # Window end of the last row, or of the next value for updates
+        target = n - lag if updates_only else n - 1 - lag
+        if target < ends[i]:
+            state[i] = 0.0
+            counts[i] = 0
+            firsts[i] = -1
+            ends[i] = -1
+
+        while ends[i] < target:
+            e = ends[i] + 1
+            x = data[start + e]
+            if not np.isnan(x):
+                push(state[i], counts[i], x)
+                counts[i] += 1
+                if firsts[i] < 0:
+                    firsts[i] = e
+            if e >= window_size:
+                x = data[start + e - window_size]
+                if not np.isnan(x):
+                    pop(state[i], counts[i], x)
+                    counts[i] -= 1
+            ends[i] = e
+            if not updates_only and _ready(
+                counts[i], firsts[i], e, window_size, min_samples, min_values
+            ):
+                out[start + e + lag] = value(state[i], counts[i], window_size, p)
+
+        if updates_only and _ready(
+            counts[i], firsts[i], ends[i], window_size, min_samples, min_values
+        ):
+            out[i] = value(state[i], counts[i], window_size, p)
+
+
+class _RunningBase(_BaseLagTransform):
+    """Rolling window statistic that keeps a running state per series.
+
+    `transform` builds the features of the training data in a single pass and keeps the
+    state of the last window of every series. The recursive `update` then only adds the new
+    value to the window and removes the oldest one, instead of recomputing the window.
+    NaN values are skipped like coreforecast's `skipna=True`.
+    """
+
+    _kernels: tuple
+    _state_size = 2
+    _counts_values = False
+    p = 0.0
+
+    def __init__(self, window_size: int, min_samples: int | None = None) -> None:
+        self.window_size = window_size
+        self.min_samples = min_samples
+
+    def _set_core_tfm(self, lag: int) -> "_RunningBase":
+        self.lag_ = lag
+        self._state = None
+        return self
+
+    def _reset(self, n_series: int) -> None:
+        size = self.window_size + 1 if self._state_size is None else self._state_size
+        self._state = np.zeros((n_series, size))
+        self._counts = np.zeros(n_series, dtype=np.int64)
+        self._firsts = np.full(n_series, -1, dtype=np.int64)
+        self._ends = np.full(n_series, -1, dtype=np.int64)
+
+    def _run(self, ga, updates_only: bool) -> np.ndarray:
+        n_series = len(ga.indptr) - 1
+        if self._state is None or len(self._state) != n_series:
+            self._reset(n_series)
+
+        out = np.full(n_series if updates_only else ga.data.size, np.nan)
+        min_samples = self.min_samples or self.window_size
+        _run(
+            ga.data,
+            ga.indptr,
+            self.lag_,
+            self.window_size,
+            min_samples,
+            min_samples if self._counts_values else 1,
+            self.p,
+            self._state,
+            self._counts,
+            self._firsts,
+            self._ends,
+            out,
+            updates_only,
+            *self._kernels,
+        )
+        return out.astype(ga.data.dtype)
+
+    def transform(self, ga) -> np.ndarray:
+        self._state = None
+        return self._run(ga, updates_only=False)
+
+    def update(self, ga) -> np.ndarray:
+        return self._run(ga, updates_only=True)
+
+    def take(self, idxs: np.ndarray) -> "_RunningBase":
+        out = copy.copy(self)
+        if self._state is not None:
+            out._state = self._state[idxs]
+            out._counts = self._counts[idxs]
+            out._firsts = self._firsts[idxs]
+            out._ends = self._ends[idxs]
+        return out
+
+    @staticmethod
+    def stack(transforms: Sequence["_RunningBase"]) -> "_RunningBase":
+        out = copy.copy(transforms[0])
+        if all(t._state is not None for t in transforms):
+            out._state = np.vstack([t._state for t in transforms])
+            out._counts = np.concatenate([t._counts for t in transforms])
+            out._firsts = np.concatenate([t._firsts for t in transforms])
+            out._ends = np.concatenate([t._ends for t in transforms])
+        else:
+            out._state = None
+        return out
+
+
+class RunningMean(_RunningBase):
+    _kernels = (_moments_push, _moments_pop, _mean_value)
+
+
+class RunningStd(_RunningBase):
+    _kernels = (_moments_push, _moments_pop, _std_value)
+    _counts_values = True
+
+
+class RunningZeroShare(_RunningBase):
+    _kernels = (_zeros_push, _zeros_pop, _zeros_value)
+
+
+class RunningSlope(_RunningBase):
+    _kernels = (_slope_push, _slope_pop, _slope_value)
+
+
+class RunningQuantile(_RunningBase):
+    """Rolling quantile with linear interpolation, like `np.quantile`.
+
+    The window is kept as a sorted buffer, so an update is O(w) rather than O(log w): the
+    binary search is logarithmic, but the insert and the removal shift the values behind them.
+    """
+
+    _kernels = (_sorted_push, _sorted_pop, _quantile_value)
+    _state_size = None
+
+    def __init__(self, p: float, window_size: int, min_samples: int | None = None) -> None:
+        super().__init__(window_size=window_size, min_samples=min_samples)
+        self.p = p
+
+
+@njit
+def rolling_zero_shares(x: np.ndarray, window_size: int = 7) -> np.ndarray:
+    out = np.full(len(x), np.nan)
+    state, counts = np.zeros((1, 1)), np.zeros(1, np.int64)
+    firsts, ends = np.full(1, -1, np.int64), np.full(1, -1, np.int64)
+    indptr = np.array([0, len(x)])
+    _run(
+        x,
+        indptr,
+        0,
+        window_size,
+        window_size,
+        1,
+        0.0,
+        state,
+        counts,
+        firsts,
+        ends,
+        out,
+        False,
+        _zeros_push,
+        _zeros_pop,
+        _zeros_value,
+    )
+    return out
 
 
 @njit
 def rolling_slope(x: np.ndarray, window_size: int = 7) -> np.ndarray:
-    n_samples = len(x)
-    result = np.full(n_samples, np.nan)
-
-    if n_samples < window_size:
-        return result
-
-    for i in range(window_size, n_samples):
-        xs = x[i - window_size + 1 : i + 1]
-
-        m = window_size - 1
-        xs_range_mean = m / 2
-        xs_range = np.arange(0, window_size)
-        xs_mean = xs.mean()
-        beta = np.dot(xs - xs_mean, xs_range - xs_range_mean) / (m * np.var(xs_range))
-        alpha = xs_mean - beta * xs_range_mean
-        result[i] = alpha
-    return result
+    out = np.full(len(x), np.nan)
+    state, counts = np.zeros((1, 2)), np.zeros(1, np.int64)
+    firsts, ends = np.full(1, -1, np.int64), np.full(1, -1, np.int64)
+    indptr = np.array([0, len(x)])
+    _run(
+        x,
+        indptr,
+        0,
+        window_size,
+        window_size,
+        1,
+        0.0,
+        state,
+        counts,
+        firsts,
+        ends,
+        out,
+        False,
+        _slope_push,
+        _slope_pop,
+        _slope_value,
+    )
+    return out
@@ -1,22 +1,27 @@
 import typing
+from collections.abc import Iterator
 from typing import Any
 
 import lightgbm as lgb
 import polars as pl
 from mlforecast import MLForecast
-from mlforecast.lag_transforms import (
-    RollingMax,
-    RollingMean,
-    RollingMin,
-    RollingQuantile,
-    RollingStd,
-)
+from mlforecast.lag_transforms import RollingMax, RollingMin
 from mlforecast.target_transforms import LocalMinMaxScaler
-from tqdm import tqdm
 
-from vn1_sales_forecast.cv import split_cv
+from vn1_sales_forecast.arrow import track_copies
+from vn1_sales_forecast.cv import CVFolds
 from vn1_sales_forecast.pipelines.model_ml_recursive.date_features import fourier_term
-from vn1_sales_forecast.pipelines.model_ml_recursive.nodes import _fit_predict, _make_data
+from vn1_sales_forecast.pipelines.model_ml_recursive.nodes import (
+    Window,
+    _cross_validate,
+    _fit_predict,
+    _make_data,
+)
+from vn1_sales_forecast.pipelines.model_ml_recursive.window_ops import (
+    RunningMean,
+    RunningQuantile,
+    RunningStd,
+)
 
 if typing.TYPE_CHECKING:
     from mlforecast import MLForecast
@@ -45,41 +50,40 @@ def create_model() -> "MLForecast":
         target_transforms=[LocalMinMaxScaler()],
         lag_transforms={
             1: [
-                *[RollingMean(w, w // 4) for w in [13, 52]],
+                *[RunningMean(w, w // 4) for w in [13, 52]],
                 *[RollingMin(w, w // 4) for w in [52]],
                 *[RollingMax(w, w // 4) for w in [52]],
-                *[RollingStd(w, w // 4) for w in [52]],
-                *[RollingQuantile(q, w, w // 4) for w in [52] for q in [0.25, 0.5, 0.75]],
+                *[RunningStd(w, w // 4) for w in [52]],
+                *[RunningQuantile(q, w, w // 4) for w in [52] for q in [0.25, 0.5, 0.75]],
             ],
-            52: [RollingMean(min_samples=1, window_size=52)],
+            52: [RunningMean(min_samples=1, window_size=52)],
         },  # type: ignore
     )
 
 
+@track_copies
 def cross_validate(
     models: "MLForecast",
-    sales: pl.LazyFrame,
+    cv_folds: CVFolds,
     cv_partitions: pl.LazyFrame,
-    cv: dict[str, Any],
-) -> pl.DataFrame:
-    preds: list[pl.DataFrame] = []
-    for train, _ in tqdm(list(split_cv(sales, **cv))):
-        cutoff_expr = pl.col("date").max().over("id").dt.offset_by("1w")
-        _train = (
-            train.with_columns(cutoff_expr.alias("cutoff_date"))
-            .join(cv_partitions, on=["id", "date", "cutoff_date"])
-            .filter(pl.col("partition") == pl.col("partition").max().over("id"))
-            .sort("id", "date", "cutoff_date")
-            .drop(["cutoff_date", "partition"])
-        )
+    warm_start: dict[str, Any],
+) -> tuple[pl.DataFrame, pl.DataFrame]:
+    def _windows() -> Iterator[Window]:
+        for train, test in cv_folds:
+            cutoff_expr = pl.col("date").max().over("id").dt.offset_by("1w")
+            _train = (
+                train.with_columns(cutoff_expr.alias("cutoff_date"))
+                .join(cv_partitions, on=["id", "date", "cutoff_date"])
+                .filter(pl.col("partition") == pl.col("partition").max().over("id"))
+                .sort("id", "date", "cutoff_date")
+                .drop(["cutoff_date", "partition"])
+            )
+            yield *_make_data(_train), test
 
-        df, df_future = _make_data(_train)
-        p = _fit_predict(models, df, df_future)
-        p = p.with_columns(pl.col("date").min().over("id").alias("cutoff_date"))
-        preds.append(p)
-    return pl.concat(preds)
+    return _cross_validate(models, _windows(), warm_start)
 
 
+@track_copies
 def live_forecast(
     models: "MLForecast",
     sales: pl.LazyFrame,
@@ -7,7 +7,7 @@ from neuralforecast import NeuralForecast
 from neuralforecast.models import KAN, NHITS
 from tqdm import tqdm
 
-from vn1_sales_forecast.cv import split_cv
+from vn1_sales_forecast.arrow import collect, track_copies
 from vn1_sales_forecast.pipelines.model_nn.losses import CustomLoss
 from vn1_sales_forecast.settings import PRED_PREFIX
 
@@ -46,7 +46,7 @@ def create_model() -> "NeuralForecast":
 def _fit_predict(
     model: "NeuralForecast", df: pl.LazyFrame, fit: bool = True
 ) -> tuple["NeuralForecast", pl.DataFrame]:
-    train = df.select("id", "date", "sales").collect()
+    train = collect(df, "id", "date", "sales")
     if fit:
         model.fit(
             train,  # type: ignore
@@ -65,17 +65,62 @@ def _fit_predict(
     return model, p
 
 
+def _cross_validate_block(
+    model: "NeuralForecast", df: pl.DataFrame, n_windows: int, step: int
+) -> pl.DataFrame:
+    # NOTE: One fit on the data before the first cutoff, all windows predicted in one pass
+    p: pl.DataFrame = model.cross_validation(
+        df=df,  # type: ignore
+        n_windows=n_windows,
+        step_size=step,
+        refit=False,
+        use_init_models=True,
+        id_col="id",
+        time_col="date",
+        target_col="sales",
+    )
+    return p.drop("sales")
+
+
+@track_copies
 def cross_validate(
-    model: "NeuralForecast", train: pl.LazyFrame, cv: dict[str, Any]
+    model: "NeuralForecast", sales: pl.LazyFrame, cv: dict[str, Any], refit: int | None
 ) -> pl.DataFrame:
+    """Backtest the models on the cv windows of `split_cv`, oldest window first.
+
+    The models are refitted every `refit` windows (only once if unset) on the data before
+    the first cutoff of the block and all windows of a block are predicted in a single
+    NeuralForecast `cross_validation` sweep.
+    """
+    h, n_windows, freq = cv["h"], cv["n_windows"], cv.get("freq", "w")
+    step = cv.get("step") or h
+    refit = refit or n_windows
+
+    df = collect(sales.sort("id", "date"), "id", "date", "sales")
+    first_date = df.group_by("id").agg(pl.col("date").min().alias("first_date"))
+
     preds: list[pl.DataFrame] = []
-    for i, (cv_train, _) in tqdm(list(enumerate(split_cv(train, **cv)))):
-        model, p = _fit_predict(model, cv_train, fit=(i == 0))
-        p = p.with_columns(pl.col("date").min().over("id").alias("cutoff_date"))
-        preds.append(p)
-    return pl.concat(preds)
+    for start in tqdm(range(0, n_windows, refit)):
+        block = min(refit, n_windows - start)
+        # NOTE: Windows are counted back from the end of each series, like in `split_cv`
+        offset = (n_windows - start - block) * step
+        max_date = pl.col("date").max().over("id")
+        block_df = df.filter(pl.col("date") <= max_date.dt.offset_by(f"-{offset}{freq}"))
+        preds.append(_cross_validate_block(model, block_df, n_windows=block, step=step))
+
+    # NOTE: Drop the windows in which a series has no training data, like `split_cv` does
+    p = pl.concat(preds).join(first_date, on="id").filter(pl.col("cutoff") >= pl.col("first_date"))
+    return p.select(
+        pl.col("id", "date"),
+        cs.exclude("id", "date", "cutoff", "first_date")
+        .fill_nan(0)
+        .clip(0)
+        .name.prefix(PRED_PREFIX),
+        pl.col("date").min().over("id", "cutoff").alias("cutoff_date"),
+    )
 
 
+@track_copies
 def live_forecast(model: "NeuralForecast", train: pl.LazyFrame) -> pl.DataFrame:
     model, p = _fit_predict(model, train, fit=True)
     return p
@@ -1,6 +1,8 @@
 from kedro.pipeline import Pipeline, node
 from kedro.pipeline.modular_pipeline import pipeline
 
+from vn1_sales_forecast.runner import resources
+
 from .nodes import create_model, cross_validate, live_forecast
 
 
@@ -10,15 +12,17 @@ def create_pipeline() -> Pipeline:
             node(create_model, inputs=None, outputs="model", name="create_model"),
             node(
                 cross_validate,
-                inputs=["model", "primary_sales", "params:cv"],
+                inputs=["model", "primary_sales", "params:cv", "params:refit"],
                 outputs="cv_forecast",
                 name="cross_validate",
+                tags=resources(cpus=0.5),
             ),
             node(
                 live_forecast,
                 inputs=["model", "primary_sales"],
                 outputs="live_forecast",
                 name="live_forecast",
+                tags=resources(cpus=0.5),
             ),
         ],
         namespace="model_nn",
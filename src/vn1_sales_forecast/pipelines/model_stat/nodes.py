@@ -1,13 +1,22 @@
+import copy
+import multiprocessing
 import typing
 import warnings
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 
 import polars as pl
 import polars.selectors as cs
 from tqdm import tqdm
 
-from vn1_sales_forecast.cv import split_cv
+from vn1_sales_forecast.arrow import collect, track_copies
+from vn1_sales_forecast.cv import CVFolds
+from vn1_sales_forecast.runner import node_cpus
 from vn1_sales_forecast.settings import PRED_PREFIX
 
+from .telemetry import TimedModel, collect_telemetry, predict
+
 if typing.TYPE_CHECKING:
     from statsforecast import StatsForecast
 
@@ -47,28 +56,28 @@ def create_model() -> "StatsForecast":
     ]
 
     return StatsForecast(
-        models=models,
-        fallback_model=HistoricAverage(),
+        models=[TimedModel(m) for m in models],
+        fallback_model=TimedModel(HistoricAverage(), is_fallback=True),
         freq="1w",
         n_jobs=-1,
         verbose=True,
     )
 
 
-def _fit_predict(model: "StatsForecast", df: pl.LazyFrame) -> pl.DataFrame:
+def _fit_predict(model: "StatsForecast", df: pl.LazyFrame | pl.DataFrame) -> pl.DataFrame:
     # Fit
     with warnings.catch_warnings():
         warnings.simplefilter("ignore")
 
         model.fit(
-            df.select("id", "date", "sales").collect(),  # type: ignore
+            collect(df, "id", "date", "sales"),  # type: ignore
             id_col="id",
             time_col="date",
             target_col="sales",
         )
 
     # Predict
-    p: pl.DataFrame = model.predict(h=13)  # type: ignore
+    p = predict(model, h=13)
 
     # Add id and date columns
     p = p.select(
@@ -78,17 +87,119 @@ def _fit_predict(model: "StatsForecast", df: pl.LazyFrame) -> pl.DataFrame:
     return p
 
 
-def cross_validate(
-    model: "StatsForecast", train: pl.LazyFrame, cv: dict[str, typing.Any]
-) -> pl.DataFrame:
+def _fit_predict_routed(
+    model: "StatsForecast",
+    df: pl.LazyFrame,
+    classification: pl.LazyFrame,
+    routing: dict[str, list[str]],
+) -> tuple[pl.DataFrame, pl.DataFrame]:
+    model_names = [repr(m) for m in model.models]
+    if routing and model.fallback_model is None:
+        raise ValueError("Routing needs a fallback model to predict the skipped models")
+    if unknown := {m for models in routing.values() for m in models} - set(model_names):
+        raise ValueError(f"Unknown models in routing: {sorted(unknown)}")
+
+    # NOTE: The fold is collected once and shared by all routes
+    data = collect(df, "id", "date", "sales")
+
+    # Group the series by the models which are fitted for their class
+    classes = (
+        data.lazy()
+        .select("id")
+        .unique()
+        .join(classification.select("id", "class"), on="id", how="left")
+    )
+    routes: dict[tuple[str, ...], list[int]] = defaultdict(list)
+    for cls, ids in classes.group_by("class").agg("id").collect().iter_rows():
+        routes[tuple(routing.get(cls, model_names))].extend(ids)
+
+    # NOTE: Skipped models predict the cheap fallback model, like a model which failed, so
+    # that the ensembles and scores get a forecast of every model for every series
+    placeholder = TimedModel(getattr(model.fallback_model, "model", model.fallback_model))
+    placeholder_col = pl.col(f"{PRED_PREFIX}{placeholder!r}")
+
     preds: list[pl.DataFrame] = []
-    for cv_train, _ in tqdm(list(split_cv(train, **cv))):
-        p = _fit_predict(model, cv_train)
-        p = p.with_columns(pl.col("date").min().over("id").alias("cutoff_date"))
+    telemetry: list[pl.DataFrame] = []
+    for used_models, ids in routes.items():
+        m = copy.copy(model)
+        m.models = [x for x in model.models if repr(x) in used_models]
+        if set(model_names) - set(used_models) and repr(placeholder) not in used_models:
+            m.models.append(placeholder)
+
+        p = _fit_predict(m, data.filter(pl.col("id").is_in(ids)))
+        telemetry.append(collect_telemetry(m))
+
+        p = p.select(
+            "id",
+            "date",
+            *(
+                pl.col(f"{PRED_PREFIX}{n}")
+                if n in used_models
+                else placeholder_col.alias(PRED_PREFIX + n)
+                for n in model_names
+            ),
+        )
         preds.append(p)
 
-    return pl.concat(preds)
+    return pl.concat(preds).sort("id", "date"), pl.concat(telemetry)
 
 
-def live_forecast(model: "StatsForecast", train: pl.LazyFrame) -> pl.DataFrame:
-    return _fit_predict(model, train)
+def _cross_validate_fold(
+    model: "StatsForecast",
+    fold: tuple[pl.LazyFrame, pl.LazyFrame],
+    cv_classification: pl.LazyFrame,
+    routing: dict[str, list[str]],
+) -> tuple[pl.DataFrame, pl.DataFrame]:
+    cv_train, _ = fold
+    cutoff_expr = pl.col("date").max().dt.offset_by("1w").alias("cutoff_date")
+    cutoffs = cv_train.group_by("id").agg(cutoff_expr)
+    classification = cv_classification.join(cutoffs, on=["id", "cutoff_date"])
+
+    p, telemetry = _fit_predict_routed(model, cv_train, classification, routing)
+    p = p.with_columns(pl.col("date").min().over("id").alias("cutoff_date"))
+
+    cutoffs = p.select("id", "cutoff_date").unique()
+    telemetry = telemetry.join(cutoffs, on="id", how="left")
+    return p, telemetry
+
+
+@track_copies
+def cross_validate(
+    model: "StatsForecast",
+    cv_folds: CVFolds,
+    cv_classification: pl.LazyFrame,
+    routing: dict[str, list[str]],
+    parallel: dict[str, int],
+) -> tuple[pl.DataFrame, pl.DataFrame]:
+    # Split the core budget between concurrently fitted folds and the series within a fold
+    n_cores = parallel["n_cores"] if parallel["n_cores"] > 0 else node_cpus()
+    n_fold_jobs = max(min(parallel["n_fold_jobs"], len(cv_folds), n_cores), 1)
+
+    args = (cv_classification, routing)
+    if n_fold_jobs == 1:
+        results = [_cross_validate_fold(model, fold, *args) for fold in tqdm(cv_folds)]
+    else:
+        model = copy.deepcopy(model)
+        model.n_jobs = max(n_cores // n_fold_jobs, 1)
+
+        # NOTE: Polars is not fork-safe, so the workers are spawned
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=n_fold_jobs, mp_context=ctx) as executor:
+            futures = executor.map(
+                _cross_validate_fold, repeat(model), cv_folds, *map(repeat, args)
+            )
+            results = list(tqdm(futures, total=len(cv_folds)))
+
+    preds, telemetry = zip(*results)
+    return pl.concat(preds), pl.concat(telemetry)
+
+
+@track_copies
+def live_forecast(
+    model: "StatsForecast",
+    train: pl.LazyFrame,
+    live_classification: pl.LazyFrame,
+    routing: dict[str, list[str]],
+) -> pl.DataFrame:
+    p, _ = _fit_predict_routed(model, train, live_classification, routing)
+    return p
@@ -1,6 +1,8 @@
 from kedro.pipeline import Pipeline, node
 from kedro.pipeline.modular_pipeline import pipeline
 
+from vn1_sales_forecast.runner import resources
+
 from .nodes import create_model, cross_validate, live_forecast
 
 
@@ -15,18 +17,25 @@ def create_pipeline() -> Pipeline:
             ),
             node(
                 cross_validate,
-                inputs=["model", "primary_sales", "params:cv"],
-                outputs="cv_forecast",
+                inputs=[
+                    "model",
+                    "cv_folds",
+                    "cv_classification",
+                    "params:routing",
+                    "params:parallel",
+                ],
+                outputs=["cv_forecast", "cv_telemetry"],
                 name="cross_validate",
+                tags=resources(cpus="all"),
             ),
             node(
                 live_forecast,
-                inputs=["model", "primary_sales"],
+                inputs=["model", "primary_sales", "live_classification", "params:routing"],
                 outputs="live_forecast",
                 name="live_forecast",
+                tags=resources(cpus="all"),
             ),
         ],
         namespace="model_stat",
-        inputs={"primary_sales"},
-        parameters={"cv"},
+        inputs={"primary_sales", "cv_folds", "cv_classification", "live_classification"},
     )
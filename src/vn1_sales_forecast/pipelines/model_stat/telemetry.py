@@ -0,0 +1,110 @@
+import typing
+from time import perf_counter
+from typing import Any
+
+import numpy as np
+import polars as pl
+
+if typing.TYPE_CHECKING:
+    from statsforecast import StatsForecast
+
+
+class TimedModel:
+    """Wraps a statsforecast model and records the time spent in `fit` and `predict`.
+
+    StatsForecast fits a `new()` copy of every model per series, so each fitted instance
+    holds the timings of a single series. Fallback models are wrapped with `is_fallback`,
+    which marks the series on which the original model failed.
+    """
+
+    def __init__(self, model: Any, is_fallback: bool = False) -> None:
+        self.model = model
+        self.is_fallback = is_fallback
+        self.fit_time: float | None = None
+        self.predict_time: float | None = None
+
+    def __getattr__(self, name: str) -> Any:
+        # NOTE: Guard against infinite recursion while unpickling
+        if name == "model":
+            raise AttributeError(name)
+        return getattr(self.model, name)
+
+    def __repr__(self) -> str:
+        return repr(self.model)
+
+    @property
+    def alias(self) -> str:
+        return self.model.alias
+
+    @alias.setter
+    def alias(self, value: str) -> None:
+        self.model.alias = value
+
+    def new(self) -> "TimedModel":
+        return TimedModel(self.model.new(), is_fallback=self.is_fallback)
+
+    def fit(self, y: np.ndarray, X: np.ndarray | None = None) -> "TimedModel":
+        start = perf_counter()
+        self.model = self.model.fit(y=y, X=X)
+        self.fit_time = perf_counter() - start
+        return self
+
+    def predict(self, h: int, X: np.ndarray | None = None) -> dict[str, Any]:
+        start = perf_counter()
+        res = self.model.predict(h=h, X=X)
+        self.predict_time = perf_counter() - start
+        return res
+
+
+def _predict_chunk(ga: Any, fm: np.ndarray, h: int) -> tuple[np.ndarray, list[str], list]:
+    fcsts, cols = ga._single_threaded_predict(fm, h)
+    # NOTE: The models of the chunk are copies, so their predict times are sent back
+    times = [[getattr(m, "predict_time", None) for m in row] for row in fm]
+    return fcsts, cols, times
+
+
+def predict(model: "StatsForecast", h: int) -> pl.DataFrame:
+    """`model.predict`, which keeps the predict times of the models predicted by workers.
+
+    StatsForecast predicts on copies of the fitted models in a pool of processes if `n_jobs`
+    is not 1, so the predict times of the `TimedModel`s would not reach `model.fitted_`.
+    """
+    if model.n_jobs == 1:
+        return model.predict(h=h)
+
+    gas, _ = model._get_gas_Xs(X=None)
+    fms = model.ga.split_fm(model.fitted_, model.n_jobs)
+    Pool, pool_kwargs = model._get_pool()
+    with Pool(model.n_jobs, **pool_kwargs) as executor:
+        futures = [executor.apply_async(_predict_chunk, (ga, fm, h)) for ga, fm in zip(gas, fms)]
+        fcsts, cols, times = zip(*(f.get() for f in futures))
+
+    # NOTE: The chunks hold the fitted models of this process, not copies
+    for fm, chunk_times in zip(fms, times):
+        for row, row_times in zip(fm, chunk_times):
+            for m, t in zip(row, row_times):
+                if isinstance(m, TimedModel):
+                    m.predict_time = t
+
+    p = pl.DataFrame(model._make_future_df(h=h))
+    return pl.concat([p, pl.DataFrame(np.vstack(fcsts), schema=cols[0])], how="horizontal")
+
+
+def collect_telemetry(model: "StatsForecast") -> pl.DataFrame:
+    fitted = [
+        (uid, repr(m), m.fit_time, m.predict_time, m.is_fallback)
+        for uid, row in zip(model.uids, model.fitted_)
+        for m in row
+        if isinstance(m, TimedModel)
+    ]
+    return pl.DataFrame(
+        fitted,
+        schema={
+            "id": pl.Int64,
+            "model": pl.String,
+            "fit_time": pl.Float64,
+            "predict_time": pl.Float64,
+            "fallback": pl.Boolean,
+        },
+        orient="row",
+    )
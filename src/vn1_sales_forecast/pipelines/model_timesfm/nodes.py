@@ -1,45 +1,42 @@
-from typing import Any
-
 import polars as pl
 import polars.selectors as cs
-from tqdm import tqdm
 
-from vn1_sales_forecast.cv import split_cv
+from vn1_sales_forecast.arrow import track_copies
+from vn1_sales_forecast.cv import CVFolds
 from vn1_sales_forecast.settings import PRED_PREFIX
 
 from .timesfm import TimesFM
 
 
-def create_model() -> TimesFM:
+def create_model(backend: str, checkpoint_path: str | None) -> TimesFM:
     return TimesFM(
         h=13,
         freq="W",
-        backend="gpu",
+        backend=backend,  # type: ignore
+        checkpoint_path=checkpoint_path,
     )
 
 
-def cross_validate(
-    models: TimesFM,
-    sales: pl.LazyFrame,
-    cv: dict[str, Any],
-) -> pl.DataFrame:
-    preds: list[pl.DataFrame] = []
-    for train, _ in tqdm(list(split_cv(sales, **cv))):
-        p = models.forecast(
-            train,
-            id_col="id",
-            time_col="date",
-            target_col="sales",
-        )
-        p = p.select(
+@track_copies
+def cross_validate(models: TimesFM, cv_folds: CVFolds) -> pl.DataFrame:
+    # NOTE: The series of all cutoffs are forecasted in a single sweep
+    preds = models.forecast_many(
+        [train for train, _ in cv_folds],
+        id_col="id",
+        time_col="date",
+        target_col="sales",
+    )
+    return pl.concat(
+        p.select(
             pl.col("id", "date"),
             cs.exclude("id", "date").fill_nan(0).clip(0).name.prefix(PRED_PREFIX),
+            pl.col("date").min().over("id").alias("cutoff_date"),
         )
-        p = p.with_columns(pl.col("date").min().over("id").alias("cutoff_date"))
-        preds.append(p)
-    return pl.concat(preds)
+        for p in preds
+    )
 
 
+@track_copies
 def live_forecast(models: TimesFM, sales: pl.LazyFrame) -> pl.DataFrame:
     p = models.forecast(
         sales,
@@ -1,6 +1,8 @@
 from kedro.pipeline import Pipeline, node
 from kedro.pipeline.modular_pipeline import pipeline
 
+from vn1_sales_forecast.runner import resources
+
 from .nodes import create_model, cross_validate, live_forecast
 
 
@@ -9,24 +11,25 @@ def create_pipeline() -> Pipeline:
         [
             node(
                 create_model,
-                inputs=None,
+                inputs=["params:backend", "params:checkpoint_path"],
                 outputs="model",
                 name="create_model",
             ),
             node(
                 cross_validate,
-                inputs=["model", "primary_sales", "params:cv"],
+                inputs=["model", "cv_folds"],
                 outputs="cv_forecast",
                 name="cross_validate",
+                tags=resources(cpus=0.5, memory_gb=4),
             ),
             node(
                 live_forecast,
                 inputs=["model", "primary_sales"],
                 outputs="live_forecast",
                 name="live_forecast",
+                tags=resources(cpus=0.5, memory_gb=4),
             ),
         ],
         namespace="model_timesfm",
-        inputs={"primary_sales"},
-        parameters={"cv"},
+        inputs={"primary_sales", "cv_folds"},
     )
@@ -1,43 +1,97 @@
 import typing
+from collections.abc import Sequence
+from functools import lru_cache
 from typing import Literal
 
+import numpy as np
 import polars as pl
+import psutil
+
+from vn1_sales_forecast.arrow import collect, split_lists
 
 if typing.TYPE_CHECKING:
     from timesfm import TimesFm
 
+_INTERVALS = {"D": "d", "W": "w", "M": "mo"}
+
+# NOTE: Rough upper bound of the activations of one series of the 200M model on CPU
+_BYTES_PER_SERIES = 16 * 1024**2
+
+
+def _available_batch_size() -> int:
+    available = psutil.virtual_memory().available // 2
+    return int(np.clip(available // _BYTES_PER_SERIES, 1, 1024))
+
+
+@lru_cache
+def _load_predictor(
+    repo_id: str,
+    checkpoint_path: str | None,
+    backend: str,
+    batch_size: int | None,
+    h: int,
+    context_len: int,
+) -> "TimesFm":
+    import timesfm
+
+    # NOTE: Derived before the checkpoint is loaded and not part of the cache key, so that a
+    # change of the free memory does not load the checkpoint again
+    batch_size = batch_size or _available_batch_size()
+
+    # NOTE: A local checkpoint path is loaded as is, without contacting the Hugging Face hub
+    checkpoint = (
+        timesfm.TimesFmCheckpoint(path=checkpoint_path)
+        if checkpoint_path
+        else timesfm.TimesFmCheckpoint(huggingface_repo_id=repo_id)
+    )
+    return timesfm.TimesFm(
+        hparams=timesfm.TimesFmHparams(
+            backend=backend,  # type: ignore
+            per_core_batch_size=batch_size,
+            horizon_len=h,
+            context_len=context_len,
+        ),
+        checkpoint=checkpoint,
+    )
+
 
 class TimesFM:
+    """Zero-shot TimesFM forecaster.
+
+    The checkpoint is loaded once per process and reused by every `forecast` call. If
+    `batch_size` is not set, it is derived from the memory available when the predictor is
+    loaded.
+    """
+
     def __init__(
         self,
         repo_id: str = "google/timesfm-1.0-200m-pytorch",
+        checkpoint_path: str | None = None,
         h: int = 13,
         freq: str = "W",
-        batch_size: int = 32,
+        context_len: int = 512,
+        batch_size: int | None = None,
         alias: str = "TimesFM",
-        backend: Literal["cpu", "gpu", "tpu"] = "gpu",
+        backend: Literal["cpu", "gpu", "tpu"] = "cpu",
     ) -> None:
         self.repo_id = repo_id
+        self.checkpoint_path = checkpoint_path
         self.batch_size = batch_size
+        self.context_len = context_len
         self.alias = alias
         self.backend = backend
         self.h = h
         self.freq = freq
 
-    def get_predictor(
-        self,
-    ) -> "TimesFm":
-        import timesfm
-
-        tfm = timesfm.TimesFm(
-            hparams=timesfm.TimesFmHparams(
-                backend=self.backend,  # type: ignore
-                per_core_batch_size=self.batch_size,
-                horizon_len=self.h,
-            ),
-            checkpoint=timesfm.TimesFmCheckpoint(huggingface_repo_id=self.repo_id),
+    def get_predictor(self) -> "TimesFm":
+        return _load_predictor(
+            self.repo_id,
+            self.checkpoint_path,
+            self.backend,
+            self.batch_size,
+            self.h,
+            self.context_len,
         )
-        return tfm
 
     def forecast(
         self,
@@ -46,36 +100,49 @@ class TimesFM:
         time_col="date",
         target_col="sales",
     ) -> pl.DataFrame:
-        predictor = self.get_predictor()
+        return self.forecast_many([df], id_col=id_col, time_col=time_col, target_col=target_col)[0]
 
-        df_input = (
-            df.select(
-                pl.col(id_col).alias("unique_id"),
-                pl.col(time_col).alias("ds"),
-                target_col,
-            )
-            .collect()
-            .to_pandas()
-        )
+    def forecast_many(
+        self,
+        dfs: Sequence[pl.LazyFrame],
+        id_col="id",
+        time_col="date",
+        target_col="sales",
+    ) -> list[pl.DataFrame]:
+        """Forecast several frames, e.g. the train sets of all cv folds, in one sweep."""
+        from timesfm.timesfm_base import freq_map
 
-        p = predictor.forecast_on_df(
-            df_input,
-            freq=self.freq,
-            value_name=target_col,
-            model_name=self.alias,
+        contexts = collect(
+            pl.concat(
+                [
+                    df.sort(id_col, time_col)
+                    .group_by(id_col, maintain_order=True)
+                    .agg(
+                        pl.col(target_col).tail(self.context_len).cast(pl.Float32),
+                        pl.col(time_col).last().alias("last_date"),
+                    )
+                    .with_columns(pl.lit(i, dtype=pl.UInt32).alias("frame"))
+                    for i, df in enumerate(dfs)
+                ]
+            )
         )
 
-        date_col = pl.col("ds").alias(time_col).cast(pl.Date)
-        if self.freq == "W":
-            date_col = date_col.dt.offset_by("1d")
+        inputs = split_lists(contexts[target_col])
+        point, _ = self.get_predictor().forecast(inputs, freq=[freq_map(self.freq)] * len(inputs))
 
+        unit = _INTERVALS[self.freq]
         p = (
-            pl.DataFrame(p)
-            .select(
-                pl.col("unique_id").alias(id_col),
-                date_col,
-                pl.col(self.alias),
+            contexts.select(
+                id_col,
+                "frame",
+                pl.date_ranges(
+                    pl.col("last_date").dt.offset_by(f"1{unit}"),
+                    pl.col("last_date").dt.offset_by(f"{self.h}{unit}"),
+                    interval=f"1{unit}",
+                ).alias(time_col),
+                pl.Series(self.alias, point[:, : self.h]),
             )
-            .sort(id_col, time_col)
+            .explode(time_col, self.alias)
+            .sort("frame", id_col, time_col)
         )
-        return p
+        return [p.filter(pl.col("frame") == i).drop("frame") for i in range(len(dfs))]
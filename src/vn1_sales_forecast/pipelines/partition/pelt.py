@@ -0,0 +1,167 @@
+from typing import Literal
+
+import numpy as np
+import polars as pl
+from numba import njit, prange
+
+from vn1_sales_forecast.arrow import collect, to_numpy
+
+MODELS = {"l2": 0, "poisson": 1}
+
+
+@njit(cache=True)
+def _cost(s1, s2, start, end, model):
+    n = end - start
+    total = s1[end] - s1[start]
+    if model == 0:
+        return (s2[end] - s2[start]) - total * total / n
+    # NOTE: Poisson deviance up to terms which do not depend on the segmentation
+    if total <= 0.0:
+        return 0.0
+    return 2.0 * (total - total * np.log(total / n))
+
+
+@njit(cache=True)
+def _pelt(s1, s2, n, model, pen, min_size, f, last, candidates):
+    """Fill `last[t]` with the start of the last segment of the optimal partition of `x[:t]`."""
+    f[0] = -pen
+    last[0] = 0
+    candidates[0] = 0
+    n_candidates = 1
+    for t in range(min_size, n + 1):
+        # NOTE: A new change point becomes admissible once its segment can be `min_size` long
+        if t - min_size >= min_size:
+            candidates[n_candidates] = t - min_size
+            n_candidates += 1
+
+        best, best_s = np.inf, 0
+        for j in range(n_candidates):
+            s = candidates[j]
+            cost = f[s] + _cost(s1, s2, s, t, model) + pen
+            if cost < best:
+                best, best_s = cost, s
+        f[t] = best
+        last[t] = best_s
+
+        # Prune the change points which can not be optimal for any later `t`
+        k = 0
+        for j in range(n_candidates):
+            s = candidates[j]
+            if f[s] + _cost(s1, s2, s, t, model) <= best:
+                candidates[k] = s
+                k += 1
+        n_candidates = k
+
+
+@njit(cache=True)
+def _labels(last, n, out):
+    """Number the segments of `x[:n]` from the starts of the last segments in `last`."""
+    n_segments = 0
+    t = n
+    while t > 0:
+        n_segments += 1
+        t = last[t]
+    t = n
+    while t > 0:
+        n_segments -= 1
+        s = last[t]
+        out[s:t] = n_segments
+        t = s
+
+
+@njit(parallel=True, cache=True)
+def _apply_prefixes(data, indptr, lengths, lengths_indptr, out_indptr, model, pen, min_size, out):
+    for i in prange(len(indptr) - 1):
+        x = data[indptr[i] : indptr[i + 1]]
+        n = len(x)
+        s1 = np.zeros(n + 1)
+        s2 = np.zeros(n + 1)
+        s1[1:] = np.cumsum(x)
+        s2[1:] = np.cumsum(x * x)
+        f = np.empty(n + 1)
+        last = np.zeros(n + 1, dtype=np.int64)
+        candidates = np.empty(n + 1, dtype=np.int64)
+
+        first, end = lengths_indptr[i], lengths_indptr[i + 1]
+        if model == 1 and end > first and lengths[end - 1] >= 2 * min_size:
+            # NOTE: The poisson cost does not depend on the prefix, so the optimal partitions of
+            # all prefixes are backtracked from a single pass over the longest one
+            _pelt(s1, s2, lengths[end - 1], model, pen, min_size, f, last, candidates)
+
+        for p in range(first, end):
+            length = lengths[p]
+            labels = out[out_indptr[p] : out_indptr[p] + length]
+            labels[:] = 0
+            if length < 2 * min_size:
+                continue
+
+            if model == 0:
+                # NOTE: The cost is scaled by the variance of the prefix, like a standardized series
+                var = (s2[length] - s1[length] * s1[length] / length) / length
+                if var <= 1e-12 * (s2[length] / length):
+                    continue
+                _pelt(s1, s2, length, model, pen * var, min_size, f, last, candidates)
+            _labels(last, length, labels)
+
+
+def pelt(
+    df: pl.DataFrame | pl.LazyFrame,
+    prefixes: pl.DataFrame | None = None,
+    model: Literal["l2", "poisson"] = "l2",
+    pen: float = 11,
+    min_size: int = 2,
+    id_col: str = "id",
+    time_col: str = "date",
+    target_col: str = "sales",
+) -> pl.DataFrame:
+    """Partition the series of `df` into segments between change points with PELT.
+
+    Returns the `id_col`, `time_col` and `partition` number of every row. `model="l2"`
+    detects changes of the mean of the standardized series, `model="poisson"` changes of
+    the rate of count data. If `prefixes` with the `id_col` and the number of first rows
+    `length` are given, every prefix is partitioned on its own and the other columns of
+    `prefixes` are kept as keys, e.g. the cutoff date. All prefixes of a series share one
+    copy of its values and its prefix sums.
+    """
+    data = collect(df, id_col, time_col, target_col).sort(id_col, time_col)
+    ids = data[id_col].unique(maintain_order=True)
+    indptr = np.zeros(len(ids) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum(to_numpy(data[id_col].unique_counts()))
+    y = np.ascontiguousarray(to_numpy(data[target_col].cast(pl.Float64)))
+    if model == "poisson" and (y < 0).any():
+        raise ValueError("The poisson model needs non-negative values")
+
+    index = pl.DataFrame({id_col: ids, "_series": np.arange(len(ids))})
+    if prefixes is None:
+        prefixes = index.with_columns(length=pl.Series(np.diff(indptr)))
+    else:
+        prefixes = prefixes.join(index, on=id_col, how="left")
+        if (missing := prefixes["_series"].null_count()) > 0:
+            raise ValueError(f"{missing} prefixes refer to series which are not in `df`")
+    prefixes = prefixes.sort("_series", "length")
+
+    series = to_numpy(prefixes["_series"])
+    lengths = to_numpy(prefixes["length"].cast(pl.Int64))
+    if (lengths > np.diff(indptr)[series]).any():
+        raise ValueError("Prefixes can not be longer than their series")
+    lengths_indptr = np.searchsorted(series, np.arange(len(ids) + 1))
+    out_indptr = np.zeros(len(lengths) + 1, dtype=np.int64)
+    out_indptr[1:] = np.cumsum(lengths)
+
+    out = np.zeros(out_indptr[-1], dtype=np.uint16)
+    _apply_prefixes(
+        y, indptr, lengths, lengths_indptr, out_indptr, MODELS[model], pen, min_size, out
+    )
+
+    keys = prefixes.select(pl.exclude(id_col, "_series", "length"))
+    starts = pl.Series("_start", indptr[series])
+    rows = pl.int_ranges("_start", pl.col("_start") + pl.col("length"), dtype=pl.UInt32)
+    rows = prefixes.with_columns(starts).select(rows.alias("_row"), *keys.columns).explode("_row")
+    return pl.concat(
+        [
+            data.select(id_col, time_col)[rows["_row"]],
+            pl.DataFrame({"partition": out}),
+            rows.select(keys.columns),
+        ],
+        how="horizontal",
+    )
@@ -1,6 +1,8 @@
 from kedro.pipeline import Pipeline, node
 from kedro.pipeline.modular_pipeline import pipeline
 
+from vn1_sales_forecast.runner import resources
+
 from .nodes import calculate_cv_partitions, calculate_live_partition
 
 
@@ -10,18 +12,19 @@ def create_pipeline() -> Pipeline:
             node(
                 calculate_cv_partitions,
                 name="calculate_cv_partitions",
-                inputs=["primary_sales", "params:cv"],
+                inputs=["cv_folds", "params:pelt"],
                 outputs="cv_partitions",
+                tags=resources(cpus="all"),
             ),
             node(
                 calculate_live_partition,
                 name="calculate_live_partition",
-                inputs="primary_sales",
+                inputs=["primary_sales", "params:pelt"],
                 outputs="live_partitions",
+                tags=resources(cpus="all"),
             ),
         ],
         namespace="partition",
-        inputs={"primary_sales"},
+        inputs={"primary_sales", "cv_folds"},
         outputs={"cv_partitions", "live_partitions"},
-        parameters={"cv"},
     )
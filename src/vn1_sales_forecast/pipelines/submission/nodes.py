@@ -1,6 +1,7 @@
 import polars as pl
 import polars.selectors as cs
 
+from vn1_sales_forecast.expr import split_series_id
 from vn1_sales_forecast.settings import PRED_PREFIX
 
 
@@ -10,11 +11,7 @@ def _format_submission(preds: pl.LazyFrame, raw_sales: pl.LazyFrame) -> pl.LazyF
     id_cols = ["Client", "Warehouse", "Product"]
     submission = (
         preds.select(
-            pl.col("id")
-            .str.split_exact("-", 2)
-            .struct.rename_fields(id_cols)
-            .struct.field("*")
-            .cast(pl.Int64),
+            *(e.cast(pl.Int64) for e in split_series_id("id", id_cols)),
             pl.col("date").dt.strftime("%Y-%m-%d"),
             pl.col("pred"),
         )
@@ -1,14 +1,25 @@
+import math
+import multiprocessing
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from functools import partial
 from typing import Any
 
+import numba
 import numpy as np
 import polars as pl
 import polars.selectors as cs
 from tqdm import tqdm
 
-from vn1_sales_forecast.cv import split_cv
+from vn1_sales_forecast.arrow import track_copies
+from vn1_sales_forecast.cv import CVFolds
+from vn1_sales_forecast.runner import node_cpus
 from vn1_sales_forecast.settings import TSFEATURES_PREFIX
 
-from .tsfeatures import tsfeatures
+from .tsfeatures import FEATURES, INCREMENTAL_FEATURES, prefix_tsfeatures, tsfeatures
+
+IdRange = tuple[Any, Any]
 
 
 def _postprocess_features_df(df: pl.DataFrame, id_cols: list[str]) -> pl.DataFrame:
@@ -23,19 +34,138 @@ def _postprocess_features_df(df: pl.DataFrame, id_cols: list[str]) -> pl.DataFra
     return df
 
 
-def calculate_cv_tsfeatures(train: pl.LazyFrame, cv: dict[str, Any]) -> pl.DataFrame:
+def _id_batches(train: pl.LazyFrame, batch_rows: int) -> list[IdRange]:
+    """Closed ranges of ids whose series have about `batch_rows` rows in total."""
+    lengths = train.group_by("id").len().sort("id").collect()
+    batch = (pl.col("len").cum_sum() - 1) // max(batch_rows, 1)
+    ranges = lengths.group_by(batch.alias("batch"), maintain_order=True).agg(
+        pl.col("id").first().alias("first_id"), pl.col("id").last().alias("last_id")
+    )
+    return list(ranges.select("first_id", "last_id").iter_rows())
+
+
+def _batch(df: pl.LazyFrame, ids: IdRange) -> pl.LazyFrame:
+    return df.filter(pl.col("id").is_between(*ids))
+
+
+def _map_batches(
+    func: Callable[[IdRange], pl.DataFrame],
+    train: pl.LazyFrame,
+    parallel: dict[str, int] | None,
+) -> pl.DataFrame:
+    """Apply `func` to batches of series balanced by their total length in `train`.
+
+    The batches are processed by `n_workers` processes, so that only the series of a batch
+    are in memory at a time and all cores are used.
+    """
+    parallel = parallel or {"n_workers": 1, "batch_rows": 0}
+    n_cores = node_cpus()
+    n_workers = parallel["n_workers"] if parallel["n_workers"] > 0 else n_cores
+
+    n_rows = train.select(pl.len()).collect().item()
+    batch_rows = parallel["batch_rows"] or n_rows
+    # NOTE: At least one batch per worker
+    batches = _id_batches(train, min(batch_rows, math.ceil(n_rows / n_workers)))
+
+    n_workers = min(n_workers, len(batches))
+    if n_workers <= 1:
+        return pl.concat([func(ids) for ids in tqdm(batches)])
+
+    # NOTE: Polars is not fork-safe, so the workers are spawned. They split the numba threads.
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        max_workers=n_workers,
+        mp_context=ctx,
+        initializer=numba.set_num_threads,
+        initargs=(max(n_cores // n_workers, 1),),
+    ) as executor:
+        return pl.concat(list(tqdm(executor.map(func, batches), total=len(batches))))
+
+
+def _incremental_cv_tsfeatures(
+    longest: pl.LazyFrame, prefixes: pl.DataFrame, features: list[str]
+) -> pl.DataFrame:
+    """Features of all folds from the longest train set, whose prefixes the others are."""
+    starts = longest.group_by("id").agg(pl.col("date").min().alias("first_date")).collect()
+    nested = prefixes.join(starts, on="id", how="left")
+    if not (nested["start"] == nested["first_date"]).all():
+        raise ValueError("Incremental tsfeatures need cv folds with expanding train windows")
+
+    return prefix_tsfeatures(longest, prefixes.drop("start"), freq=52, features=features)
+
+
+def _cv_batch_tsfeatures(
+    ids: IdRange,
+    cv_trains: list[pl.LazyFrame],
+    cutoffs: list[date],
+    features: list[str],
+    incremental: bool,
+) -> pl.DataFrame:
+    shared = [f for f in features if f in INCREMENTAL_FEATURES] if incremental else []
+    per_fold = [f for f in features if f not in shared]
+    cv_trains = [_batch(cv_train, ids) for cv_train in cv_trains]
+
     features_dfs: list[pl.DataFrame] = []
-    for cv_train, _ in tqdm(list(split_cv(train, **cv))):
-        f = tsfeatures(cv_train, freq=52)
-        max_date = cv_train.select(pl.col("date").max().dt.offset_by("1w")).collect().item()
-        f = f.with_columns(pl.lit(max_date).alias("cutoff_date"))
-        features_dfs.append(f)
-    cv_feature_df: pl.DataFrame = pl.concat(features_dfs)
+    prefixes: list[pl.DataFrame] = []
+    for cv_train, cutoff_date in zip(cv_trains, cutoffs):
+        cutoff = pl.lit(cutoff_date).alias("cutoff_date")
+        if per_fold:
+            f = tsfeatures(cv_train, freq=52, features=per_fold)
+            features_dfs.append(f.with_columns(cutoff))
+        if shared:
+            p = cv_train.group_by("id").agg(
+                pl.len().alias("length"), pl.col("date").min().alias("start")
+            )
+            prefixes.append(p.with_columns(cutoff).collect())
+
+    cv_feature_df = pl.concat(features_dfs) if features_dfs else None
+    if shared:
+        f = _incremental_cv_tsfeatures(cv_trains[-1], pl.concat(prefixes), shared)
+        on = ["id", "cutoff_date"]
+        cv_feature_df = f if cv_feature_df is None else cv_feature_df.join(f, on=on)
+
+    # NOTE: Same column order as the live features, which are predicted on with the same model
+    names = [name for f in features for name in FEATURES[f]]
+    return cv_feature_df.select("id", "cutoff_date", *names)  # type: ignore
+
+
+@track_copies
+def calculate_cv_tsfeatures(
+    cv_folds: CVFolds,
+    features: list[str] | None = None,
+    incremental: bool = False,
+    parallel: dict[str, int] | None = None,
+) -> pl.DataFrame:
+    cv_trains = [cv_train for cv_train, _ in cv_folds]
+    max_date = pl.col("date").max().dt.offset_by("1w")
+    cutoffs = [cv_train.select(max_date).collect().item() for cv_train in cv_trains]
+
+    func = partial(
+        _cv_batch_tsfeatures,
+        cv_trains=cv_trains,
+        cutoffs=cutoffs,
+        features=list(FEATURES) if features is None else features,
+        incremental=incremental,
+    )
+    # NOTE: The most recent train set has all series at their longest
+    cv_feature_df = _map_batches(func, cv_trains[-1], parallel)
 
     return _postprocess_features_df(cv_feature_df, ["id", "cutoff_date"])
 
 
-def calculate_live_tsfeatures(train: pl.LazyFrame) -> pl.DataFrame:
-    feature_df = tsfeatures(train, freq=52)
+def _live_batch_tsfeatures(
+    ids: IdRange, train: pl.LazyFrame, features: list[str] | None
+) -> pl.DataFrame:
+    return tsfeatures(_batch(train, ids), freq=52, features=features)
+
+
+@track_copies
+def calculate_live_tsfeatures(
+    train: pl.LazyFrame,
+    features: list[str] | None = None,
+    parallel: dict[str, int] | None = None,
+) -> pl.DataFrame:
+    func = partial(_live_batch_tsfeatures, train=train, features=features)
+    feature_df = _map_batches(func, train, parallel)
 
     return _postprocess_features_df(feature_df, ["id"])
@@ -1,6 +1,8 @@
 from kedro.pipeline import Pipeline, node
 from kedro.pipeline.modular_pipeline import pipeline
 
+from vn1_sales_forecast.runner import resources
+
 from .nodes import calculate_cv_tsfeatures, calculate_live_tsfeatures
 
 
@@ -9,19 +11,20 @@ def create_pipeline() -> Pipeline:
         [
             node(
                 calculate_cv_tsfeatures,
-                inputs=["primary_sales", "params:cv"],
+                inputs=["cv_folds", "params:features", "params:incremental", "params:parallel"],
                 outputs="cv_tsfeatures",
                 name="calculate_cv_tsfeatures",
+                tags=resources(cpus="all"),
             ),
             node(
                 calculate_live_tsfeatures,
-                inputs="primary_sales",
+                inputs=["primary_sales", "params:features", "params:parallel"],
                 outputs="live_tsfeatures",
                 name="calculate_live_tsfeatures",
+                tags=resources(cpus="all"),
             ),
         ],
         namespace="tsfeatures",
-        inputs={"primary_sales"},
-        parameters={"cv"},
+        inputs={"primary_sales", "cv_folds"},
         outputs={"cv_tsfeatures", "live_tsfeatures"},
     )
@@ -1,28 +1,421 @@
-import pandas as pd
+"""Native time series features.
+
+Vectorized replacement of the `tsfeatures` package for the features used downstream. The
+series are sorted into one contiguous array and every feature group is a numba kernel which
+computes the features of a series from its slice, run in parallel over all series. Names and
+definitions follow `tsfeatures`, which scales every series to zero mean and unit variance
+first, except that the STL features use a classical decomposition.
+"""
+
+from collections.abc import Sequence
+from itertools import chain
+
+import numpy as np
 import polars as pl
+from numba import njit, prange
+
+from vn1_sales_forecast.arrow import collect, to_numpy
+
+_N_ACF = 10
+
+
+@njit(cache=True)
+def _acf(x, max_lag):
+    """Autocorrelations of `x` for the lags 0 to `max_lag`, NaN where the lag is too long."""
+    out = np.full(max_lag + 1, np.nan)
+    n = len(x)
+    if n == 0:
+        return out
+    xc = x - x.mean()
+    denom = np.sum(xc * xc)
+    if denom == 0:
+        return out
+    for lag in range(min(max_lag, n - 1) + 1):
+        out[lag] = np.sum(xc[: n - lag] * xc[lag:]) / denom
+    return out
+
+
+@njit(cache=True)
+def _var(x):
+    n = 0
+    mean = 0.0
+    for v in x:
+        if not np.isnan(v):
+            n += 1
+            mean += v
+    if n < 2:
+        return np.nan
+    mean /= n
+    ss = 0.0
+    for v in x:
+        if not np.isnan(v):
+            ss += (v - mean) ** 2
+    return ss / (n - 1)
+
+
+@njit(cache=True)
+def _width(m):
+    return m if m > 1 else 10
+
+
+@njit(cache=True)
+def _acf_summary(acfx, acf_diff1, acf_diff2, n, m, out):
+    out[0] = acfx[1]
+    out[1] = np.sum(acfx[1 : _N_ACF + 1] ** 2) if n > _N_ACF else np.nan
+    for i, acfd in enumerate((acf_diff1, acf_diff2)):
+        if n > _N_ACF + i:
+            out[2 + 2 * i] = acfd[1]
+            out[3 + 2 * i] = np.sum(acfd[1:] ** 2)
+    out[6] = acfx[m] if m > 1 else np.nan
+
+
+@njit(cache=True)
+def _acf_features(x, m, out):
+    acfx = _acf(x, max(m, _N_ACF))
+    acf_diff1 = _acf(np.diff(x), _N_ACF)
+    acf_diff2 = _acf(np.diff(np.diff(x)), _N_ACF)
+    _acf_summary(acfx, acf_diff1, acf_diff2, len(x), m, out)
+
+
+@njit(cache=True)
+def _entropy(x, m, out):
+    """Normalized spectral entropy of the periodogram."""
+    n = len(x)
+    xc = x - x.mean()
+    n_freq = n // 2 + 1
+    psd = np.zeros(n_freq)
+    for k in range(n_freq):
+        re, im = 0.0, 0.0
+        for t in range(n):
+            angle = 2 * np.pi * k * t / n
+            re += xc[t] * np.cos(angle)
+            im -= xc[t] * np.sin(angle)
+        psd[k] = re * re + im * im
+        # NOTE: One-sided spectrum, the frequencies but 0 and Nyquist are counted twice
+        if 0 < k < n / 2:
+            psd[k] *= 2
+    total = psd.sum()
+    if n_freq < 2 or total == 0:
+        return
+    h = 0.0
+    for p in psd / total:
+        if p > 0:
+            h -= p * np.log2(p)
+    out[0] = h / np.log2(n_freq)
+
+
+@njit(cache=True)
+def _tiles(x, m, use_var):
+    width = _width(m)
+    n_tiles = len(x) // width
+    stats = np.empty(n_tiles)
+    for i in range(n_tiles):
+        tile = x[i * width : (i + 1) * width]
+        stats[i] = _var(tile) if use_var else tile.mean()
+    return stats
+
+
+@njit(cache=True)
+def _lumpiness(x, m, out):
+    out[0] = _var(_tiles(x, m, True)) if len(x) >= 2 * _width(m) else 0.0
+
+
+@njit(cache=True)
+def _stability(x, m, out):
+    out[0] = _var(_tiles(x, m, False)) if len(x) >= 2 * _width(m) else 0.0
+
+
+@njit(cache=True)
+def _ssr(y, X):
+    # NOTE: Drops the directions of rank-deficient designs, e.g. of series with few values
+    beta = np.linalg.lstsq(X, y, rcond=1e-10)[0]
+    resid = y - X @ beta
+    return resid, np.sum(resid * resid)
+
+
+@njit(cache=True)
+def _nonlinearity(x, m, out):
+    """Teräsvirta's neural network test for neglected nonlinearity with one lag."""
+    n = len(x)
+    if n < 6:
+        return
+    y, z = x[1:], x[:-1]
+    X = np.ones((n - 1, 4))
+    X[:, 1] = z
+    X[:, 2] = z * z
+    X[:, 3] = z * z * z
+    u, ssr0 = _ssr(y, X[:, :2].copy())
+    _, ssr1 = _ssr(u, X)
+    # NOTE: The test statistic is n * log(ssr0 / ssr1), scaled by 10 / n. If the linear
+    # model already fits, the ratio is only numerical noise.
+    if ssr0 < 1e-10 * n:
+        out[0] = 0.0
+    elif ssr1 > 0:
+        out[0] = 10 * np.log(ssr0 / ssr1)
+
+
+@njit(cache=True)
+def _centered_mean(x, order):
+    """Centered moving average, a 2 x `order` moving average if `order` is even."""
+    n = len(x)
+    out = np.full(n, np.nan)
+    half = order // 2
+    for t in range(half, n - half):
+        if order % 2:
+            out[t] = x[t - half : t + half + 1].mean()
+        else:
+            window = x[t - half : t + half + 1]
+            out[t] = (window[1:-1].sum() + (window[0] + window[-1]) / 2) / order
+    return out
+
+
+@njit(cache=True)
+def _stl_features(x, m, out):
+    """Strength of trend and seasonality of a classical decomposition."""
+    n = len(x)
+    seasonal = m > 1 and n >= 2 * m
+    order = m if seasonal else _width(1)
+    if n <= order:
+        return
+    trend = _centered_mean(x, order)
+    detrended = x - trend
+
+    season = np.zeros(n)
+    if seasonal:
+        means = np.zeros(m)
+        for j in range(m):
+            means[j] = np.nanmean(detrended[j::m])
+        means -= means.mean()
+        for t in range(n):
+            season[t] = means[t % m]
+
+    remainder = detrended - season
+    var_r = _var(remainder)
+    var_tr = _var(trend + remainder)
+    if var_tr > 0:
+        out[0] = max(0.0, 1 - var_r / var_tr)
+    var_sr = _var(detrended)
+    if seasonal and var_sr > 0:
+        out[1] = max(0.0, 1 - var_r / var_sr)
+    acfe = _acf(remainder[~np.isnan(remainder)], _N_ACF)
+    out[2] = acfe[1]
+    out[3] = np.sum(acfe[1:] ** 2)
+
+
+# NOTE: The feature groups in the order of the kernels in `_apply`
+FEATURES = {
+    "acf_features": (
+        "x_acf1",
+        "x_acf10",
+        "diff1_acf1",
+        "diff1_acf10",
+        "diff2_acf1",
+        "diff2_acf10",
+        "seas_acf1",
+    ),
+    "entropy": ("entropy",),
+    "lumpiness": ("lumpiness",),
+    "stability": ("stability",),
+    "nonlinearity": ("nonlinearity",),
+    "stl_features": ("trend", "seasonal_strength", "e_acf1", "e_acf10"),
+}
+
+
+@njit(parallel=True, cache=True)
+def _apply(data, indptr, m, selected, offsets, out):
+    """Compute the selected feature groups of every series into its row of `out`."""
+    for i in prange(len(indptr) - 1):
+        x = data[indptr[i] : indptr[i + 1]]
+        n = len(x)
+        if n < 2:
+            continue
+        std = x.std() * np.sqrt(n / (n - 1))
+        if std == 0:
+            continue
+        x = (x - x.mean()) / std
+
+        row = out[i]
+        if selected[0]:
+            _acf_features(x, m, row[offsets[0] : offsets[1]])
+        if selected[1]:
+            _entropy(x, m, row[offsets[1] : offsets[2]])
+        if selected[2]:
+            _lumpiness(x, m, row[offsets[2] : offsets[3]])
+        if selected[3]:
+            _stability(x, m, row[offsets[3] : offsets[4]])
+        if selected[4]:
+            _nonlinearity(x, m, row[offsets[4] : offsets[5]])
+        if selected[5]:
+            _stl_features(x, m, row[offsets[5] : offsets[6]])
+
+
+# Features of series prefixes
+# ---------------------------
+# Nested prefixes of a series, e.g. the expanding cv windows, share their running sums. For
+# these features a single pass over a series yields the features of all its prefixes.
+
+INCREMENTAL_FEATURES = {name: FEATURES[name] for name in ("acf_features", "lumpiness", "stability")}
+
+
+@njit(cache=True)
+def _prefix_acf(x, max_lag, lengths):
+    """Autocorrelations of the prefixes of `x` with the ascending `lengths`."""
+    out = np.full((len(lengths), max_lag + 1), np.nan)
+    cs = np.zeros(len(x) + 1)
+    cs[1:] = np.cumsum(x)
+    products = np.zeros(max_lag + 1)
+
+    j = 0
+    while j < len(lengths) and lengths[j] < 1:
+        j += 1
+    for t in range(len(x)):
+        for k in range(min(t, max_lag) + 1):
+            products[k] += x[t - k] * x[t]
+        n = t + 1
+        while j < len(lengths) and lengths[j] == n:
+            mu = cs[n] / n
+            denom = products[0] - n * mu * mu
+            # NOTE: Constant prefixes only leave rounding errors
+            if denom > 1e-10 * products[0]:
+                for k in range(min(max_lag, n - 1) + 1):
+                    cov = products[k] - mu * (cs[n - k] + cs[n] - cs[k]) + (n - k) * mu * mu
+                    out[j, k] = cov / denom
+            j += 1
+    return out
+
+
+@njit(parallel=True, cache=True)
+def _apply_prefixes(data, indptr, lengths, lengths_indptr, m, selected, offsets, out):
+    """Compute the selected `INCREMENTAL_FEATURES` of the prefixes of every series.
+
+    The prefix lengths of series `i` are `lengths[lengths_indptr[i] : lengths_indptr[i + 1]]`
+    in ascending order, their features are written to the same rows of `out`.
+    """
+    for i in prange(len(indptr) - 1):
+        start, end = lengths_indptr[i], lengths_indptr[i + 1]
+        if start == end:
+            continue
+        # NOTE: Centering reduces the cancellation in the running sums
+        x = data[indptr[i] : indptr[i + 1]]
+        x = x - x.mean()
+        ls = lengths[start:end]
+        cs = np.zeros(len(x) + 1)
+        cs[1:] = np.cumsum(x)
+        cs2 = np.zeros(len(x) + 1)
+        cs2[1:] = np.cumsum(x * x)
+
+        acfx = _prefix_acf(x, max(m, _N_ACF), ls)
+        acf_diff1 = _prefix_acf(np.diff(x), _N_ACF, ls - 1)
+        acf_diff2 = _prefix_acf(np.diff(np.diff(x)), _N_ACF, ls - 2)
+
+        width = _width(m)
+        n_tiles = len(x) // width
+        tile_means, tile_vars = np.empty(n_tiles), np.empty(n_tiles)
+        for k in range(n_tiles):
+            tile = x[k * width : (k + 1) * width]
+            tile_means[k], tile_vars[k] = tile.mean(), _var(tile)
+
+        for j in range(end - start):
+            n = ls[j]
+            # NOTE: Skips constant prefixes like `_apply` skips constant series
+            if n < 2 or np.isnan(acfx[j, 0]):
+                continue
+            row = out[start + j]
+            # The tile statistics of the scaled prefix follow from its variance
+            var = (cs2[n] - cs[n] * cs[n] / n) / (n - 1)
+            long_enough = n >= 2 * width
+            if selected[0]:
+                _acf_summary(
+                    acfx[j], acf_diff1[j], acf_diff2[j], n, m, row[offsets[0] : offsets[1]]
+                )
+            if selected[1]:
+                row[offsets[1]] = _var(tile_vars[: n // width]) / var**2 if long_enough else 0.0
+            if selected[2]:
+                row[offsets[2]] = _var(tile_means[: n // width]) / var if long_enough else 0.0
+
+
+def _layout(
+    groups: dict[str, tuple[str, ...]], features: Sequence[str]
+) -> tuple[np.ndarray, np.ndarray]:
+    if unknown := set(features) - groups.keys():
+        raise ValueError(f"Unknown tsfeatures {sorted(unknown)}, choose from {list(groups)}")
+    selected = np.array([name in features for name in groups])
+    offsets = np.cumsum([0] + [len(names) for names in groups.values()])
+    return selected, offsets
+
+
+def _columns(
+    groups: dict[str, tuple[str, ...]], features: Sequence[str], out: np.ndarray
+) -> dict[str, np.ndarray]:
+    columns = dict(zip(chain.from_iterable(groups.values()), out.T))
+    return {name: columns[name] for name in chain.from_iterable(groups[f] for f in features)}
+
+
+def _series(
+    df: pl.DataFrame | pl.LazyFrame, id_col: str, time_col: str, target_col: str
+) -> tuple[pl.Series, np.ndarray, np.ndarray]:
+    """The ids, the row ranges and the contiguous values of the series of `df`."""
+    data = collect(df, id_col, time_col, target_col).sort(id_col, time_col)
+    ids = data[id_col].unique(maintain_order=True)
+    indptr = np.zeros(len(ids) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum(to_numpy(data[id_col].unique_counts()))
+    y = np.ascontiguousarray(to_numpy(data[target_col].cast(pl.Float64)))
+    return ids, indptr, y
 
 
 def tsfeatures(
     df: pl.DataFrame | pl.LazyFrame,
+    freq: int = 52,
+    features: Sequence[str] | None = None,
     id_col: str = "id",
     time_col: str = "date",
     target_col: str = "sales",
-    **kwargs,
 ) -> pl.DataFrame:
-    from tsfeatures import tsfeatures as _tsfeatures
+    """Features of every series of `df`, one row per series.
 
-    df = df.lazy()
+    `features` are the keys of `FEATURES` to compute, all by default. Constant series and
+    series which are too short for a feature get NaN.
+    """
+    features = list(FEATURES) if features is None else list(features)
+    selected, offsets = _layout(FEATURES, features)
+    ids, indptr, y = _series(df, id_col, time_col, target_col)
+
+    out = np.full((len(ids), offsets[-1]), np.nan)
+    _apply(y, indptr, freq, selected, offsets, out)
+    return pl.DataFrame({id_col: ids, **_columns(FEATURES, features, out)})
+
+
+def prefix_tsfeatures(
+    df: pl.DataFrame | pl.LazyFrame,
+    prefixes: pl.DataFrame,
+    freq: int = 52,
+    features: Sequence[str] | None = None,
+    id_col: str = "id",
+    time_col: str = "date",
+    target_col: str = "sales",
+) -> pl.DataFrame:
+    """Features of prefixes of the series of `df`, one row per row of `prefixes`.
 
-    panel: pd.DataFrame = (
-        df.select(
-            pl.col(id_col).alias("unique_id"),
-            pl.col(time_col).alias("ds"),
-            pl.col(target_col).alias("y"),
-        )
-        .collect()
-        .to_pandas()
-    )
+    `prefixes` has the `id_col` and the number of first rows `length` of each prefix, all
+    other columns are kept as keys, e.g. the cutoff date. `features` are the keys of
+    `INCREMENTAL_FEATURES` to compute, all by default. The features equal those of
+    `tsfeatures` on the prefixes, but all prefixes of a series are computed in one pass.
+    """
+    features = list(INCREMENTAL_FEATURES) if features is None else list(features)
+    selected, offsets = _layout(INCREMENTAL_FEATURES, features)
+    ids, indptr, y = _series(df, id_col, time_col, target_col)
 
-    features = _tsfeatures(panel, **kwargs)
+    index = pl.DataFrame({id_col: ids, "_series": np.arange(len(ids))})
+    prefixes = prefixes.join(index, on=id_col, how="left").sort("_series", "length")
+    if (missing := prefixes["_series"].null_count()) > 0:
+        raise ValueError(f"{missing} prefixes refer to series which are not in `df`")
+    series = to_numpy(prefixes["_series"])
+    lengths = to_numpy(prefixes["length"].cast(pl.Int64))
+    if (lengths > np.diff(indptr)[series]).any():
+        raise ValueError("Prefixes can not be longer than their series")
+    lengths_indptr = np.searchsorted(series, np.arange(len(ids) + 1))
 
-    return pl.DataFrame(features).rename({"unique_id": id_col})
+    out = np.full((len(prefixes), offsets[-1]), np.nan)
+    _apply_prefixes(y, indptr, lengths, lengths_indptr, freq, selected, offsets, out)
+    features_df = pl.DataFrame(_columns(INCREMENTAL_FEATURES, features, out))
+    return pl.concat([prefixes.drop("_series", "length"), features_df], how="horizontal")
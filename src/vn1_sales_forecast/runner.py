@@ -0,0 +1,554 @@
+"""Kedro runners of the project.
+
+`CachedRunner` skips nodes whose code, parameters and inputs did not change since they were
+last run, e.g. to iterate on an ensemble without re-fitting the models:
+
+    kedro run --runner vn1_sales_forecast.runner.CachedRunner
+
+`ResourceRunner` runs independent nodes concurrently in worker processes within the cores
+and memory the nodes declare with `resources`:
+
+    kedro run --runner vn1_sales_forecast.runner.ResourceRunner
+"""
+
+import hashlib
+import inspect
+import json
+import math
+import multiprocessing
+import os
+import pickle
+import shutil
+import sys
+import uuid
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from functools import lru_cache, partial
+from itertools import chain
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Literal
+
+import psutil
+from kedro.io import DataCatalog, MemoryDataset
+from kedro.pipeline import Pipeline
+from kedro.pipeline.node import Node
+from kedro.runner import AbstractRunner, ParallelRunner, SequentialRunner, run_node
+from kedro.runner.parallel_runner import _run_node_synchronization
+from pluggy import PluginManager
+from threadpoolctl import threadpool_limits
+
+_PACKAGE = __name__.split(".")[0]
+_MANIFEST_FILE = "manifest.json"
+_FILE_HASHES = "file_hashes.json"
+_CPUS_TAG = "cpus-"
+_MEMORY_TAG = "memory_gb-"
+_GIB = 1024**3
+
+# NOTE: Also limit the thread pools of the processes a node starts itself. Polars is
+# imported where it is used, so that `_limit_threads` runs before it is loaded in a worker.
+_THREAD_VARS = (
+    "VN1_NODE_CPUS",
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "POLARS_MAX_THREADS",
+)
+
+
+def _sha256(*parts: str | bytes) -> str:
+    h = hashlib.sha256()
+    for p in parts:
+        h.update(p.encode() if isinstance(p, str) else p)
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def _project_module(value: Any) -> ModuleType | None:
+    if isinstance(value, ModuleType):
+        module = value
+    else:
+        name = getattr(value, "__module__", None)
+        module = sys.modules.get(name) if isinstance(name, str) else None
+    if module is None or not module.__name__.startswith(_PACKAGE):
+        return None
+    return module
+
+
+@lru_cache
+def _module_fingerprint(module_name: str) -> str:
+    """Hash of the sources of a module and all project modules it refers to."""
+    sources: dict[str, bytes] = {}
+    stack = [sys.modules[module_name]]
+    while stack:
+        module = stack.pop()
+        if module.__name__ in sources or getattr(module, "__file__", None) is None:
+            continue
+        sources[module.__name__] = Path(module.__file__).read_bytes()  # type: ignore
+        stack.extend(m for v in vars(module).values() if (m := _project_module(v)) is not None)
+    return _sha256(*chain.from_iterable(sorted(sources.items())))
+
+
+def _code_fingerprint(func: Any) -> str:
+    while isinstance(func, partial):
+        func = func.func
+    func = inspect.unwrap(func)
+    module = inspect.getmodule(func)
+    module_fp = _module_fingerprint(module.__name__) if module is not None else ""
+    return _sha256(module_fp, getattr(func, "__qualname__", repr(func)))
+
+
+def _dataset_path(dataset: Any) -> Path | None:
+    if isinstance(dataset, MemoryDataset):
+        return None
+    try:
+        describe = dataset._describe()
+    except Exception:
+        return None
+    path = describe.get("filepath") or describe.get("path")
+    return Path(str(path)) if path else None
+
+
+def _path_state(path: Path) -> str | None:
+    """Cheap state of a file or directory, which changes whenever it is rewritten."""
+    if path.is_file():
+        stat = path.stat()
+        return f"{stat.st_size}:{stat.st_mtime_ns}"
+    if path.is_dir():
+        files = sorted(p for p in path.rglob("*") if p.is_file())
+        return _sha256(*(f"{p.relative_to(path)}:{_path_state(p)}" for p in files))
+    return None
+
+
+def _release(
+    pipeline: Pipeline, node: Node, catalog: DataCatalog, load_counts: Counter[str]
+) -> None:
+    """Release the datasets which no remaining node of the run loads."""
+    for dataset in node.inputs:
+        load_counts[dataset] -= 1
+        if load_counts[dataset] < 1 and dataset not in pipeline.inputs():
+            catalog.release(dataset)
+    for dataset in node.outputs:
+        if load_counts[dataset] < 1 and dataset not in pipeline.outputs():
+            catalog.release(dataset)
+
+
+class CachedRunner(SequentialRunner):
+    """`SequentialRunner` which reuses the outputs of unchanged nodes.
+
+    A node is fingerprinted by the sources of its module and of all project modules it
+    refers to, the values of its parameters and the fingerprints of its inputs. Inputs
+    produced by an earlier node of the run take over that node's fingerprint, all other
+    inputs are hashed by content. The content hashes are memoized by file size and
+    modification time.
+
+    A node is skipped if a previous run with the same fingerprint left its outputs as they
+    were: persisted outputs must not have been rewritten since, and in-memory outputs are
+    restored from a copy in `cache_dir`. The least recently used entries are evicted once
+    the copies exceed `max_size_gb`. Both can be set with the environment variables
+    `VN1_NODE_CACHE_DIR` and `VN1_NODE_CACHE_MAX_GB`.
+    """
+
+    def __init__(
+        self,
+        is_async: bool = False,
+        cache_dir: str | None = None,
+        max_size_gb: float | None = None,
+    ) -> None:
+        super().__init__(is_async=is_async)
+        self.cache_dir = Path(cache_dir or os.environ.get("VN1_NODE_CACHE_DIR", "data/.cache"))
+        self.max_size = int(
+            (max_size_gb or float(os.environ.get("VN1_NODE_CACHE_MAX_GB", "10"))) * 1024**3
+        )
+        self._file_hashes: dict[str, list[Any]] = {}
+
+    # Fingerprints
+    # ------------
+
+    def _file_hash(self, path: Path) -> str | None:
+        state = _path_state(path)
+        if state is None or path.is_dir():
+            return state
+
+        key = str(path.resolve())
+        cached = self._file_hashes.get(key)
+        if cached is None or cached[0] != state:
+            h = hashlib.sha256()
+            with path.open("rb") as f:
+                while chunk := f.read(1 << 20):
+                    h.update(chunk)
+            self._file_hashes[key] = cached = [state, h.hexdigest()]
+        return cached[1]
+
+    def _input_fingerprint(
+        self, name: str, catalog: DataCatalog, produced: dict[str, str]
+    ) -> str | None:
+        if name in produced:
+            return produced[name]
+        if name == "parameters" or name.startswith("params:"):
+            return _sha256(json.dumps(catalog.load(name), sort_keys=True, default=str))
+
+        path = _dataset_path(catalog._get_dataset(name))
+        return self._file_hash(path) if path is not None else None
+
+    def _node_fingerprint(
+        self, node: Node, catalog: DataCatalog, produced: dict[str, str]
+    ) -> str | None:
+        inputs = [self._input_fingerprint(name, catalog, produced) for name in node.inputs]
+        if any(fp is None for fp in inputs):
+            return None
+        return _sha256(
+            _code_fingerprint(node.func),
+            node.name,
+            *node.inputs,
+            *node.outputs,
+            *inputs,  # type: ignore
+        )
+
+    # Cache entries
+    # -------------
+
+    def _load_manifest(self, fp: str) -> dict[str, Any] | None:
+        path = self.cache_dir / fp / _MANIFEST_FILE
+        return json.loads(path.read_text()) if path.exists() else None
+
+    def _is_valid(self, manifest: dict[str, Any], catalog: DataCatalog) -> bool:
+        for name, entry in manifest["outputs"].items():
+            if entry["kind"] == "memory":
+                if not (self.cache_dir / entry["file"]).exists():
+                    return False
+            else:
+                path = _dataset_path(catalog._get_dataset(name))
+                if path is None or _path_state(path) != entry["state"]:
+                    return False
+        return True
+
+    def _store(self, fp: str, node: Node, catalog: DataCatalog) -> None:
+        import polars as pl
+
+        entry_dir = self.cache_dir / fp
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        entry_dir.mkdir(parents=True)
+
+        outputs: dict[str, Any] = {}
+        for i, name in enumerate(node.outputs):
+            dataset = catalog._get_dataset(name)
+            path = _dataset_path(dataset)
+            if path is not None:
+                outputs[name] = {"kind": "file", "state": _path_state(path)}
+                continue
+
+            data = dataset._data  # type: ignore
+            if isinstance(data, pl.LazyFrame | pl.DataFrame):
+                file, fmt = f"{fp}/{i}.parquet", type(data).__name__
+                data.lazy().collect().write_parquet(self.cache_dir / file)
+            else:
+                file, fmt = f"{fp}/{i}.pkl", "pickle"
+                try:
+                    (self.cache_dir / file).write_bytes(pickle.dumps(data))
+                except Exception:
+                    # NOTE: E.g. generators, the node is simply run again next time
+                    shutil.rmtree(entry_dir)
+                    return
+            outputs[name] = {"kind": "memory", "file": file, "format": fmt}
+
+        manifest = {"node": node.name, "outputs": outputs}
+        (entry_dir / _MANIFEST_FILE).write_text(json.dumps(manifest, indent=2))
+
+    def _restore(self, name: str, entry: dict[str, Any], catalog: DataCatalog) -> None:
+        import polars as pl
+
+        path = self.cache_dir / entry["file"]
+        if entry["format"] == "LazyFrame":
+            data = pl.scan_parquet(path)
+        elif entry["format"] == "DataFrame":
+            data = pl.read_parquet(path)
+        else:
+            data = pickle.loads(path.read_bytes())
+        catalog.save(name, data)
+
+    def _evict(self, keep: set[str]) -> None:
+        entries = [
+            d for d in self.cache_dir.iterdir() if d.is_dir() and (d / _MANIFEST_FILE).exists()
+        ]
+        sizes = {d: sum(p.stat().st_size for p in d.rglob("*") if p.is_file()) for d in entries}
+        total = sum(sizes.values())
+        for d in sorted(entries, key=lambda d: (d / _MANIFEST_FILE).stat().st_mtime):
+            if total <= self.max_size:
+                break
+            if d.name not in keep:
+                shutil.rmtree(d, ignore_errors=True)
+                total -= sizes[d]
+
+    # Run
+    # ---
+
+    def _run(
+        self,
+        pipeline: Pipeline,
+        catalog: DataCatalog,
+        hook_manager: PluginManager,
+        session_id: str | None = None,
+    ) -> None:
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        hashes_path = self.cache_dir / _FILE_HASHES
+        if hashes_path.exists():
+            self._file_hashes = json.loads(hashes_path.read_text())
+
+        nodes = pipeline.nodes
+        load_counts = Counter(chain.from_iterable(n.inputs for n in nodes))
+        produced: dict[str, str] = {}
+        pending: dict[str, dict[str, Any]] = {}
+        used: set[str] = set()
+        done_nodes: set[Node] = set()
+
+        for exec_index, node in enumerate(nodes):
+            fp = self._node_fingerprint(node, catalog, produced)
+            manifest = self._load_manifest(fp) if fp is not None else None
+
+            if manifest is not None and self._is_valid(manifest, catalog):
+                self._logger.info("Skipping node %s, its outputs are cached", node.name)
+                os.utime(self.cache_dir / fp / _MANIFEST_FILE)  # type: ignore
+                # NOTE: In-memory outputs are only restored if a node which is run needs them
+                pending |= {n: e for n, e in manifest["outputs"].items() if e["kind"] == "memory"}
+            else:
+                for name in node.inputs & pending.keys():
+                    self._restore(name, pending.pop(name), catalog)
+                try:
+                    run_node(node, catalog, hook_manager, self._is_async, session_id)
+                except Exception:
+                    self._suggest_resume_scenario(pipeline, done_nodes, catalog)
+                    raise
+                if fp is not None:
+                    self._store(fp, node, catalog)
+            done_nodes.add(node)
+
+            if fp is not None:
+                used.add(fp)
+                produced |= {name: _sha256(fp, name) for name in node.outputs}
+
+            _release(pipeline, node, catalog, load_counts)
+            self._logger.info("Completed %d out of %d tasks", exec_index + 1, len(nodes))
+
+        # The free outputs of the pipeline are loaded by the caller
+        for name in pipeline.outputs() & pending.keys():
+            self._restore(name, pending[name], catalog)
+
+        hashes_path.write_text(json.dumps(self._file_hashes))
+        self._evict(keep=used)
+
+
+# Resource-aware parallel runs
+# ----------------------------
+
+
+def resources(cpus: float | Literal["all"] = 1, memory_gb: float = 0) -> set[str]:
+    """Node tags which declare the cores and memory a node needs to `ResourceRunner`.
+
+    `cpus` is a number of cores, a share of all cores if it is below one, or "all".
+    """
+    tags = {f"{_CPUS_TAG}{cpus}"}
+    if memory_gb > 0:
+        tags.add(f"{_MEMORY_TAG}{memory_gb:.10g}")
+    return tags
+
+
+def node_cpus() -> int:
+    """Cores granted to the running node by `ResourceRunner`, all cores otherwise."""
+    return int(os.environ.get("VN1_NODE_CPUS", os.cpu_count() or 1))
+
+
+def _node_resources(node: Node, n_cpus: int) -> tuple[int, float]:
+    cpus, memory_gb = 1, 0.0
+    for tag in node.tags:
+        if tag.startswith(_CPUS_TAG):
+            value = tag.removeprefix(_CPUS_TAG)
+            if value == "all":
+                cpus = n_cpus
+            elif float(value) < 1:
+                cpus = math.ceil(float(value) * n_cpus)
+            else:
+                cpus = int(value)
+        elif tag.startswith(_MEMORY_TAG):
+            memory_gb = float(tag.removeprefix(_MEMORY_TAG))
+    return min(max(cpus, 1), n_cpus), memory_gb
+
+
+def _limit_threads(cpus: int) -> None:
+    """Initializer of a node's worker, which runs before the node and its data are unpickled."""
+    os.environ.update(dict.fromkeys(_THREAD_VARS, str(cpus)))
+
+
+def _run_node_limited(
+    node: Node,
+    catalog: DataCatalog,
+    is_async: bool,
+    session_id: str | None,
+    cpus: int,
+    package_name: str | None,
+    logging_config: dict[str, Any] | None,
+) -> Node:
+    """Run a node in a worker process with its thread pools limited to its cores."""
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        torch.set_num_threads(cpus)
+    with threadpool_limits(limits=cpus):
+        return _run_node_synchronization(
+            node, catalog, is_async, session_id, package_name, logging_config
+        )
+
+
+class ResourceRunner(AbstractRunner):
+    """Runs every node in a worker process as soon as its inputs and resources are available.
+
+    Nodes declare the cores and memory they need with the tags of `resources`, nodes without
+    a declaration get one core. A node is started once its inputs are done and its cores and
+    memory fit into what the running nodes leave free, so that independent namespaces run
+    concurrently without oversubscribing the machine. Larger nodes are started first. Every
+    node runs in a fresh worker whose Polars, OpenMP, BLAS and torch thread pools are limited
+    to the cores of the node, so that e.g. LightGBM stays within its share. A node which
+    exceeds the budget on its own is run alone.
+
+    The intermediate datasets are `HandoffDataset`s under `handoff_dir`, which pass polars
+    frames between the processes as memory-mapped Arrow IPC files instead of pickling them.
+    The memory budget defaults to the available memory at the start of the run. Both can be
+    set with the environment variables `VN1_HANDOFF_DIR` and `VN1_RUNNER_MEMORY_GB`.
+    """
+
+    def __init__(
+        self,
+        max_workers: int | None = None,
+        is_async: bool = False,
+        handoff_dir: str | None = None,
+        memory_gb: float | None = None,
+    ) -> None:
+        handoff_root = handoff_dir or os.environ.get("VN1_HANDOFF_DIR", "data/.handoff")
+        self._handoff_dir = Path(handoff_root) / uuid.uuid4().hex
+        default_pattern = {
+            "type": "vn1_sales_forecast.io.dataset.HandoffDataset",
+            "filepath": f"{self._handoff_dir}/{{default}}",
+        }
+        super().__init__(is_async=is_async, extra_dataset_patterns={"{default}": default_pattern})
+        self._n_cpus = os.cpu_count() or 1
+        self._max_workers = max_workers or self._n_cpus
+        memory_gb = memory_gb or float(os.environ.get("VN1_RUNNER_MEMORY_GB", "0"))
+        self._memory_gb = memory_gb or None
+
+    def run(
+        self,
+        pipeline: Pipeline,
+        catalog: DataCatalog,
+        hook_manager: PluginManager | None = None,
+        session_id: str | None = None,
+    ) -> dict[str, Any]:
+        import polars as pl
+
+        try:
+            free_outputs = super().run(pipeline, catalog, hook_manager, session_id)
+            # NOTE: Lazy outputs are read before their handoff files are removed
+            return {
+                name: data.collect() if isinstance(data, pl.LazyFrame) else data
+                for name, data in free_outputs.items()
+            }
+        finally:
+            shutil.rmtree(self._handoff_dir, ignore_errors=True)
+
+    def _submit(
+        self,
+        node: Node,
+        catalog: DataCatalog,
+        session_id: str | None,
+        cpus: int,
+        ctx: multiprocessing.context.BaseContext,
+    ) -> tuple[Future[Node], ProcessPoolExecutor]:
+        from kedro.framework.project import LOGGING, PACKAGE_NAME
+
+        pool = ProcessPoolExecutor(
+            max_workers=1, mp_context=ctx, initializer=_limit_threads, initargs=(cpus,)
+        )
+        future = pool.submit(
+            _run_node_limited,
+            node,
+            catalog,
+            self._is_async,
+            session_id,
+            cpus,
+            PACKAGE_NAME,
+            LOGGING,  # type: ignore[arg-type]
+        )
+        return future, pool
+
+    def _run(
+        self,
+        pipeline: Pipeline,
+        catalog: DataCatalog,
+        hook_manager: PluginManager,
+        session_id: str | None = None,
+    ) -> None:
+        nodes = pipeline.nodes
+        ParallelRunner._validate_catalog(catalog, pipeline)
+        ParallelRunner._validate_nodes(nodes)
+        # NOTE: Creates the datasets of the default pattern before the catalog is pickled
+        for name in pipeline.datasets():
+            catalog.exists(name)
+
+        required = {node: _node_resources(node, self._n_cpus) for node in nodes}
+        free_cpus = self._n_cpus
+        free_memory = self._memory_gb or psutil.virtual_memory().available / _GIB
+        load_counts = Counter(chain.from_iterable(n.inputs for n in nodes))
+        node_dependencies = pipeline.node_dependencies
+        order = {node: i for i, node in enumerate(nodes)}
+        todo_nodes = set(nodes)
+        done_nodes: set[Node] = set()
+        running: dict[Future[Node], Node] = {}
+
+        # NOTE: Polars is not fork-safe, so the workers are spawned. Every node gets a fresh
+        # worker, as the thread pools of Polars and OpenMP are sized when they are loaded.
+        ctx = multiprocessing.get_context("spawn")
+        max_workers = min(self._max_workers, len(nodes))
+        pools: dict[Future[Node], ProcessPoolExecutor] = {}
+        try:
+            while todo_nodes or running:
+                ready = [n for n in todo_nodes if node_dependencies[n] <= done_nodes]
+                for node in sorted(
+                    ready, key=lambda n: (-required[n][0], -required[n][1], order[n])
+                ):
+                    cpus, memory_gb = required[node]
+                    fits = cpus <= free_cpus and memory_gb <= free_memory
+                    if running and (not fits or len(running) >= max_workers):
+                        continue
+
+                    self._logger.info(
+                        "Starting node %s with %d cores and %g GB", node.name, cpus, memory_gb
+                    )
+                    todo_nodes.remove(node)
+                    free_cpus -= cpus
+                    free_memory -= memory_gb
+                    future, pool = self._submit(node, catalog, session_id, cpus, ctx)
+                    running[future] = node
+                    pools[future] = pool
+
+                if not running:
+                    raise RuntimeError(
+                        f"Unable to schedule new tasks although some nodes have not been run: "
+                        f"{sorted(n.name for n in todo_nodes)}"
+                    )
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    node = running.pop(future)
+                    pools.pop(future).shutdown()
+                    cpus, memory_gb = required[node]
+                    free_cpus += cpus
+                    free_memory += memory_gb
+                    try:
+                        future.result()
+                    except Exception:
+                        self._suggest_resume_scenario(pipeline, done_nodes, catalog)
+                        raise
+                    done_nodes.add(node)
+                    _release(pipeline, node, catalog, load_counts)
+                    self._logger.info("Completed %d out of %d tasks", len(done_nodes), len(nodes))
+        finally:
+            for pool in pools.values():
+                pool.shutdown()
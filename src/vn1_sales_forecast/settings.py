@@ -8,11 +8,10 @@ TSFEATURES_PREFIX = "tsfeatures_"
 CLASS_PREFIX = "class_"
 
 # Instantiated project hooks.
-# For example, after creating a hooks.py and defining a ProjectHooks class there, do
-# from pandas_viz.hooks import ProjectHooks
+from vn1_sales_forecast.hooks import ProjectHooks  # noqa: E402
 
 # Hooks are executed in a Last-In-First-Out (LIFO) order.
-# HOOKS = (ProjectHooks(),)
+HOOKS = (ProjectHooks(),)
 
 # Installed plugins for which to disable hook auto-registration.
 # DISABLE_HOOKS_FOR_PLUGINS = ("kedro-viz",)
@@ -0,0 +1,45 @@
+from pathlib import Path
+
+import polars as pl
+import pytest
+from kedro.io import DatasetError
+
+from vn1_sales_forecast.io.dataset import ParquetPartsDataset
+
+
+def test_save_replaces_parts(tmp_path: Path) -> None:
+    dataset = ParquetPartsDataset(filepath=str(tmp_path / "sales"))
+    assert not dataset.exists()
+    with pytest.raises(DatasetError):
+        dataset.load()
+
+    dataset.save(pl.DataFrame({"id": [1, 2]}))
+    dataset.save(pl.LazyFrame({"id": [3]}))
+
+    assert dataset.load().collect()["id"].to_list() == [3]
+    assert len(list((tmp_path / "sales").iterdir())) == 1
+
+
+def test_append_writes_only_the_delta(tmp_path: Path) -> None:
+    path = str(tmp_path / "sales")
+    ParquetPartsDataset(filepath=path).save(pl.DataFrame({"id": [1, 2]}))
+    appended = ParquetPartsDataset(filepath=path, append=True)
+    part = tmp_path / "sales" / "part-000000.parquet"
+    mtime = part.stat().st_mtime_ns
+
+    appended.save(pl.DataFrame({"id": [3]}))
+    appended.save(pl.DataFrame({"id": []}, schema={"id": pl.Int64}))
+    appended.save(pl.DataFrame({"id": [0]}))
+
+    assert part.stat().st_mtime_ns == mtime
+    assert appended.load().collect()["id"].to_list() == [1, 2, 3, 0]
+    assert len(list((tmp_path / "sales").iterdir())) == 3
+
+
+def test_sort_by_merges_the_parts(tmp_path: Path) -> None:
+    path = str(tmp_path / "sales")
+    ParquetPartsDataset(filepath=path, sort_by=["id"]).save(pl.DataFrame({"id": [2, 0]}))
+    appended = ParquetPartsDataset(filepath=path, append=True, sort_by=["id"])
+    appended.save(pl.DataFrame({"id": [3, 1]}))
+
+    assert appended.load().collect()["id"].to_list() == [0, 1, 2, 3]
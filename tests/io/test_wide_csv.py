@@ -0,0 +1,65 @@
+import os
+from datetime import date
+from pathlib import Path
+
+import polars as pl
+
+from vn1_sales_forecast.io.dataset import WideToLongCsvDataset
+
+WIDE = pl.DataFrame(
+    {
+        "Client": [1, 1, 2],
+        "Warehouse": [1, 2, 1],
+        "Product": [7, 7, 8],
+        "2023-01-02": [1.0, 0.0, None],
+        "2023-01-09": [2.0, 3.0, 4.0],
+    }
+)
+
+
+def test_load_is_long_and_split_into_parts(tmp_path: Path) -> None:
+    filepath = tmp_path / "sales.csv"
+    WIDE.write_csv(filepath)
+    parts_path = tmp_path / "parts"
+    dataset = WideToLongCsvDataset(filepath=str(filepath), batch_size=1, parts_path=str(parts_path))
+
+    df = dataset.load().collect().sort("Client", "Warehouse", "Product", "date")
+    expected = (
+        WIDE.unpivot(index=["Client", "Warehouse", "Product"], variable_name="date")
+        .with_columns(pl.col("date").str.to_date(), pl.col("value").cast(pl.Float32))
+        .sort("Client", "Warehouse", "Product", "date")
+    )
+    assert df.equals(expected)
+    assert df["date"].min() == date(2023, 1, 2)
+    assert len(list(parts_path.glob("*/*.arrow"))) > 1
+
+
+def test_load_splits_changed_file_again(tmp_path: Path) -> None:
+    filepath = tmp_path / "sales.csv"
+    WIDE.write_csv(filepath)
+    dataset = WideToLongCsvDataset(filepath=str(filepath), parts_path=str(tmp_path / "parts"))
+    assert dataset.load().collect().height == 6
+
+    WIDE.head(1).write_csv(filepath)
+    assert dataset.load().collect().height == 2
+    assert len(list((tmp_path / "parts").iterdir())) == 1
+
+
+def test_load_keeps_conversions_of_other_processes(tmp_path: Path) -> None:
+    filepath = tmp_path / "sales.csv"
+    WIDE.write_csv(filepath)
+    parts_path = tmp_path / "parts"
+    running, stale, other = (parts_path / name for name in ("1-2.tmp-3", "1-2.tmp-4", "notes"))
+    for path in (running, stale, other, parts_path / "1-2"):
+        path.mkdir(parents=True)
+    os.utime(stale, (0, 0))
+
+    dataset = WideToLongCsvDataset(filepath=str(filepath), parts_path=str(parts_path))
+    assert dataset.load().collect().height == 6
+
+    stat = filepath.stat()
+    assert {p.name for p in parts_path.iterdir()} == {
+        running.name,
+        other.name,
+        f"{stat.st_size}-{stat.st_mtime_ns}",
+    }
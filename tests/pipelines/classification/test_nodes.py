@@ -0,0 +1,31 @@
+from datetime import date, timedelta
+
+import numpy as np
+import polars as pl
+
+from vn1_sales_forecast.pipelines.classification.nodes import calculate_live_classification
+
+
+def _sales(n_series: int = 40, n_weeks: int = 120) -> pl.DataFrame:
+    rng = np.random.default_rng(0)
+    rate = rng.lognormal(0, 1.5, (n_series, 1)) * (rng.random((n_series, n_weeks)) > 0.5)
+    return pl.DataFrame(
+        {
+            "id": np.repeat(np.arange(n_series), n_weeks),
+            "date": [date(2021, 1, 4) + timedelta(weeks=t) for t in range(n_weeks)] * n_series,
+            "sales": rng.poisson(rate).ravel().astype(np.float32),
+        }
+    )
+
+
+def test_classification_does_not_depend_on_row_order() -> None:
+    sales = _sales()
+    tsfeatures = sales.select(pl.col("id").unique(), pl.lit(0.6).alias("tsfeatures_seas_acf1"))
+
+    expected = calculate_live_classification(sales.lazy(), tsfeatures.lazy()).collect()
+    shuffled = sales.sample(fraction=1, shuffle=True, seed=0)
+    actual = calculate_live_classification(shuffled.lazy(), tsfeatures.lazy()).collect()
+
+    assert actual.height == sales["id"].n_unique()
+    assert actual.sort("id").equals(expected.sort("id"))
+    assert expected["class"].n_unique() > 1
@@ -0,0 +1,61 @@
+from datetime import date
+from pathlib import Path
+
+import polars as pl
+import pytest
+
+from vn1_sales_forecast.benchmark import make_panel
+from vn1_sales_forecast.expr import SERIES_ID_BITS, split_series_id
+from vn1_sales_forecast.io.dataset import ParquetPartsDataset
+from vn1_sales_forecast.pipelines.data_wrangling.nodes import (
+    append_to_primary,
+    join_into_cube,
+    join_new_dfs,
+    remove_leading_zeros,
+)
+
+
+def _long(client: int, name: str = "sales") -> pl.LazyFrame:
+    return pl.LazyFrame(
+        {"Client": [client], "Warehouse": [1], "Product": [2], "date": ["2023-01-02"]}
+    ).with_columns(pl.lit(1.0).alias(name), pl.lit(0).alias("phase"))
+
+
+def test_join_into_cube_packs_keys() -> None:
+    client = 2**SERIES_ID_BITS - 1
+    cube = join_into_cube(_long(client), _long(client, "price")).collect()
+    keys = cube.select(split_series_id("id")).row(0)
+    assert keys == (client, 1, 2)
+
+
+@pytest.mark.parametrize("client", [-1, 2**SERIES_ID_BITS])
+def test_join_into_cube_rejects_keys_out_of_range(client: int) -> None:
+    with pytest.raises(ValueError, match="Series keys"):
+        join_into_cube(_long(client), _long(client, "price"))
+
+
+@pytest.mark.parametrize("client", [-1, 2**SERIES_ID_BITS])
+def test_join_new_dfs_rejects_keys_out_of_range(client: int) -> None:
+    primary = pl.LazyFrame({"date": [date(2023, 1, 2)]})
+    wide = pl.LazyFrame({"Client": [client], "Warehouse": [1], "Product": [2], "2023-01-09": [1]})
+    with pytest.raises(ValueError, match="Series keys"):
+        join_new_dfs(primary, wide, name="sales")
+
+
+def test_append_to_primary_loads_like_a_full_rebuild(tmp_path: Path) -> None:
+    sales, price = make_panel(50, n_weeks=60)
+    split = sales["date"].unique().sort()[45]
+    path = str(tmp_path / "sales")
+
+    def cube(before: bool) -> pl.LazyFrame:
+        old = (pl.col("date") < split) == before
+        return join_into_cube(sales.lazy().filter(old), price.lazy().filter(old))
+
+    primary = ParquetPartsDataset(filepath=path, sort_by=["id", "date"])
+    primary.save(remove_leading_zeros(cube(before=True)))
+    appended = ParquetPartsDataset(filepath=path, append=True, sort_by=["id", "date"])
+    appended.save(append_to_primary(primary.load(), cube(before=False)))
+
+    expected = remove_leading_zeros(join_into_cube(sales.lazy(), price.lazy())).collect()
+    assert len(list((tmp_path / "sales").iterdir())) == 2
+    assert appended.load().collect().equals(expected)
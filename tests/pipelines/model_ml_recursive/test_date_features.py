@@ -0,0 +1,47 @@
+from datetime import date, timedelta
+
+import polars as pl
+import pytest
+from holidays import country_holidays
+
+from vn1_sales_forecast.pipelines.model_ml_recursive.date_features import (
+    is_back_friday,
+    number_of_holidays,
+)
+
+YEARS = (2022, 2023)
+US = country_holidays("US", years=[*YEARS, YEARS[-1] + 1])
+
+
+def _dates() -> pl.Series:
+    return pl.date_range(date(YEARS[0], 1, 1), date(YEARS[-1], 12, 31), eager=True)
+
+
+def _n_holidays(d: date) -> int:
+    return len({h for o in range(7) if (h := US.get(d + timedelta(o))) is not None})
+
+
+def _is_black_friday(d: date) -> int:
+    return int(any(US.get(d + timedelta(o)) == "Thanksgiving Day" for o in range(1, 8)))
+
+
+@pytest.mark.parametrize(
+    ("factory", "reference"),
+    [(number_of_holidays, _n_holidays), (is_back_friday, _is_black_friday)],
+)
+def test_date_features_match_the_per_date_reference(factory, reference) -> None:
+    dates = _dates()
+    expected = [reference(d) for d in dates]
+
+    assert factory(YEARS)(dates).to_list() == expected
+    assert pl.select(factory(YEARS)(pl.lit(dates))).to_series().to_list() == expected
+    assert sum(expected) > 0
+
+
+@pytest.mark.parametrize("factory", [number_of_holidays, is_back_friday])
+def test_date_features_outside_the_calendar_raise(factory) -> None:
+    dates = pl.Series([date(YEARS[-1], 12, 31), date(YEARS[-1] + 1, 1, 2)])
+    with pytest.raises(ValueError, match="outside of the holiday calendar"):
+        factory(YEARS)(dates)
+    with pytest.raises(pl.exceptions.InvalidOperationError):
+        pl.select(factory(YEARS)(pl.lit(dates)))
@@ -0,0 +1,55 @@
+from datetime import date, timedelta
+
+import numpy as np
+import polars as pl
+import pytest
+from mlforecast import MLForecast
+from mlforecast.lag_transforms import RollingMax, RollingMean, RollingQuantile
+
+from vn1_sales_forecast.pipelines.model_ml_recursive.recursive import shared_features
+from vn1_sales_forecast.pipelines.model_ml_recursive.window_ops import RunningMean, RunningStd
+
+lgb = pytest.importorskip("lightgbm")
+
+
+def _series(n_series: int = 30, n_weeks: int = 80) -> pl.DataFrame:
+    rng = np.random.default_rng(0)
+    lengths = rng.integers(20, n_weeks, n_series)
+    return pl.DataFrame(
+        {
+            "id": np.repeat(np.arange(n_series), lengths),
+            "date": [date(2021, 1, 4) + timedelta(weeks=int(t)) for n in lengths for t in range(n)],
+            "sales": rng.poisson(5, lengths.sum()).astype(np.float64),
+        }
+    )
+
+
+def test_shared_features_matches_predict():
+    model = MLForecast(
+        models={
+            "a": lgb.LGBMRegressor(n_estimators=20, verbose=-1),
+            "b": lgb.LGBMRegressor(n_estimators=10, num_leaves=7, verbose=-1),
+        },
+        freq="1w",
+        lags=[1, 2],
+        date_features=["month"],
+        lag_transforms={
+            1: [
+                RollingMean(13, 3),
+                RollingMax(13, 3),
+                RollingQuantile(0.5, 13, 3),
+                RunningMean(13, 3),
+                RunningStd(13, 3),
+            ],
+            2: [RunningMean(4, 1)],
+        },
+    ).fit(_series(), id_col="id", time_col="date", target_col="sales")
+
+    expected = model.predict(10)
+    with shared_features(model):
+        actual = model.predict(10)
+
+    assert actual.columns == expected.columns
+    np.testing.assert_allclose(
+        actual.select("a", "b").to_numpy(), expected.select("a", "b").to_numpy(), rtol=1e-12
+    )
@@ -0,0 +1,106 @@
+import numpy as np
+import pytest
+from coreforecast import lag_transforms as core_tfms
+from coreforecast.grouped_array import GroupedArray
+
+from vn1_sales_forecast.pipelines.model_ml_recursive.window_ops import (
+    RunningMean,
+    RunningQuantile,
+    RunningSlope,
+    RunningStd,
+    RunningZeroShare,
+)
+
+
+def _grouped_array(n_series: int = 20, seed: int = 0) -> GroupedArray:
+    rng = np.random.default_rng(seed)
+    sizes = rng.integers(1, 80, n_series)
+    data = rng.poisson(3, sizes.sum()).astype(np.float64) * rng.lognormal(3, 1, sizes.sum())
+    data[rng.random(data.size) < 0.1] = np.nan
+    indptr = np.append(0, np.cumsum(sizes)).astype(np.int32)
+    return GroupedArray(data, indptr)
+
+
+def _windows(ga: GroupedArray, lag: int, window_size: int, min_samples: int):
+    """Non-NaN values of the window of every row, None if it has too few rows or no values."""
+    for i in range(len(ga.indptr) - 1):
+        x = ga.data[ga.indptr[i] : ga.indptr[i + 1]]
+        # NOTE: Like coreforecast, the series starts at its first value
+        first = np.flatnonzero(~np.isnan(x))[0] if (~np.isnan(x)).any() else len(x)
+        for t in range(len(x)):
+            end = t - lag + 1
+            w = x[max(end - window_size, first) : max(end, first)]
+            values = w[~np.isnan(w)]
+            yield values if len(w) >= min_samples and len(values) else None
+
+
+def _naive(ga: GroupedArray, f, lag: int, window_size: int, min_samples: int) -> np.ndarray:
+    return np.array(
+        [np.nan if w is None else f(w) for w in _windows(ga, lag, window_size, min_samples)]
+    )
+
+
+CASES = [
+    (RunningMean, core_tfms.RollingMean, {}),
+    (RunningStd, core_tfms.RollingStd, {}),
+    (RunningQuantile, core_tfms.RollingQuantile, {"p": 0.25}),
+    (RunningQuantile, core_tfms.RollingQuantile, {"p": 0.5}),
+]
+
+
+@pytest.mark.parametrize(("tfm", "core_tfm", "kwargs"), CASES)
+@pytest.mark.parametrize("window", [(1, 13, 3), (2, 52, 13), (1, 4, 4)])
+def test_transform_matches_coreforecast(tfm, core_tfm, kwargs, window):
+    lag, window_size, min_samples = window
+    ga = _grouped_array()
+    running = tfm(window_size=window_size, min_samples=min_samples, **kwargs)._set_core_tfm(lag)
+    core = core_tfm(
+        lag=lag, window_size=window_size, min_samples=min_samples, skipna=True, **kwargs
+    )
+
+    np.testing.assert_allclose(running.transform(ga), core.transform(ga), rtol=1e-9, atol=1e-9)
+
+
+@pytest.mark.parametrize(("tfm", "core_tfm", "kwargs"), CASES)
+def test_update_matches_coreforecast(tfm, core_tfm, kwargs):
+    ga = _grouped_array(seed=1)
+    running = tfm(window_size=13, min_samples=3, **kwargs)._set_core_tfm(1)
+    core = core_tfm(lag=1, window_size=13, min_samples=3, skipna=True, **kwargs)
+    running.transform(ga)
+    core.transform(ga)
+
+    rng = np.random.default_rng(2)
+    for _ in range(20):
+        # NOTE: Appends one value to every series, like a step of the recursive forecast
+        y = rng.lognormal(3, 1, len(ga.indptr) - 1)
+        data = np.insert(ga.data, ga.indptr[1:], y)
+        ga = GroupedArray(data, ga.indptr + np.arange(len(ga.indptr), dtype=np.int32))
+        np.testing.assert_allclose(running.update(ga), core.update(ga), rtol=1e-9, atol=1e-9)
+
+
+def test_nan_does_not_poison_later_windows():
+    ga = GroupedArray(np.array([1.0, np.nan, 3.0, 4.0, 5.0, 6.0]), np.array([0, 6], np.int32))
+    out = RunningMean(window_size=2, min_samples=1)._set_core_tfm(1).transform(ga)
+    np.testing.assert_allclose(out, [np.nan, 1.0, 1.0, 3.0, 3.5, 4.5])
+
+
+def test_std_is_stable_for_large_values():
+    data = 1e9 + np.tile([0.0, 1.0, 2.0], 100)
+    ga = GroupedArray(data, np.array([0, data.size], np.int32))
+    out = RunningStd(window_size=3)._set_core_tfm(1).transform(ga)
+    np.testing.assert_allclose(out[3:], 1.0, rtol=1e-6)
+
+
+def _slope(w: np.ndarray) -> float:
+    return np.nan if len(w) < 2 else np.polyfit(np.arange(len(w)), w, 1)[0]
+
+
+@pytest.mark.parametrize(
+    ("tfm", "f"),
+    [(RunningZeroShare, lambda w: np.mean(w == 0)), (RunningSlope, _slope)],
+)
+def test_transform_matches_naive(tfm, f):
+    ga = _grouped_array(seed=3)
+    ga.data[np.random.default_rng(4).random(ga.data.size) < 0.3] = 0
+    out = tfm(window_size=13, min_samples=3)._set_core_tfm(1).transform(ga)
+    np.testing.assert_allclose(out, _naive(ga, f, 1, 13, 3), rtol=1e-7, atol=1e-7)
@@ -0,0 +1,103 @@
+from datetime import date, timedelta
+
+import numpy as np
+import polars as pl
+import pytest
+
+from vn1_sales_forecast.cv import split_cv
+from vn1_sales_forecast.pipelines.ensemble_classification.nodes import cross_validation
+from vn1_sales_forecast.pipelines.evaluation.nodes import calc_cv_scores
+from vn1_sales_forecast.pipelines.model_stat.nodes import _fit_predict, cross_validate
+from vn1_sales_forecast.pipelines.model_stat.telemetry import TimedModel, collect_telemetry
+from vn1_sales_forecast.settings import PRED_PREFIX
+
+sf = pytest.importorskip("statsforecast")
+sf_models = pytest.importorskip("statsforecast.models")
+
+CLASSES = ["all_zero", "seasonal", "sparse", "regular"]
+ROUTING = {"all_zero": ["ZeroModel"], "seasonal": ["SeasonalNaive"], "sparse": ["CrostonOptimized"]}
+
+
+def _sales(n_series: int = 16, n_weeks: int = 80) -> pl.DataFrame:
+    rng = np.random.default_rng(0)
+    sales = rng.poisson(rng.lognormal(1, 1, (n_series, 1)), (n_series, n_weeks))
+    sales[:: len(CLASSES)] = 0
+    return pl.DataFrame(
+        {
+            "id": np.repeat(np.arange(n_series), n_weeks),
+            "date": [date(2021, 1, 4) + timedelta(weeks=t) for t in range(n_weeks)] * n_series,
+            "sales": sales.ravel().astype(np.float64),
+        }
+    )
+
+
+def _model(n_jobs: int = 1) -> "sf.StatsForecast":
+    models = [
+        sf_models.ZeroModel(),
+        sf_models.WindowAverage(window_size=13),
+        sf_models.SeasonalNaive(season_length=52),
+        sf_models.CrostonOptimized(),
+        sf_models.DynamicOptimizedTheta(),
+    ]
+    return sf.StatsForecast(
+        models=[TimedModel(m) for m in models],
+        fallback_model=TimedModel(sf_models.HistoricAverage(), is_fallback=True),
+        freq="1w",
+        n_jobs=n_jobs,
+    )
+
+
+def _cv_classification(cv_folds) -> pl.LazyFrame:
+    cutoffs = pl.concat(
+        train.group_by("id").agg(pl.col("date").max().dt.offset_by("1w").alias("cutoff_date"))
+        for train, _ in cv_folds
+    )
+    cls = pl.col("id").mod(len(CLASSES)).replace_strict(dict(enumerate(CLASSES)))
+    return cutoffs.with_columns(cls.alias("class"))
+
+
+def test_routed_forecast_is_scored_and_ensembled_without_nulls() -> None:
+    sales = _sales()
+    cv_folds = list(split_cv(sales.lazy(), h=13, n_windows=2, materialize=True))
+    cv_classification = _cv_classification(cv_folds)
+    parallel = {"n_cores": 1, "n_fold_jobs": 1}
+
+    unrouted, _ = cross_validate(_model(), cv_folds, cv_classification, {}, parallel)
+    routed, telemetry = cross_validate(_model(), cv_folds, cv_classification, ROUTING, parallel)
+
+    assert routed.columns == unrouted.columns
+    assert routed.height == unrouted.height
+    assert routed.null_count().sum_horizontal().item() == 0
+    assert "HistoricAverage" in telemetry["model"]
+
+    # NOTE: The routed models predict the same, only the skipped ones are replaced
+    on = ["id", "date", "cutoff_date"]
+    joined = routed.join(unrouted, on=on, suffix="_unrouted")
+    for cls, models in ROUTING.items():
+        ids = pl.col("id").mod(len(CLASSES)) == CLASSES.index(cls)
+        for name in (f"{PRED_PREFIX}{m}" for m in models):
+            same = joined.filter(ids).select(pl.col(name) == pl.col(f"{name}_unrouted"))
+            assert same.to_series().all()
+
+    # NOTE: The ml models are not fitted here, the regular series use a stat model instead
+    recursive = pl.col(f"{PRED_PREFIX}WindowAverage").alias(f"{PRED_PREFIX}LGBMRegressorRecursive")
+    for cv_forecast in (unrouted, routed):
+        forecast = cv_forecast.with_columns(recursive)
+        ensemble = cross_validation(forecast.lazy(), cv_classification.lazy()).collect()
+        assert ensemble.height == forecast.height
+        assert ensemble.null_count().sum_horizontal().item() == 0
+
+        for scores in calc_cv_scores(forecast.lazy(), sales.lazy()):
+            assert scores.collect().null_count().sum_horizontal().item() == 0
+
+
+def test_parallel_predict_keeps_the_predict_times() -> None:
+    sales = _sales(n_series=8)
+    model = _model(n_jobs=2)
+
+    actual = _fit_predict(model, sales)
+    assert actual.equals(_fit_predict(_model(), sales))
+
+    telemetry = collect_telemetry(model)
+    assert telemetry.height == 8 * len(model.models)
+    assert telemetry["predict_time"].null_count() == 0
@@ -0,0 +1,101 @@
+from datetime import date, timedelta
+
+import numpy as np
+import polars as pl
+import pytest
+
+from vn1_sales_forecast.pipelines.partition.pelt import pelt
+
+
+def _sales(n_series: int = 100, seed: int = 1) -> pl.DataFrame:
+    rng = np.random.default_rng(seed)
+    lengths = rng.integers(1, 90, n_series)
+    ys = []
+    for i, n in enumerate(lengths):
+        rate = np.repeat(rng.gamma(2, 3, 4), -(-n // 4))[:n]
+        ys.append(np.zeros(n) if i % 10 == 0 else rng.poisson(rate).astype(float))
+    return pl.DataFrame(
+        {
+            "id": np.repeat(np.arange(n_series), lengths),
+            "date": [date(2020, 1, 6) + timedelta(weeks=t) for n in lengths for t in range(n)],
+            "sales": np.concatenate(ys),
+        }
+    )
+
+
+def _optimal_partition(x: np.ndarray, model: str, pen: float, min_size: int) -> np.ndarray:
+    """The optimal partition by exhaustive dynamic programming over all change points."""
+    n = len(x)
+    if n < 2 * min_size:
+        return np.zeros(n, dtype=int)
+    if model == "l2":
+        if x.var() <= 1e-12 * np.mean(x * x):
+            return np.zeros(n, dtype=int)
+        pen *= x.var()
+
+    def cost(s: int, t: int) -> float:
+        seg = x[s:t]
+        if model == "l2":
+            return np.sum((seg - seg.mean()) ** 2)
+        total = seg.sum()
+        return 0.0 if total <= 0 else 2 * (total - total * np.log(total / len(seg)))
+
+    f = [-pen] + [np.inf] * n
+    last = [0] * (n + 1)
+    for t in range(min_size, n + 1):
+        for s in [0, *range(min_size, t - min_size + 1)]:
+            value = f[s] + cost(s, t) + pen
+            if value < f[t] - 1e-9:
+                f[t], last[t] = value, s
+
+    starts = []
+    t = n
+    while t > 0:
+        t = last[t]
+        starts.append(t)
+    labels = np.zeros(n, dtype=int)
+    for k, s in enumerate(sorted(starts)):
+        labels[s:] = k
+    return labels
+
+
+def _assert_optimal(
+    sales: pl.DataFrame, partitions: pl.DataFrame, keys: pl.DataFrame, **kwargs
+) -> None:
+    for key in keys.iter_rows(named=True):
+        x = sales.filter(pl.col("id") == key["id"])["sales"].to_numpy()[: key["length"]]
+        prefix = (pl.col(k) == v for k, v in key.items() if k != "length")
+        actual = partitions.filter(*prefix).sort("date")["partition"]
+        np.testing.assert_array_equal(actual, _optimal_partition(x, **kwargs), err_msg=str(key))
+
+
+@pytest.mark.parametrize(("model", "pen"), [("l2", 11), ("poisson", 15)])
+@pytest.mark.parametrize("min_size", [2, 3])
+def test_pelt_matches_optimal_partition(model, pen, min_size) -> None:
+    sales = _sales()
+    partitions = pelt(sales, model=model, pen=pen, min_size=min_size)
+    assert partitions.height == sales.height
+    assert partitions["partition"].max() > 0
+
+    keys = sales.group_by("id").agg(pl.len().alias("length"))
+    _assert_optimal(sales, partitions, keys, model=model, pen=pen, min_size=min_size)
+
+
+@pytest.mark.parametrize(("model", "pen"), [("l2", 11), ("poisson", 15)])
+def test_pelt_prefixes_match_optimal_partition(model, pen) -> None:
+    sales = _sales()
+    lengths = sales.group_by("id").len()
+    prefixes = pl.concat(
+        [
+            lengths.select(
+                "id",
+                (pl.col("len").cast(pl.Int64) - cut).clip(1).alias("length"),
+                pl.lit(cut).alias("cut"),
+            )
+            for cut in (0, 5, 11)
+        ]
+    )
+    partitions = pelt(sales, prefixes, model=model, pen=pen)
+    assert partitions.height == prefixes["length"].sum()
+
+    _assert_optimal(sales, partitions, prefixes, model=model, pen=pen, min_size=2)
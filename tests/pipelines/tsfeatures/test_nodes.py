@@ -0,0 +1,68 @@
+from datetime import date, timedelta
+
+import numpy as np
+import polars as pl
+import pytest
+
+from vn1_sales_forecast.cv import split_cv
+from vn1_sales_forecast.pipelines.tsfeatures.nodes import (
+    calculate_cv_tsfeatures,
+    calculate_live_tsfeatures,
+)
+from vn1_sales_forecast.pipelines.tsfeatures.tsfeatures import INCREMENTAL_FEATURES
+
+
+def _sales(n_series: int = 40, seed: int = 0) -> pl.DataFrame:
+    rng = np.random.default_rng(seed)
+    lengths = rng.integers(5, 250, n_series)
+    t = np.concatenate([np.arange(n) for n in lengths])
+    # NOTE: The series end on the same date, like in the cube
+    start = np.repeat(250 - lengths, lengths)
+    return pl.DataFrame(
+        {
+            "id": np.repeat(np.arange(n_series), lengths),
+            "date": [date(2020, 1, 6) + timedelta(weeks=int(i)) for i in start + t],
+            "sales": rng.poisson(rng.lognormal(1, 1, lengths.sum())).astype(float),
+        }
+    )
+
+
+def _assert_features_equal(actual: pl.DataFrame, expected: pl.DataFrame, atol: float) -> None:
+    on = ["id", "cutoff_date"]
+    assert actual.columns == expected.columns
+    assert actual.height == expected.height
+    joined = expected.join(actual, on=on, suffix="_actual")
+    assert joined.height == expected.height
+    for name in expected.columns[2:]:
+        np.testing.assert_allclose(
+            joined[f"{name}_actual"].to_numpy(),
+            joined[name].to_numpy(),
+            rtol=0,
+            atol=atol,
+            err_msg=name,
+        )
+
+
+@pytest.fixture(scope="module")
+def cv_folds() -> list[tuple[pl.LazyFrame, pl.LazyFrame]]:
+    return list(split_cv(_sales().lazy(), h=13, n_windows=8, step=6, materialize=True))
+
+
+def test_incremental_matches_per_fold(cv_folds) -> None:
+    features = list(INCREMENTAL_FEATURES)
+    expected = calculate_cv_tsfeatures(cv_folds, features)
+    actual = calculate_cv_tsfeatures(cv_folds, features, incremental=True)
+
+    _assert_features_equal(actual, expected, atol=1e-14)
+
+
+def test_parallel_matches_sequential(cv_folds) -> None:
+    parallel = {"n_workers": 2, "batch_rows": 1000}
+    expected = calculate_cv_tsfeatures(cv_folds, incremental=True)
+    actual = calculate_cv_tsfeatures(cv_folds, incremental=True, parallel=parallel)
+    _assert_features_equal(actual, expected, atol=0)
+
+    train = _sales().lazy()
+    expected = calculate_live_tsfeatures(train)
+    actual = calculate_live_tsfeatures(train, parallel=parallel)
+    assert actual.sort("id").equals(expected.sort("id"), null_equal=True)
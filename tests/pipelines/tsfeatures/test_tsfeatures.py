@@ -0,0 +1,76 @@
+from datetime import date, timedelta
+
+import numpy as np
+import polars as pl
+import pytest
+
+from vn1_sales_forecast.pipelines.tsfeatures.tsfeatures import tsfeatures
+
+sm = pytest.importorskip("statsmodels.api")
+stattools = pytest.importorskip("statsmodels.tsa.stattools")
+signal = pytest.importorskip("scipy.signal")
+
+M = 52
+
+
+def _sales(n_series: int = 30, seed: int = 0) -> pl.DataFrame:
+    rng = np.random.default_rng(seed)
+    lengths = rng.integers(12, 200, n_series)
+    t = np.concatenate([np.arange(n) for n in lengths])
+    season = 1 + 0.5 * np.sin(2 * np.pi * t / M)
+    return pl.DataFrame(
+        {
+            "id": np.repeat(np.arange(n_series), lengths),
+            "date": [date(2020, 1, 6) + timedelta(weeks=int(i)) for i in t],
+            "sales": rng.poisson(rng.lognormal(1, 1, lengths.sum()) * season).astype(float),
+        }
+    )
+
+
+def _tiles(x: np.ndarray, f) -> float:
+    if len(x) < 2 * M:
+        return 0.0
+    return np.var([f(x[i : i + M]) for i in range(0, len(x) // M * M, M)], ddof=1)
+
+
+def _reference(y: np.ndarray) -> dict[str, float]:
+    """The features as `tsfeatures` defines them, on statsmodels and scipy."""
+    x = (y - y.mean()) / y.std(ddof=1)
+    acf = stattools.acf(x, nlags=max(M, 10), fft=False)
+    acf_diff1 = stattools.acf(np.diff(x), nlags=10, fft=False)
+    acf_diff2 = stattools.acf(np.diff(x, 2), nlags=10, fft=False)
+    _, psd = signal.periodogram(x, M)
+    p = psd / psd.sum()
+
+    # NOTE: The acf of the series and its differences needs more than 10 values, and the sums
+    # of the squared acf are NaN unless the (differenced) series has a lag 10
+    n = len(x)
+
+    X = sm.add_constant(x[:-1])
+    u = sm.OLS(x[1:], X).fit().resid
+    v = sm.OLS(u, np.column_stack([X, x[:-1] ** 2, x[:-1] ** 3])).fit().resid
+    return {
+        "x_acf1": acf[1],
+        "x_acf10": np.sum(acf[1:11] ** 2) if n > 10 else np.nan,
+        "diff1_acf1": acf_diff1[1] if n > 10 else np.nan,
+        "diff1_acf10": np.sum(acf_diff1[1:11] ** 2) if n > 11 else np.nan,
+        "diff2_acf1": acf_diff2[1] if n > 11 else np.nan,
+        "diff2_acf10": np.sum(acf_diff2[1:11] ** 2) if n > 12 else np.nan,
+        "seas_acf1": acf[M] if n > M else np.nan,
+        "entropy": -np.nansum(p * np.log2(p)) / np.log2(p.size),
+        "lumpiness": _tiles(x, lambda w: np.var(w, ddof=1)),
+        "stability": _tiles(x, np.mean),
+        "nonlinearity": 10 * np.log(np.sum(u**2) / np.sum(v**2)),
+    }
+
+
+def test_tsfeatures_match_reference() -> None:
+    sales = _sales()
+    features = ["acf_features", "entropy", "lumpiness", "stability", "nonlinearity"]
+    actual = tsfeatures(sales, freq=M, features=features).sort("id")
+
+    for i, y in enumerate(sales.partition_by("id", maintain_order=True)):
+        expected = _reference(y.sort("date")["sales"].to_numpy())
+        row = actual.row(i, named=True)
+        for name, value in expected.items():
+            np.testing.assert_allclose(row[name], value, rtol=1e-8, atol=1e-10, err_msg=name)
@@ -0,0 +1,40 @@
+from datetime import date, timedelta
+
+import numpy as np
+import polars as pl
+import pytest
+
+from vn1_sales_forecast.cv import split_cv
+
+
+def _sales(n_series: int = 30) -> pl.DataFrame:
+    rng = np.random.default_rng(0)
+    lengths = rng.integers(1, 60, n_series)
+    ends = rng.integers(0, 5, n_series)
+    return pl.DataFrame(
+        {
+            "id": np.repeat(np.arange(n_series), lengths),
+            "date": [
+                date(2022, 1, 3) + timedelta(weeks=int(end + t))
+                for n, end in zip(lengths, ends)
+                for t in range(-n, 0)
+            ],
+            "sales": rng.poisson(3, lengths.sum()).astype(np.float64),
+        }
+    )
+
+
+@pytest.mark.parametrize("min_train_size", [None, 40])
+def test_materialized_folds_match_lazy_folds(min_train_size: int | None) -> None:
+    sales = _sales().sample(fraction=1, shuffle=True, seed=0)
+    cv = {"h": 4, "n_windows": 8, "step": 3, "min_train_size": min_train_size}
+
+    expected = list(split_cv(sales.lazy(), **cv))
+    actual = list(split_cv(sales.lazy(), **cv, materialize=True))
+
+    assert len(actual) == len(expected) == cv["n_windows"]
+    for actual_fold, expected_fold in zip(actual, expected):
+        for a, e in zip(actual_fold, expected_fold):
+            assert a.collect().equals(e.sort("id", "date").collect())
+    if min_train_size:
+        assert expected[0][0].collect().is_empty()
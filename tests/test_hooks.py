@@ -0,0 +1,41 @@
+from pathlib import Path
+
+import numpy as np
+import polars as pl
+from kedro.io import DataCatalog
+from kedro.pipeline import node
+
+from vn1_sales_forecast.hooks import PeakRss, ProjectHooks
+from vn1_sales_forecast.io.dataset import ParquetPartsDataset
+
+
+def test_peak_rss_start_stop() -> None:
+    rss = PeakRss(interval=0.001)
+    rss.start()
+    data = np.ones(64 * 1024**2 // 8)
+    rss.stop()
+
+    assert not rss.is_alive()
+    assert rss.peak >= rss.start_rss
+    assert data.sum() > 0
+
+
+def test_peak_rss_stop_does_not_shadow_thread_internals() -> None:
+    # NOTE: `threading.Thread.join` calls `self._stop()` on Python 3.10 and 3.11
+    assert "_stop" not in vars(PeakRss())
+
+
+def test_lazy_load_records_rows_and_bytes_from_the_files(tmp_path: Path) -> None:
+    dataset = ParquetPartsDataset(filepath=str(tmp_path / "sales"), append=True)
+    dataset.save(pl.DataFrame({"id": [1, 2]}))
+    dataset.save(pl.DataFrame({"id": [3]}))
+    hooks = ProjectHooks(run_log_path=str(tmp_path / "run_log"))
+    hooks.after_catalog_created(DataCatalog({"sales": dataset}))
+    n = node(len, "sales", "n_sales", name="count_sales")
+
+    hooks.before_dataset_loaded("sales", n)
+    hooks.after_dataset_loaded("sales", dataset.load(), n)
+
+    (event,) = hooks._events["count_sales"]
+    assert event["rows"] == 3
+    assert event["bytes"] == sum(p.stat().st_size for p in (tmp_path / "sales").iterdir())
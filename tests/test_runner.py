@@ -0,0 +1,23 @@
+import os
+
+import polars as pl
+from kedro.io import DataCatalog
+from kedro.pipeline import node, pipeline
+
+from vn1_sales_forecast.runner import ResourceRunner, resources
+
+
+def _thread_pool_size() -> int:
+    return pl.thread_pool_size()
+
+
+def test_resource_runner_limits_polars_threads(tmp_path) -> None:
+    nodes = pipeline(
+        [
+            node(_thread_pool_size, None, "one", tags=resources(cpus=1)),
+            node(_thread_pool_size, None, "two", tags=resources(cpus=2)),
+        ]
+    )
+    outputs = ResourceRunner(handoff_dir=str(tmp_path)).run(nodes, DataCatalog())
+
+    assert outputs == {"one": 1, "two": min(2, os.cpu_count() or 1)}